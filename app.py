@@ -1,102 +1,224 @@
-from flask import Flask, request, jsonify, make_response
-import torch
-import torch.nn as nn
+from flask import Flask, request, jsonify, make_response, g, has_request_context, send_from_directory
 import numpy as np
 import os
 import sys
 import traceback
 import logging
 import time
+import threading
 from datetime import datetime
 import signal
-import hashlib
 import json
+import io
 from functools import wraps
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# torch se importa recién al cargar el modelo (ver load_model): importar app.py es rápido
+from batching import MicroBatcher
+from log_config import setup_logging, sampling_stats
+from shared_state import SharedCounter
+from metrics import Registry, Counter, Gauge, Histogram, process_rss_bytes, CONTENT_TYPE
+from profiling import SamplingProfiler, SlowLog, install_signal_handler
+from rate_limiter import RateLimiter, Limit, LocalBackend, SharedMemoryBackend, parse_limits
+from ml.prediction_cache import PredictionCache
+from ml.model_holder import file_hash
+from ml.weights_format import WEIGHTS_PATH, SCALER_PATH, load_weights, load_scaler
+from ml.backends import load_backend
 
-# === MCP: Generar hash del modelo ===
-def generate_model_hash(file_path):
-    with open(file_path, "rb") as f:
-        return hashlib.sha256(f.read()).hexdigest()
+# === Logging ===
+# Los handlers escriben en un hilo de fondo; ver log_config.py (LOG_FORMAT, LOG_LEVELS, LOG_SAMPLE_RATE...)
+setup_logging(log_file=os.environ.get('LOG_FILE', '' if os.environ.get('RENDER') else 'app.log'))
+logger = logging.getLogger(__name__)
 
+# === MCP: Metadata del modelo ===
+# El hash se completa al cargar el modelo; file_hash lo reutiliza mientras
+# tamaño y mtime del checkpoint no cambien
 model_metadata = {
-    "hash": generate_model_hash("ml/eth_price_model.pth"),
+    "hash": None,
     "version": "v1.0.0",
     "trained_on": "2025-07-30",
     "owner": "0x123...abc"
 }
 
-with open("model_metadata.json", "w") as f:
-    json.dump(model_metadata, f)
-
-# === Logging ===
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app.log') if not os.environ.get('RENDER') else logging.StreamHandler(sys.stdout)
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# === Modelo LSTM ===
-class ETHPriceLSTM(nn.Module):
-    def __init__(self, input_size, hidden_size=128, num_layers=2, dropout=0.3):
-        super().__init__()
-        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=dropout)
-        self.fc1 = nn.Linear(hidden_size, 64)
-        self.fc2 = nn.Linear(64, 1)
-        self.relu = nn.ReLU()
-        self.dropout = nn.Dropout(dropout)
-     
-    def forward(self, x):
-        out, _ = self.lstm(x)
-        out = out[:, -1, :]
-        out = self.relu(self.fc1(out))
-        out = self.dropout(out)
-        out = self.fc2(out)
-        return out
+def update_model_metadata(path):
+    """Calcula (o reutiliza) el hash del modelo y reescribe model_metadata.json solo si cambió."""
+    model_metadata["hash"] = file_hash(path)
+    try:
+        with open("model_metadata.json") as f:
+            if json.load(f) == model_metadata:
+                return
+    except (OSError, ValueError):
+        pass
+    with open("model_metadata.json", "w") as f:
+        json.dump(model_metadata, f)
 
 app = Flask(__name__)
 
 # === Variables globales ===
 model = None
 scaler = None
+inference_backend = None
 model_loaded = False
 model_info = {}
-prediction_count = 0
+# Compartido entre workers de gunicorn (ver shared_state.py)
+prediction_count = SharedCounter()
 start_time = time.time()
 
+# === Micro-batching ===
+BATCHING_ENABLED = os.environ.get('BATCHING_ENABLED', 'true').lower() == 'true'
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 1024))
+BATCH_MAX_SEQUENCE_LENGTH = int(os.environ.get('BATCH_MAX_SEQUENCE_LENGTH', 720))
+BINARY_MIMETYPES = ('application/x-npy', 'application/octet-stream')
+# Tope del body antes de leerlo. El peor caso es JSON: ~24 bytes por valor ("-1234.5678901234567, ")
+JSON_BYTES_PER_VALUE = 24
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get(
+    'MAX_CONTENT_LENGTH',
+    BATCH_MAX_ITEMS * BATCH_MAX_SEQUENCE_LENGTH * 4 * JSON_BYTES_PER_VALUE + 64 * 1024
+))
+
+def forward_batch(X):
+    """Forward de un batch (B, L, 4) ya escalado; devuelve B predicciones."""
+    with stage('tensor'):
+        inputs = inference_backend.to_input(X)
+    with stage('forward'):
+        return inference_backend.run(inputs)
+
+batcher = MicroBatcher(forward_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+# === Cache de predicciones ===
+CACHE_ENABLED = os.environ.get('PREDICTION_CACHE_ENABLED', 'true').lower() == 'true'
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+)
+
 # === Rate limiting ===
-request_times = {}
-RATE_LIMIT = 100
-RATE_WINDOW = 60
+# Token bucket por (ruta, cliente). El cliente es la IP, o la API key (header
+# X-API-Key) si tiene un límite propio en RATE_LIMIT_API_KEYS.
+RATE_LIMIT = int(os.environ.get('RATE_LIMIT', 100))
+RATE_WINDOW = int(os.environ.get('RATE_WINDOW', 60))
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'shared').lower()
+
+rate_limiter = RateLimiter(
+    Limit(RATE_LIMIT, RATE_WINDOW),
+    # shared: tabla en memoria compartida, vale para todos los workers de gunicorn
+    backend=SharedMemoryBackend(slots=int(os.environ.get('RATE_LIMIT_SLOTS', 4096)))
+    if RATE_LIMIT_BACKEND == 'shared' else LocalBackend(),
+    route_limits=parse_limits(os.environ.get('RATE_LIMIT_ROUTES')),
+    key_limits=parse_limits(os.environ.get('RATE_LIMIT_API_KEYS')),
+)
 
 def rate_limit(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-        current_time = time.time()
+        allowed, retry_after = rate_limiter.check(request.path, client_ip, request.headers.get('X-API-Key'))
 
-        if client_ip in request_times:
-            request_times[client_ip] = [t for t in request_times[client_ip] if current_time - t < RATE_WINDOW]
-        else:
-            request_times[client_ip] = []
-
-        if len(request_times[client_ip]) >= RATE_LIMIT:
+        if not allowed:
+            RATE_LIMITED.inc(request.path)
             response = jsonify({"error": "Rate limit exceeded.", "success": False})
             response.status_code = 429
+            response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
             return add_cors_headers(response)
 
-        request_times[client_ip].append(current_time)
         return f(*args, **kwargs)
     return decorated
 
+# === Métricas ===
+# Valores en memoria compartida (ver metrics.py): /metrics da el total de todos los workers
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+ROUTES = ('/', '/health', '/info', '/metrics', '/predict', '/predict/batch')
+STATUS_CODES = (200, 400, 404, 405, 413, 429, 500, 503)
+STAGES = ('parse', 'validate', 'scale', 'cache', 'tensor', 'forward', 'batch_wait', 'serialize')
+
+registry = Registry()
+REQUESTS = registry.register(Counter(
+    'eth_api_requests_total', 'Requests por ruta y código de respuesta',
+    ('route', 'status'), [(r, str(c)) for r in ROUTES for c in STATUS_CODES]))
+REQUEST_LATENCY = registry.register(Histogram(
+    'eth_api_request_duration_seconds', 'Latencia total por ruta', ('route',), ROUTES))
+STAGE_LATENCY = registry.register(Histogram(
+    'eth_api_stage_duration_seconds', 'Latencia de cada etapa del hot path de predicción', ('stage',), STAGES))
+RATE_LIMITED = registry.register(Counter(
+    'eth_api_rate_limited_total', 'Requests rechazadas por rate limit', ('route',), ROUTES))
+RATE_LIMIT_TABLE_FULL = registry.register(Counter(
+    'eth_api_rate_limit_table_full_total', 'Requests rechazadas por no haber lugar en la tabla del rate limit'))
+PREDICTIONS = registry.register(Counter('eth_api_predictions_total', 'Predicciones realizadas'))
+MODEL_READY = registry.register(Gauge('eth_api_model_ready', '1 si el modelo está cargado'))
+MODEL_LOAD_SECONDS = registry.register(Gauge('eth_api_model_load_seconds', 'Duración de la última carga del modelo'))
+PROCESS_RSS = registry.register(Gauge('process_resident_memory_bytes', 'Memoria residente del worker que responde'))
+registry.register(Gauge('process_start_time_seconds', 'Inicio del proceso (epoch)')).set(start_time)
+
+def collect_process_metrics():
+    PREDICTIONS.set(prediction_count.value)
+    RATE_LIMIT_TABLE_FULL.set(getattr(rate_limiter.backend, 'table_full', 0))
+    PROCESS_RSS.set(process_rss_bytes())
+
+registry.add_collector(collect_process_metrics)
+
+# === Profiling y requests lentas ===
+# Requests más lentas que SLOW_REQUEST_MS quedan en un buffer circular (por worker)
+# con sus tiempos por etapa; se consultan en /admin/slow-requests
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+profiler = SamplingProfiler()
+slow_requests = SlowLog(SLOW_REQUEST_MS, capacity=int(os.environ.get('SLOW_REQUEST_BUFFER', 200)))
+
+class StageTimer:
+    """Mide una etapa: la suma al histograma y a los tiempos de la request en curso."""
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        if METRICS_ENABLED:
+            STAGE_LATENCY.observe(elapsed, self.name)
+        # El forward corre en el hilo del micro-batcher, fuera de la request
+        if has_request_context():
+            timings = g.setdefault('stage_timings', {})
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+        return False
+
+def stage(name):
+    return StageTimer(name)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else 'other'
+    if METRICS_ENABLED:
+        REQUESTS.inc((route, str(response.status_code)))
+        REQUEST_LATENCY.observe(elapsed, route)
+    if route.startswith('/predict'):
+        slow_requests.maybe_record(
+            elapsed * 1000,
+            route=route,
+            status=response.status_code,
+            input_shape=g.get('input_shape'),
+            content_type=request.mimetype,
+            stages_ms={k: round(v * 1000, 3) for k, v in g.get('stage_timings', {}).items()},
+        )
+    return response
+
 # === CORS ===
 def add_cors_headers(response):
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With, X-API-Key'
     response.headers['Access-Control-Max-Age'] = '3600'
     return response
 
@@ -114,44 +236,100 @@ def handle_preflight():
         return response
 
 # === Cargar modelo ===
+# eager | torchscript | int8 | onnx | auto (el elegido por ml/export.py en ml/backends.json)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'auto').lower()
+# background: la app responde de inmediato y /health informa "starting" hasta que el modelo está listo.
+# sync: carga durante el import (gunicorn con preload_app, ver gunicorn.conf.py).
+MODEL_LOAD_MODE = os.environ.get('MODEL_LOAD_MODE', 'background').lower()
+model_status = "starting"
+
+def find_checkpoint():
+    possible_paths = [
+        "ml/eth_price_model.pth",
+        "eth_price_model.pth",
+        os.path.join(os.path.dirname(__file__), "ml", "eth_price_model.pth")
+    ]
+    return next((p for p in possible_paths if os.path.exists(p)), None)
+
+def flat_weights_available(checkpoint_path):
+    """Los archivos planos sirven si existen y no son más viejos que el checkpoint."""
+    if not (os.path.exists(WEIGHTS_PATH) and os.path.exists(SCALER_PATH)):
+        return False
+    if checkpoint_path is None:
+        return True
+    return os.path.getmtime(WEIGHTS_PATH) >= os.path.getmtime(checkpoint_path)
+
+def load_flat_model():
+    """Pesos mapeados con mmap (sin copia, compartidos entre workers) + scaler en JSON."""
+    from ml.model import ETHPriceLSTM
+    state_dict = load_weights(WEIGHTS_PATH)
+    net = ETHPriceLSTM(4)
+    # assign=True usa los tensores mapeados en lugar de copiarlos a los parámetros
+    net.load_state_dict(state_dict, assign=True)
+    return net, load_scaler(SCALER_PATH)
+
+def load_pickled_model(checkpoint_path):
+    import torch
+    from ml.model import ETHPriceLSTM
+    checkpoint = torch.load(checkpoint_path, map_location=torch.device('cpu'), weights_only=False)
+    if "model_state_dict" not in checkpoint or "scaler" not in checkpoint:
+        raise KeyError("Faltan claves en checkpoint")
+    net = ETHPriceLSTM(4)
+    net.load_state_dict(checkpoint["model_state_dict"])
+    return net, checkpoint["scaler"]
+
+def select_backend(net, checkpoint_path):
+    try:
+        return load_backend(INFERENCE_BACKEND, net, reference_path=checkpoint_path)
+    except Exception as e:
+        logger.warning(f"Backend '{INFERENCE_BACKEND}' no disponible ({e}); se usa eager")
+        return load_backend('eager', net)
+
 def load_model():
-    global model, scaler, model_loaded, model_info
+    global model, scaler, inference_backend, model_loaded, model_status
     max_retries = 3
     retry_delay = 2
 
     for attempt in range(max_retries):
         try:
             logger.info(f"Intento {attempt + 1} de carga...")
-            possible_paths = [
-                "ml/eth_price_model.pth",
-                "eth_price_model.pth",
-                os.path.join(os.path.dirname(__file__), "ml", "eth_price_model.pth")
-            ]
-
-            checkpoint_path = next((p for p in possible_paths if os.path.exists(p)), None)
-            if not checkpoint_path:
-                raise FileNotFoundError("No se encontró eth_price_model.pth")
-
-            checkpoint = torch.load(checkpoint_path, map_location=torch.device('cpu'))
-            if "model_state_dict" not in checkpoint or "scaler" not in checkpoint:
-                raise KeyError("Faltan claves en checkpoint")
-
-            model = ETHPriceLSTM(4)
-            model.load_state_dict(checkpoint["model_state_dict"])
-            model.eval()
-            scaler = checkpoint["scaler"]
-
+            started = time.perf_counter()
+            checkpoint_path = find_checkpoint()
+
+            if flat_weights_available(checkpoint_path):
+                loaded_model, loaded_scaler = load_flat_model()
+                source, weights_format = WEIGHTS_PATH, "safetensors"
+            elif checkpoint_path:
+                loaded_model, loaded_scaler = load_pickled_model(checkpoint_path)
+                source, weights_format = checkpoint_path, "pth"
+            else:
+                raise FileNotFoundError("No se encontró eth_price_model.pth ni eth_price_model.safetensors")
+
+            loaded_model.eval()
+            if weights_format == "pth" and MODEL_LOAD_MODE == 'sync':
+                # Sin mmap: los pesos pasan a memoria compartida antes del fork de los workers
+                loaded_model.share_memory()
+            update_model_metadata(checkpoint_path or WEIGHTS_PATH)
+
+            inference_backend = select_backend(loaded_model, checkpoint_path)
+            model, scaler = loaded_model, loaded_scaler
             model_info.update({
                 "loaded_at": datetime.now().isoformat(),
-                "path": checkpoint_path,
+                "path": source,
+                "format": weights_format,
+                "load_time_ms": round((time.perf_counter() - started) * 1000, 2),
                 "parameters": sum(p.numel() for p in model.parameters()),
                 "input_features": 4,
                 "architecture": "LSTM + Dense",
-                "scaler_type": type(scaler).__name__
+                "scaler_type": type(scaler).__name__,
+                "inference_backend": inference_backend.name
             })
 
             model_loaded = True
-            logger.info("Modelo cargado correctamente.")
+            model_status = "ready"
+            MODEL_READY.set(1)
+            MODEL_LOAD_SECONDS.set(model_info["load_time_ms"] / 1000)
+            logger.info(f"Modelo cargado correctamente ({weights_format}, {model_info['load_time_ms']} ms).")
             return True
 
         except Exception as e:
@@ -159,12 +337,30 @@ def load_model():
             if attempt < max_retries - 1:
                 time.sleep(retry_delay)
 
+    model_status = "failed"
     return False
 
-logger.info("Cargando modelo...")
-load_model()
+def start_model_loading():
+    if MODEL_LOAD_MODE == 'sync':
+        return load_model()
+    threading.Thread(target=load_model, name="model-loader", daemon=True).start()
+
+def model_unavailable():
+    """Respuesta 503 mientras el modelo carga o si no se pudo cargar."""
+    if model_status == "starting":
+        response = jsonify({"error": "Modelo cargando", "status": "starting", "success": False})
+        response.status_code = 503
+        response.headers['Retry-After'] = '2'
+        return response
+    return jsonify({"error": "Modelo no cargado", "success": False}), 503
+
+logger.info(f"Cargando modelo ({MODEL_LOAD_MODE})...")
+start_model_loading()
 
 # === Validación ===
+PRICE_MIN = 1
+PRICE_MAX = 50000
+
 def validate_sequence_data(sequence):
     if not isinstance(sequence, (list, np.ndarray)):
         return False, "Debe ser lista o array"
@@ -176,12 +372,102 @@ def validate_sequence_data(sequence):
         return False, "Debe ser 2D con 4 features"
     if seq_array.shape[0] < 1:
         return False, "Debe tener al menos 1 punto"
-    if np.any(np.isnan(seq_array)) or np.any(np.isinf(seq_array)):
-        return False, "Valores NaN/Inf"
-    if np.any(seq_array < 1) or np.any(seq_array > 50000):
-        return False, "Precios fuera de rango"
+    _, errors = validate_sequence_batch(seq_array[np.newaxis])
+    if errors[0]:
+        return False, errors[0]
     return True, seq_array
 
+def validate_sequence_batch(batch):
+    """Valida un array apilado (N, L, 4) con operaciones vectorizadas sobre todo el batch.
+
+    Devuelve la máscara de secuencias válidas y el error de cada una (None si es válida).
+    """
+    finite = np.isfinite(batch).all(axis=(1, 2))
+    in_range = ((batch >= PRICE_MIN) & (batch <= PRICE_MAX)).all(axis=(1, 2))
+    valid = finite & in_range
+    errors = np.where(~finite, "Valores NaN/Inf", np.where(~in_range, "Precios fuera de rango", None))
+    return valid, errors.tolist()
+
+def parse_sequence_batch(sequences):
+    """Agrupa las secuencias de un payload JSON por longitud.
+
+    Devuelve una lista de (índices, array (n, L, 4)) y un dict índice -> error de parseo.
+    """
+    if not isinstance(sequences, list) or not sequences:
+        raise ValueError("Campo 'sequences' debe ser una lista no vacía")
+
+    # Camino rápido: todas las secuencias tienen la misma longitud
+    try:
+        stacked = np.array(sequences, dtype=np.float32)
+        if stacked.ndim == 3 and stacked.shape[1] >= 1 and stacked.shape[2] == 4:
+            return [(np.arange(len(sequences)), stacked)], {}
+    except (ValueError, TypeError):
+        pass
+
+    groups, errors = {}, {}
+    for i, sequence in enumerate(sequences):
+        try:
+            seq_array = np.array(sequence, dtype=np.float32)
+        except (ValueError, TypeError):
+            errors[i] = "Valores no numéricos"
+            continue
+        if seq_array.ndim != 2 or seq_array.shape[1] != 4:
+            errors[i] = "Debe ser 2D con 4 features"
+        elif seq_array.shape[0] < 1:
+            errors[i] = "Debe tener al menos 1 punto"
+        else:
+            groups.setdefault(seq_array.shape[0], []).append((i, seq_array))
+
+    return [
+        (np.array([i for i, _ in items]), np.stack([a for _, a in items]))
+        for items in groups.values()
+    ], errors
+
+class BatchTooLarge(ValueError):
+    """El batch supera BATCH_MAX_ITEMS o BATCH_MAX_SEQUENCE_LENGTH (413)."""
+
+def check_batch_limits(count, seq_len=None):
+    if count > BATCH_MAX_ITEMS:
+        raise BatchTooLarge(f"Máximo {BATCH_MAX_ITEMS} secuencias por request")
+    if seq_len is not None and seq_len > BATCH_MAX_SEQUENCE_LENGTH:
+        raise BatchTooLarge(f"Máximo {BATCH_MAX_SEQUENCE_LENGTH} puntos por secuencia")
+
+NPY_HEADER_READERS = {(1, 0): np.lib.format.read_array_header_1_0, (2, 0): np.lib.format.read_array_header_2_0}
+
+def npy_shape(body):
+    """Forma declarada en el header de un `.npy`, sin decodificar los datos."""
+    fp = io.BytesIO(body)
+    read_header = NPY_HEADER_READERS.get(np.lib.format.read_magic(fp))
+    if read_header is None:
+        raise ValueError("Versión de .npy no soportada")
+    shape, _, _ = read_header(fp)
+    return shape
+
+def decode_binary_batch(req):
+    """Decodifica un body binario: `.npy` (application/x-npy) o float32 crudo
+    (application/octet-stream, con la longitud de secuencia en `X-Sequence-Length`).
+
+    Los límites del batch se validan con el header del `.npy` o el largo del body,
+    antes de decodificar."""
+    body = req.get_data(cache=False)
+    if req.mimetype == 'application/x-npy':
+        shape = npy_shape(body)
+        if len(shape) != 3:
+            raise ValueError("El array debe tener forma (N, L, 4)")
+        check_batch_limits(shape[0], shape[1])
+        batch = np.load(io.BytesIO(body), allow_pickle=False)
+    else:
+        seq_len = int(req.headers.get('X-Sequence-Length', 0))
+        if seq_len < 1:
+            raise ValueError("Header X-Sequence-Length requerido para float32 crudo")
+        if len(body) % (seq_len * 4 * 4) != 0:
+            raise ValueError("Tamaño del body no coincide con (N, X-Sequence-Length, 4) float32")
+        check_batch_limits(len(body) // (seq_len * 4 * 4), seq_len)
+        batch = np.frombuffer(body, dtype='<f4').reshape(-1, seq_len, 4)
+    if batch.ndim != 3 or batch.shape[1] < 1 or batch.shape[2] != 4:
+        raise ValueError("El array debe tener forma (N, L, 4)")
+    return batch.astype(np.float32, copy=False)
+
 # === Endpoints ===
 @app.route('/')
 def index():
@@ -192,85 +478,272 @@ def index():
         "status": "OK",
         "model_loaded": model_loaded,
         "uptime_seconds": uptime,
-        "prediction_count": prediction_count,
+        "prediction_count": prediction_count.value,
         "endpoints": {
             "health": "/health",
             "predict": "/predict",
-            "info": "/info"
+            "predict_batch": "/predict/batch",
+            "info": "/info",
+            "metrics": "/metrics"
         }
     })
 
 @app.route('/health')
 def health():
     uptime = int(time.time() - start_time)
+    if model_status == "starting":
+        return jsonify({
+            "status": "starting",
+            "model_status": "loading",
+            "uptime_seconds": uptime,
+            "timestamp": datetime.now().isoformat()
+        }), 503
     return jsonify({
         "status": "healthy" if model_loaded else "degraded",
         "model_status": "loaded" if model_loaded else "not_loaded",
         "uptime_seconds": uptime,
-        "prediction_count": prediction_count,
+        "prediction_count": prediction_count.value,
         "timestamp": datetime.now().isoformat()
     })
 
+@app.route('/metrics')
+def metrics():
+    response = make_response(registry.render())
+    response.headers['Content-Type'] = CONTENT_TYPE
+    return response
+
+# === Admin ===
+def admin_only(f):
+    """Requiere el header X-Admin-Token; sin ADMIN_TOKEN configurado los endpoints no existen."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "No encontrado", "success": False}), 404
+        if request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+            return jsonify({"error": "No autorizado", "success": False}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+@admin_only
+def admin_profile():
+    """POST ?seconds=N arranca un perfil por muestreo de este worker; GET devuelve el estado."""
+    if request.method == 'POST':
+        seconds = request.args.get('seconds', 10, type=float)
+        path = profiler.start(seconds, name='app')
+        if path is None:
+            return jsonify({"error": "Ya hay un perfil en curso", "success": False}), 409
+        return jsonify({"success": True, "seconds": min(seconds, profiler.max_duration),
+                        "output": os.path.basename(path), "pid": os.getpid()}), 202
+    return jsonify({"success": True, "pid": os.getpid(), **profiler.status()})
+
+@app.route('/admin/profile/<name>')
+@admin_only
+def admin_profile_download(name):
+    return send_from_directory(os.path.abspath(profiler.output_dir), name, mimetype='text/plain')
+
+@app.route('/admin/slow-requests')
+@admin_only
+def admin_slow_requests():
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "stats": slow_requests.stats(),
+        "requests": slow_requests.recent(
+            limit=request.args.get('limit', 50, type=int),
+            min_ms=request.args.get('min_ms', type=float),
+        ),
+    })
+
 @app.route('/info')
 def info():
     if not model_loaded:
-        return jsonify({"error": "Modelo no cargado", "success": False}), 503
+        return model_unavailable()
     return jsonify({
         "model_info": model_info,
         "service_stats": {
             "uptime_seconds": int(time.time() - start_time),
-            "prediction_count": prediction_count
+            "prediction_count": prediction_count.value
         },
+        "batching": batcher.metrics() if BATCHING_ENABLED else {"enabled": False},
+        "prediction_cache": prediction_cache.stats() if CACHE_ENABLED else {"enabled": False},
+        "rate_limit": rate_limiter.stats(),
+        "log_sampling": sampling_stats(),
         "success": True
     })
 
 @app.route('/predict', methods=['POST', 'OPTIONS'])
 @rate_limit
 def predict():
-    global prediction_count
-
     if request.method == 'OPTIONS':
         return handle_preflight()
 
     start_time_request = time.time()
     try:
         if not model_loaded:
-            return jsonify({"error": "Modelo no cargado", "success": False}), 503
+            return model_unavailable()
 
         if not request.is_json:
             return jsonify({"error": "Content-Type debe ser JSON", "success": False}), 400
 
-        data = request.get_json()
+        with stage('parse'):
+            data = request.get_json()
         if not data or 'sequence' not in data:
             return jsonify({"error": "Campo 'sequence' requerido", "success": False}), 400
 
-        valid, seq = validate_sequence_data(data['sequence'])
+        with stage('validate'):
+            valid, seq = validate_sequence_data(data['sequence'])
         if not valid:
             return jsonify({"error": f"Secuencia inválida: {seq}", "success": False}), 400
 
-        seq_scaled = scaler.transform(seq)
-        X = torch.tensor(seq_scaled, dtype=torch.float32).unsqueeze(0)
+        g.input_shape = list(seq.shape)
+        with stage('scale'):
+            seq_scaled = scaler.transform(seq).astype(np.float32)
+
+        pred = None
+        if CACHE_ENABLED:
+            with stage('cache'):
+                cache_key = PredictionCache.make_key(seq_scaled)
+                pred = prediction_cache.get(cache_key, model_metadata["hash"])
+        cached = pred is not None
+
+        if not cached:
+            if BATCHING_ENABLED:
+                # Incluye la espera en cola; el forward del batch se mide aparte en forward_batch
+                with stage('batch_wait'):
+                    pred = batcher.submit(seq_scaled)
+            else:
+                pred = forward_batch(seq_scaled[np.newaxis])[0]
+            if CACHE_ENABLED:
+                prediction_cache.put(cache_key, model_metadata["hash"], float(pred))
+
+        prediction_id = prediction_count.add(1)
+        processing_time = time.time() - start_time_request
+
+        with stage('serialize'):
+            response = jsonify({
+                "predicted_price": float(pred),
+                "model_hash": model_metadata["hash"],
+                "model_version": model_metadata["version"],
+                "success": True,
+                "metadata": {
+                    "sequence_length": int(seq.shape[0]),
+                    "processing_time_ms": round(processing_time * 1000, 2),
+                    "prediction_id": prediction_id,
+                    "cached": cached,
+                    "timestamp": datetime.now().isoformat()
+                }
+            })
+        return response
+
+    except RequestEntityTooLarge:
+        # Body mayor a MAX_CONTENT_LENGTH: lo responde el handler de 413
+        raise
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Error interno", "success": False}), 500
+
+@app.route('/predict/batch', methods=['POST', 'OPTIONS'])
+@rate_limit
+def predict_batch():
+    if request.method == 'OPTIONS':
+        return handle_preflight()
 
-        with torch.no_grad():
-            model.eval()
-            pred = model(X).item()
+    start_time_request = time.time()
+    try:
+        if not model_loaded:
+            return model_unavailable()
 
-        prediction_count += 1
+        try:
+            if request.mimetype in BINARY_MIMETYPES:
+                with stage('parse'):
+                    batch = decode_binary_batch(request)
+                groups, errors = [(np.arange(batch.shape[0]), batch)], {}
+                total = batch.shape[0]
+            elif request.is_json:
+                with stage('parse'):
+                    data = request.get_json()
+                    if not data or 'sequences' not in data:
+                        return jsonify({"error": "Campo 'sequences' requerido", "success": False}), 400
+                    if isinstance(data['sequences'], list):
+                        check_batch_limits(len(data['sequences']))
+                    groups, errors = parse_sequence_batch(data['sequences'])
+                total = len(data['sequences'])
+            else:
+                return jsonify({"error": "Content-Type debe ser JSON, application/x-npy o application/octet-stream", "success": False}), 400
+        except BatchTooLarge as e:
+            return jsonify({"error": str(e), "success": False}), 413
+        except ValueError as e:
+            return jsonify({"error": f"Batch inválido: {e}", "success": False}), 400
+
+        g.input_shape = [total] + sorted({int(b.shape[1]) for _, b in groups})
+        if any(b.shape[1] > BATCH_MAX_SEQUENCE_LENGTH for _, b in groups):
+            return jsonify({"error": f"Máximo {BATCH_MAX_SEQUENCE_LENGTH} puntos por secuencia", "success": False}), 413
+
+        predictions = {}
+        for indices, batch in groups:
+            with stage('validate'):
+                valid, batch_errors = validate_sequence_batch(batch)
+            for i, error in zip(indices[~valid].tolist(), np.asarray(batch_errors, dtype=object)[~valid]):
+                errors[i] = f"Secuencia inválida: {error}"
+            if not valid.any():
+                continue
+            X = batch[valid]
+            n, seq_len, n_features = X.shape
+            with stage('scale'):
+                X_scaled = scaler.transform(X.reshape(-1, n_features)).astype(np.float32).reshape(n, seq_len, n_features)
+            valid_indices = indices[valid].tolist()
+
+            misses = list(range(n))
+            if CACHE_ENABLED:
+                with stage('cache'):
+                    keys = [PredictionCache.make_key(x) for x in X_scaled]
+                    misses = []
+                    for j, key in enumerate(keys):
+                        hit = prediction_cache.get(key, model_metadata["hash"])
+                        if hit is None:
+                            misses.append(j)
+                        else:
+                            predictions[valid_indices[j]] = hit
+            if not misses:
+                continue
+
+            preds = forward_batch(X_scaled[misses]).tolist()
+            for j, pred in zip(misses, preds):
+                predictions[valid_indices[j]] = pred
+                if CACHE_ENABLED:
+                    prediction_cache.put(keys[j], model_metadata["hash"], pred)
+
+        results = []
+        for i in range(total):
+            if i in predictions:
+                results.append({"index": i, "predicted_price": float(predictions[i]), "success": True})
+            else:
+                results.append({"index": i, "error": errors.get(i, "Secuencia inválida"), "success": False})
+
+        prediction_count.add(len(predictions))
         processing_time = time.time() - start_time_request
 
-        return jsonify({
-            "predicted_price": float(pred),
-            "model_hash": model_metadata["hash"],
-            "model_version": model_metadata["version"],
-            "success": True,
-            "metadata": {
-                "sequence_length": int(seq.shape[0]),
-                "processing_time_ms": round(processing_time * 1000, 2),
-                "prediction_id": prediction_count,
-                "timestamp": datetime.now().isoformat()
-            }
-        })
+        with stage('serialize'):
+            response = jsonify({
+                "results": results,
+                "model_hash": model_metadata["hash"],
+                "model_version": model_metadata["version"],
+                "success": True,
+                "metadata": {
+                    "count": total,
+                    "succeeded": len(predictions),
+                    "failed": total - len(predictions),
+                    "processing_time_ms": round(processing_time * 1000, 2),
+                    "timestamp": datetime.now().isoformat()
+                }
+            })
+        return response
 
+    except RequestEntityTooLarge:
+        # Body mayor a MAX_CONTENT_LENGTH: lo responde el handler de 413
+        raise
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         logger.error(traceback.format_exc())
@@ -280,6 +753,10 @@ def predict():
 def not_found(_):
     return jsonify({"error": "No encontrado", "success": False}), 404
 
+@app.errorhandler(413)
+def too_large_handler(_):
+    return jsonify({"error": f"Body mayor a {app.config['MAX_CONTENT_LENGTH']} bytes", "success": False}), 413
+
 @app.errorhandler(429)
 def ratelimit_handler(_):
     return jsonify({"error": "Rate limit exceeded", "success": False}), 429
@@ -291,6 +768,8 @@ def signal_handler(sig, frame):
 
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
+# `kill -USR2 <pid>` graba un perfil de PROFILE_SECONDS (con gunicorn se instala en cada worker, ver gunicorn.conf.py)
+install_signal_handler(profiler, name='app')
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
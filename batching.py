@@ -0,0 +1,183 @@
+"""Micro-batching de inferencias para el endpoint /predict.
+
+Los handlers de Flask encolan secuencias ya escaladas y esperan el resultado;
+un único hilo agrupa las peticiones concurrentes dentro de una ventana
+(tamaño máximo de batch y tiempo máximo de espera), las separa por longitud
+de secuencia y ejecuta un solo forward por grupo.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTimeoutError(TimeoutError):
+    """La petición no recibió resultado dentro del timeout."""
+
+
+class _PendingPrediction:
+    __slots__ = ("sequence", "enqueued_at", "event", "result", "error")
+
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self.enqueued_at = time.perf_counter()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Agrupa predicciones concurrentes en forwards batcheados.
+
+    `predict_fn` recibe un array float32 de forma (B, L, F) y devuelve B
+    predicciones escaladas. Las secuencias se agrupan por longitud exacta
+    (bucketing) en lugar de rellenarse con padding, así el resultado de cada
+    petición es idéntico al de un forward individual.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0, metrics_window=1000):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size debe ser >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        # Métricas
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._queue_waits = deque(maxlen=metrics_window)
+        self._batches_total = 0
+        self._requests_total = 0
+        self._errors_total = 0
+
+    # === Ciclo de vida ===
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+            logger.info(
+                f"Micro-batcher iniciado (max_batch_size={self.max_batch_size}, "
+                f"max_wait_ms={self.max_wait * 1000:.1f})"
+            )
+
+    def stop(self, timeout=5.0):
+        self._stopped.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    # === API para los handlers ===
+    def submit(self, sequence, timeout=30.0):
+        """Encola una secuencia escalada (L, F) y bloquea hasta obtener la predicción."""
+        # El hilo se arranca de forma perezosa: con servidores que hacen fork
+        # (gunicorn) cada proceso necesita su propio hilo.
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+        pending = _PendingPrediction(np.ascontiguousarray(sequence, dtype=np.float32))
+        self._queue.put(pending)
+        if not pending.event.wait(timeout):
+            raise BatchTimeoutError(f"Sin resultado tras {timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    # === Hilo de batching ===
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            started = time.perf_counter()
+
+            buckets = {}
+            for pending in batch:
+                buckets.setdefault(pending.sequence.shape, []).append(pending)
+
+            for group in buckets.values():
+                try:
+                    X = np.stack([p.sequence for p in group])
+                    preds = np.asarray(self.predict_fn(X), dtype=np.float64).reshape(-1)
+                    if preds.shape[0] != len(group):
+                        raise RuntimeError(f"predict_fn devolvió {preds.shape[0]} resultados para {len(group)} secuencias")
+                    for pending, pred in zip(group, preds):
+                        pending.result = float(pred)
+                except Exception as e:
+                    logger.error(f"Error en forward batcheado: {e}")
+                    for pending in group:
+                        pending.error = e
+                    with self._lock:
+                        self._errors_total += len(group)
+                finally:
+                    for pending in group:
+                        pending.event.set()
+
+            with self._lock:
+                self._batches_total += len(buckets)
+                self._requests_total += len(batch)
+                for group in buckets.values():
+                    self._batch_sizes.append(len(group))
+                for pending in batch:
+                    self._queue_waits.append(started - pending.enqueued_at)
+
+    # === Métricas ===
+    def metrics(self):
+        with self._lock:
+            sizes = np.array(self._batch_sizes, dtype=np.float64)
+            waits = np.array(self._queue_waits, dtype=np.float64) * 1000.0
+            batches_total = self._batches_total
+            requests_total = self._requests_total
+            errors_total = self._errors_total
+
+        def _summary(values):
+            if values.size == 0:
+                return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+            p50, p95 = np.percentile(values, [50, 95])
+            return {
+                "avg": round(float(values.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "max": round(float(values.max()), 3),
+            }
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "batches_total": batches_total,
+            "requests_total": requests_total,
+            "errors_total": errors_total,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": _summary(sizes),
+            "queue_wait_ms": _summary(waits),
+        }
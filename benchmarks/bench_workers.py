@@ -0,0 +1,133 @@
+"""Throughput de la API según la cantidad de workers de gunicorn.
+
+Para cada valor de `--workers` levanta `gunicorn app:app -c gunicorn.conf.py`,
+espera a que /health responda 200 y dispara requests concurrentes a /predict
+durante `--duration` segundos. El rate limit se desactiva y el cache de
+predicciones también (cada request lleva una secuencia distinta).
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --concurrency 32
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def wait_ready(base_url, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def start_server(workers, threads, port):
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        PORT=str(port),
+        RATE_LIMIT=str(10 ** 9),
+        PREDICTION_CACHE_ENABLED='false',
+    )
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-c', 'gunicorn.conf.py'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def run_load(base_url, concurrency, duration, seq_len, seed=0):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client(worker_id):
+        rng = np.random.default_rng(seed + worker_id)
+        session = requests.Session()
+        local = []
+        while time.time() < deadline:
+            sequence = (3000 + rng.normal(0, 20, size=(seq_len, 4))).round(2).tolist()
+            started = time.perf_counter()
+            try:
+                response = session.post(f"{base_url}/predict", json={"sequence": sequence}, timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - started)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': int(len(latencies)),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / duration, 1),
+        'latency_p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+        'latency_p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help="Lista de cantidades de workers")
+    parser.add_argument('--threads', type=int, default=4, help="Hilos por worker")
+    parser.add_argument('--concurrency', type=int, default=32, help="Clientes concurrentes")
+    parser.add_argument('--duration', type=float, default=15, help="Segundos de carga por configuración")
+    parser.add_argument('--seq-len', type=int, default=24)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    for workers in [int(w) for w in args.workers.split(',')]:
+        server = start_server(workers, args.threads, args.port)
+        try:
+            if not wait_ready(base_url):
+                print(f"❌ El servidor con {workers} workers no quedó listo")
+                continue
+            # Calentar cada worker antes de medir
+            run_load(base_url, args.concurrency, 2, args.seq_len, seed=10_000)
+            result = {'workers': workers, 'threads': args.threads, **run_load(base_url, args.concurrency, args.duration, args.seq_len)}
+            results.append(result)
+            print(f"workers={workers:<3} {result['throughput_rps']:>8} req/s   "
+                  f"p50 {result['latency_p50_ms']} ms   p99 {result['latency_p99_ms']} ms   errores {result['errors']}")
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+    if results:
+        base = results[0]['throughput_rps'] or 1
+        for result in results:
+            result['speedup'] = round(result['throughput_rps'] / base, 2)
+        print("\nEscalado: " + ", ".join(f"{r['workers']}w x{r['speedup']}" for r in results))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compara dos resultados de `benchmarks/run.py` y marca las regresiones.
+
+    python benchmarks/compare.py benchmarks/results/base.json benchmarks/results/nuevo.json --threshold 10
+
+Para latencias (`*_ms`) una suba es regresión; para tasas (`*_per_s`,
+`achieved_rps`) lo es una baja. Sale con código 1 si hay alguna regresión,
+para poder usarlo en CI.
+"""
+import argparse
+import json
+import sys
+
+# Métrica principal de cada resultado y si "más alto es mejor"
+METRICS = (
+    ('p50_ms', False),
+    ('p95_ms', False),
+    ('p99_ms', False),
+    ('windows_per_s', True),
+    ('achieved_rps', True),
+    ('errors', False),
+)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(base, new, threshold):
+    rows, regressions = [], []
+    for name in sorted(set(base['results']) & set(new['results'])):
+        before, after = base['results'][name], new['results'][name]
+        for metric, higher_is_better in METRICS:
+            if metric not in before or metric not in after or before[metric] is None or after[metric] is None:
+                continue
+            old, current = before[metric], after[metric]
+            change = (current - old) / old * 100 if old else (0.0 if current == old else float('inf'))
+            worse = -change if higher_is_better else change
+            regressed = worse > threshold
+            rows.append((name, metric, old, current, change, regressed))
+            if regressed:
+                regressions.append((name, metric))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help="Porcentaje de empeoramiento tolerado")
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f"Base: {base['commit']} ({base['timestamp']})  ->  Nuevo: {new['commit']} ({new['timestamp']})\n")
+    rows, regressions = compare(base, new, args.threshold)
+    for name, metric, old, current, change, regressed in rows:
+        flag = '❌' if regressed else '  '
+        print(f"{flag} {name:<45} {metric:<14} {old:>12} -> {current:>12}  ({change:+.1f}%)")
+
+    missing = sorted(set(base['results']) ^ set(new['results']))
+    if missing:
+        print(f"\nSolo en uno de los dos archivos: {', '.join(missing)}")
+    if regressions:
+        print(f"\n{len(regressions)} regresiones por encima de {args.threshold}%")
+        sys.exit(1)
+    print("\nSin regresiones")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""Suite de benchmarks de la API y del pipeline de ML.
+
+Modos:
+- `micro`: `validate_sequence_data`, `scaler.transform` y el forward de
+  `ETHPriceLSTM` para distintos tamaños de batch y longitudes de secuencia.
+- `load`: carga a tasa fija (lazo abierto) contra `app.py` local; reporta
+  p50/p95/p99 de latencia, errores y tasa lograda por cada tasa pedida.
+- `train`: `create_sequences` sobre `eth_historical.parquet` y el tiempo de
+  cada epoch de entrenamiento.
+
+Los resultados se guardan en `benchmarks/results/<fecha>_<commit>.json`;
+`python benchmarks/compare.py base.json nuevo.json` marca las regresiones.
+
+    python benchmarks/run.py micro load --rates 10,50,100 --duration 20
+    python benchmarks/run.py all
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+sys.path.append(ROOT)
+
+BATCH_SIZES = (1, 8, 32, 128)
+SEQ_LENS = (24, 168)
+
+
+# === Helpers ===
+def summarize(samples_s):
+    """Resumen en milisegundos de una lista de duraciones en segundos."""
+    ms = np.asarray(samples_s) * 1000
+    if not len(ms):
+        return {'count': 0}
+    return {
+        'count': int(len(ms)),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def measure(fn, repeat=200, warmup=10):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def random_sequences(rng, batch, seq_len, base=3000.0):
+    return (base + rng.normal(0, 20, size=(batch, seq_len, 4))).astype(np.float32)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# === Micro ===
+def run_micro(repeat=200):
+    # Carga sincrónica: el scaler y el modelo real quedan listos al importar app
+    os.environ.setdefault('MODEL_LOAD_MODE', 'sync')
+    import torch
+    import app
+    from ml.model import ETHPriceLSTM
+
+    rng = np.random.default_rng(0)
+    results = {}
+
+    for seq_len in SEQ_LENS:
+        sequence = random_sequences(rng, 1, seq_len)[0].tolist()
+        results[f'validate_sequence_data/seq{seq_len}'] = measure(lambda: app.validate_sequence_data(sequence), repeat)
+
+    scaler = app.scaler
+    if scaler is None:
+        from sklearn.preprocessing import MinMaxScaler
+        scaler = MinMaxScaler().fit(random_sequences(rng, 1, 1000)[0])
+    for batch in BATCH_SIZES:
+        rows = random_sequences(rng, batch, 168).reshape(-1, 4)
+        results[f'scaler.transform/rows{len(rows)}'] = measure(lambda: scaler.transform(rows), repeat)
+
+    model = app.model if app.model is not None else ETHPriceLSTM(4).eval()
+    for seq_len in SEQ_LENS:
+        for batch in BATCH_SIZES:
+            X = torch.from_numpy(random_sequences(rng, batch, seq_len) / 5000)
+            def forward():
+                with torch.no_grad():
+                    model(X)
+            stats = measure(forward, repeat=max(20, repeat // batch))
+            stats['windows_per_s'] = round(batch / (stats['mean_ms'] / 1000), 1)
+            results[f'forward/batch{batch}/seq{seq_len}'] = stats
+    return results
+
+
+# === Load ===
+def start_local_app(port):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        RATE_LIMIT=str(10 ** 9),
+        PREDICTION_CACHE_ENABLED='false',
+        MODEL_LOAD_MODE='sync',
+    )
+    return subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(base_url, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def fixed_rate(base_url, rate, duration, seq_len, max_workers=256):
+    """Lazo abierto: las requests salen a horario aunque el servidor se atrase.
+
+    La latencia se mide desde el horario programado (incluye la espera si el
+    cliente no pudo enviarla a tiempo), así no se esconden las colas.
+    """
+    rng = np.random.default_rng(1)
+    total = int(rate * duration)
+    payloads = [{"sequence": random_sequences(rng, 1, seq_len)[0].round(2).tolist()} for _ in range(min(total, 500))]
+    local = threading.local()
+    latencies, errors = [], {}
+    lock = threading.Lock()
+
+    def send(i, scheduled):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            response = session.post(f"{base_url}/predict", json=payloads[i % len(payloads)], timeout=30)
+            error = None if response.status_code == 200 else str(response.status_code)
+        except requests.RequestException as e:
+            error = type(e).__name__
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            if error is None:
+                latencies.append(elapsed)
+            else:
+                errors[error] = errors.get(error, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i in range(total):
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, i, scheduled)
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies)
+    result.update({
+        'target_rps': rate,
+        'achieved_rps': round(len(latencies) / elapsed, 1),
+        'errors': sum(errors.values()),
+        'errors_by_type': errors,
+    })
+    return result
+
+
+def run_load(rates, duration, seq_len, url=None, port=5056):
+    server = None
+    base_url = url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_local_app(port)
+    try:
+        if not wait_ready(base_url):
+            raise RuntimeError(f"La API en {base_url} no quedó lista")
+        fixed_rate(base_url, min(rates), 2, seq_len)  # calentamiento
+        results = {}
+        for rate in rates:
+            results[f'predict/{rate:g}rps'] = fixed_rate(base_url, rate, duration, seq_len)
+            r = results[f'predict/{rate:g}rps']
+            print(f"  {rate:>5} rps -> p50 {r.get('p50_ms')} ms  p95 {r.get('p95_ms')} ms  "
+                  f"p99 {r.get('p99_ms')} ms  errores {r['errors']}")
+        return results
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+# === Train ===
+def run_train(epochs=2, max_windows=None):
+    import pandas as pd
+    import torch
+    import torch.nn as nn
+    from torch.utils.data import Subset
+    from ml.dataset import make_loader
+    from ml.model import ETHPriceLSTM
+    from ml.train_model import create_sequences, train_epoch
+
+    df = pd.read_parquet(os.path.join(ROOT, 'eth_historical.parquet'))
+    results = {'create_sequences': measure(lambda: create_sequences(df), repeat=5, warmup=1)}
+
+    dataset, _ = create_sequences(df)
+    if max_windows:
+        dataset = Subset(dataset, range(min(max_windows, len(dataset))))
+    loader = make_loader(dataset, batch_size=256, shuffle=True)
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model = ETHPriceLSTM(input_size=4).to(device)
+    opt = torch.optim.Adam(model.parameters(), lr=0.001)
+    loss_fn = nn.MSELoss()
+
+    epoch_times = []
+    for epoch in range(epochs):
+        started = time.perf_counter()
+        loss = train_epoch(model, loader, opt, loss_fn, device)
+        epoch_times.append(time.perf_counter() - started)
+        print(f"  epoch {epoch + 1}: {epoch_times[-1]:.2f}s (loss {loss:.6f})")
+    results['train_epoch'] = summarize(epoch_times)
+    results['train_epoch']['windows'] = len(dataset)
+    results['train_epoch']['windows_per_s'] = round(len(dataset) / float(np.mean(epoch_times)), 1)
+    return results
+
+
+# === Main ===
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modes', nargs='+', choices=['micro', 'load', 'train', 'all'])
+    parser.add_argument('--repeat', type=int, default=200, help="Repeticiones por micro-benchmark")
+    parser.add_argument('--rates', default='10,50,100', help="Tasas (requests/s) del load test")
+    parser.add_argument('--duration', type=float, default=20, help="Segundos por tasa")
+    parser.add_argument('--seq-len', type=int, default=24, help="Longitud de secuencia del load test")
+    parser.add_argument('--url', help="API ya levantada (por defecto se inicia app.py local)")
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--max-windows', type=int, help="Limitar las ventanas del benchmark de entrenamiento")
+    parser.add_argument('--output', help="Archivo JSON de salida (default benchmarks/results/<fecha>_<commit>.json)")
+    args = parser.parse_args()
+    modes = {'micro', 'load', 'train'} if 'all' in args.modes else set(args.modes)
+    output = os.path.abspath(args.output) if args.output else None
+    # app.py y el pipeline usan rutas relativas a la raíz del repo
+    os.chdir(ROOT)
+
+    import torch
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'numpy': np.__version__,
+            'cpu_count': os.cpu_count(),
+            'torch_threads': torch.get_num_threads(),
+            'machine': platform.machine(),
+        },
+        'results': {},
+    }
+
+    if 'micro' in modes:
+        print("Micro-benchmarks...")
+        report['results'].update({f'micro/{k}': v for k, v in run_micro(args.repeat).items()})
+    if 'load' in modes:
+        print("Load test...")
+        rates = [float(r) for r in args.rates.split(',')]
+        report['results'].update({f'load/{k}': v for k, v in run_load(rates, args.duration, args.seq_len, args.url).items()})
+    if 'train' in modes:
+        print("Entrenamiento...")
+        report['results'].update({f'train/{k}': v for k, v in run_train(args.epochs, args.max_windows).items()})
+
+    output = output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{report['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados: {output}")
+
+
+if __name__ == '__main__':
+    main()
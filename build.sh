@@ -1,3 +1,13 @@
 #!/usr/bin/env bash
 pip install --upgrade pip setuptools wheel
 pip install -r requirements-prod.txt
+
+# Formato plano de pesos (mmap) para arranques rápidos de la API
+if [ -f ml/eth_price_model.pth ]; then
+  python ml/weights_format.py || echo "No se pudo convertir el checkpoint; se usará el .pth"
+fi
+
+# Backends optimizados (TorchScript / int8 / ONNX) + elección del default por paridad y latencia
+if [ -f ml/eth_price_model.pth ] && [ -f eth_historical.parquet ]; then
+  python ml/export.py --windows 256 || echo "No se pudieron exportar los backends; la API usará eager"
+fi
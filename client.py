@@ -1,9 +1,14 @@
 import requests
 import json
+import io
 import time
+import random
+import asyncio
 import numpy as np
 from datetime import datetime
 
+from http_retry import parse_retry_after
+
 class ETHPredictionClient:
     def __init__(self, base_url="https://eth-betting-ml.onrender.com"):
         self.base_url = base_url.rstrip('/')
@@ -52,6 +57,39 @@ class ETHPredictionClient:
         except Exception as e:
             return False, {"error": str(e)}
     
+    def predict_many(self, sequences, binary=False, timeout=60):
+        """Realizar varias predicciones en un solo request a /predict/batch.
+
+        Con `binary=True` (y todas las secuencias de igual longitud) el batch se
+        envía como `.npy` float32 en lugar de JSON.
+        """
+        try:
+            if binary:
+                buffer = io.BytesIO()
+                np.save(buffer, np.asarray(sequences, dtype=np.float32), allow_pickle=False)
+                response = self.session.post(
+                    f"{self.base_url}/predict/batch",
+                    data=buffer.getvalue(),
+                    headers={'Content-Type': 'application/x-npy'},
+                    timeout=timeout
+                )
+            else:
+                response = self.session.post(
+                    f"{self.base_url}/predict/batch",
+                    json={"sequences": sequences},
+                    timeout=timeout
+                )
+
+            if response.status_code == 200:
+                return True, response.json()
+            else:
+                return False, response.json()
+
+        except requests.exceptions.Timeout:
+            return False, {"error": "Timeout - el servidor tardó demasiado en responder"}
+        except Exception as e:
+            return False, {"error": str(e)}
+
     def generate_sample_data(self, base_price=3000, length=10):
         """Generar datos de muestra para testing"""
         data = []
@@ -80,6 +118,146 @@ class ETHPredictionClient:
         
         return data
 
+class AsyncETHPredictionClient:
+    """Cliente asyncio para predicciones masivas (requiere `pip install aiohttp`).
+
+    Usa una sola sesión con conexiones HTTP/1.1 keep-alive (hasta `concurrency`
+    abiertas a la vez). Las respuestas 429 y 503 se reintentan respetando
+    `Retry-After`; los errores de red y los 5xx, con backoff exponencial con jitter.
+
+        async with AsyncETHPredictionClient(url, concurrency=64) as client:
+            results = await client.predict_many(sequences)
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url="https://eth-betting-ml.onrender.com", concurrency=32, use_batch=None,
+                 batch_size=256, max_retries=5, backoff_base=0.25, backoff_max=10.0, timeout=30, api_key=None):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncETHPredictionClient requiere aiohttp (pip install aiohttp)")
+        self._aiohttp = aiohttp
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        # None: se detecta con GET / si el servidor publica /predict/batch
+        self.use_batch = use_batch
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.headers = {'User-Agent': 'ETH-Prediction-Client/1.0'}
+        if api_key:
+            self.headers['X-API-Key'] = api_key
+        self.session = None
+        self.retries = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self.session is None:
+            aiohttp = self._aiohttp
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full jitter; con `Retry-After` se espera al menos eso."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay += retry_after
+        return delay
+
+    async def _request(self, method, path, **kwargs):
+        """Devuelve (éxito, json) como `ETHPredictionClient`, reintentando los errores transitorios."""
+        await self.open()
+        aiohttp = self._aiohttp
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = {"error": f"HTTP {response.status}"}
+                    if response.status == 200:
+                        return True, data
+                    if response.status not in self.RETRY_STATUSES or attempt == self.max_retries:
+                        return False, data
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except asyncio.TimeoutError:
+                if attempt == self.max_retries:
+                    return False, {"error": "Timeout - el servidor tardó demasiado en responder"}
+            except aiohttp.ClientError as e:
+                if attempt == self.max_retries:
+                    return False, {"error": str(e)}
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    async def health_check(self):
+        """Verificar estado del servicio"""
+        return await self._request('GET', '/health')
+
+    async def get_info(self):
+        """Obtener información del modelo"""
+        return await self._request('GET', '/info')
+
+    async def supports_batch(self):
+        if self.use_batch is None:
+            success, data = await self._request('GET', '/')
+            endpoints = data.get('endpoints') if isinstance(data, dict) else None
+            self.use_batch = success and isinstance(endpoints, dict) and 'predict_batch' in endpoints
+        return self.use_batch
+
+    async def predict(self, sequence_data):
+        """Realizar predicción"""
+        return await self._request('POST', '/predict', json={"sequence": sequence_data})
+
+    async def _predict_chunk(self, sequences):
+        success, data = await self._request('POST', '/predict/batch', json={"sequences": sequences})
+        if not success:
+            return [(False, data)] * len(sequences)
+        return [(item['success'], item) for item in data['results']]
+
+    async def predict_many(self, sequences):
+        """Predice todas las secuencias con a lo sumo `concurrency` requests en vuelo.
+
+        Devuelve una lista de (éxito, datos) en el mismo orden que `sequences`.
+        Si el servidor tiene `/predict/batch` se envían grupos de `batch_size`.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(coro_fn, *args):
+            async with semaphore:
+                return await coro_fn(*args)
+
+        if await self.supports_batch():
+            chunks = [sequences[i:i + self.batch_size] for i in range(0, len(sequences), self.batch_size)]
+            results = await asyncio.gather(*(limited(self._predict_chunk, chunk) for chunk in chunks))
+            return [item for chunk in results for item in chunk]
+        return list(await asyncio.gather(*(limited(self.predict, seq) for seq in sequences)))
+
+
+async def run_async_demo(base_url, sequences, concurrency=32):
+    async with AsyncETHPredictionClient(base_url, concurrency=concurrency) as client:
+        start_time = time.time()
+        results = await client.predict_many(sequences)
+        return results, time.time() - start_time, client.retries
+
 def main():
     # Inicializar cliente
     client = ETHPredictionClient()
@@ -150,22 +328,36 @@ def main():
     print("\n5. Probando múltiples predicciones...")
     predictions = []
     
-    for i in range(3):
-        test_data = client.generate_sample_data(base_price=3000 + i*100, length=5)
-        success, result = client.predict(test_data)
-        
-        if success:
-            price = result['predicted_price']
-            predictions.append(price)
-            print(f"   Predicción {i+1}: ${price:.2f}")
-        else:
-            print(f"   Predicción {i+1}: Error - {result.get('error', 'Unknown')}")
+    batch = [client.generate_sample_data(base_price=3000 + i*100, length=5) for i in range(3)]
+    success, result = client.predict_many(batch)
+    
+    if success:
+        for item in result['results']:
+            if item['success']:
+                price = item['predicted_price']
+                predictions.append(price)
+                print(f"   Predicción {item['index']+1}: ${price:.2f}")
+            else:
+                print(f"   Predicción {item['index']+1}: Error - {item.get('error', 'Unknown')}")
+    else:
+        print(f"   Error en batch: {result.get('error', 'Unknown')}")
     
     if predictions:
         avg_price = sum(predictions) / len(predictions)
         print(f"   Precio promedio: ${avg_price:.2f}")
         print(f"   Rango: ${min(predictions):.2f} - ${max(predictions):.2f}")
     
+    # 6. Cliente asíncrono
+    print("\n6. Probando cliente asíncrono...")
+    sequences = [client.generate_sample_data(base_price=3000 + i, length=5) for i in range(200)]
+    try:
+        results, elapsed, retries = asyncio.run(run_async_demo(client.base_url, sequences))
+        succeeded = sum(1 for success, _ in results if success)
+        print(f"✅ {succeeded}/{len(results)} predicciones en {elapsed:.2f}s "
+              f"({len(results) / elapsed:.0f} secuencias/s, {retries} reintentos)")
+    except ImportError as e:
+        print(f"⚠️  {e}")
+
     print("\n" + "=" * 50)
     print("🏁 Pruebas completadas")
 
@@ -1,164 +1,189 @@
 // SPDX-License-Identifier: MIT
 pragma solidity ^0.8.19;
 
+// Liquidación "pull": resolveRound solo guarda el precio, el rango ganador y el
+// pozo a repartir (costo fijo, sin importar cuántos apostadores haya). Cada
+// ganador cobra su parte con claim(), calculada con los totales guardados.
 contract ETHPriceBetting {
-    struct PriceRange {
-        uint256 minPrice;
-        uint256 maxPrice;
-        uint256 totalBets;
-        address[] bettors;
-        mapping(address => uint256) betAmounts;
-    }
-    
     struct BettingRound {
-        uint256 id;
-        uint256 targetTime;
-        uint256 actualPrice;
+        uint64 targetTime;
         bool resolved;
+        uint8 winningRange;
+        uint256 actualPrice;
         uint256 totalPool;
-        mapping(uint256 => PriceRange) ranges;
-        uint256 rangeCount;
+        uint256 prizePool; // pozo neto (sin fee); 0 si no hubo ganadores
+        mapping(uint256 => uint256) rangeTotals;
+        mapping(uint256 => mapping(address => uint256)) betAmounts;
+        mapping(address => bool) claimed;
     }
-    
+
     mapping(uint256 => BettingRound) public rounds;
     uint256 public currentRoundId;
     address public oracle;
     address public owner;
-    
+    uint256 public accumulatedFees;
+
+    uint256 public constant FEE_PERCENT = 5;
+    uint256 public constant ROUND_DURATION = 3600;
+
+    // Bordes compartidos por todas las rondas: [priceRanges[i], priceRanges[i + 1])
     uint256[] public priceRanges = [
-        1500e18, 1600e18, 1700e18, 1800e18, 1900e18, 
+        1500e18, 1600e18, 1700e18, 1800e18, 1900e18,
         2000e18, 2100e18, 2200e18, 2300e18, 2400e18, 2500e18
     ];
-    
+    uint256 public immutable rangeCount;
+
     event BetPlaced(uint256 roundId, address bettor, uint256 rangeIndex, uint256 amount);
     event RoundResolved(uint256 roundId, uint256 actualPrice, uint256 winningRange);
     event PrizeDistributed(uint256 roundId, address winner, uint256 amount);
-    
+    event BetRefunded(uint256 roundId, address bettor, uint256 amount);
+    event FeesWithdrawn(address to, uint256 amount);
+
     modifier onlyOracle() {
         require(msg.sender == oracle, "Solo el oraculo puede llamar");
         _;
     }
-    
+
     modifier onlyOwner() {
         require(msg.sender == owner, "Solo el owner puede llamar");
         _;
     }
-    
+
     constructor(address _oracle) {
         owner = msg.sender;
         oracle = _oracle;
+        rangeCount = priceRanges.length - 1;
         currentRoundId = 1;
-        _initializeRound(currentRoundId, block.timestamp + 3600);
+        _initializeRound(currentRoundId, block.timestamp + ROUND_DURATION);
     }
-    
+
     function _initializeRound(uint256 roundId, uint256 targetTime) internal {
-        BettingRound storage round = rounds[roundId];
-        round.id = roundId;
-        round.targetTime = targetTime;
-        round.resolved = false;
-        round.rangeCount = priceRanges.length - 1;
-        
-        for(uint256 i = 0; i < priceRanges.length - 1; i++) {
-            round.ranges[i].minPrice = priceRanges[i];
-            round.ranges[i].maxPrice = priceRanges[i + 1];
-        }
+        rounds[roundId].targetTime = uint64(targetTime);
     }
-    
+
     function placeBet(uint256 roundId, uint256 rangeIndex) external payable {
         require(msg.value > 0, "Debe apostar algo");
         require(roundId == currentRoundId, "Ronda no activa");
-        require(!rounds[roundId].resolved, "Ronda ya resuelta");
-        require(block.timestamp < rounds[roundId].targetTime, "Tiempo agotado");
-        require(rangeIndex < rounds[roundId].rangeCount, "Rango invalido");
-        
+
         BettingRound storage round = rounds[roundId];
-        PriceRange storage range = round.ranges[rangeIndex];
-        
-        if(range.betAmounts[msg.sender] == 0) {
-            range.bettors.push(msg.sender);
-        }
-        
-        range.betAmounts[msg.sender] += msg.value;
-        range.totalBets += msg.value;
+        require(!round.resolved, "Ronda ya resuelta");
+        require(block.timestamp < round.targetTime, "Tiempo agotado");
+        require(rangeIndex < rangeCount, "Rango invalido");
+
+        round.betAmounts[rangeIndex][msg.sender] += msg.value;
+        round.rangeTotals[rangeIndex] += msg.value;
         round.totalPool += msg.value;
-        
+
         emit BetPlaced(roundId, msg.sender, rangeIndex, msg.value);
     }
-    
+
     function resolveRound(uint256 roundId, uint256 actualPrice) external onlyOracle {
-        require(!rounds[roundId].resolved, "Ya resuelta");
-        require(block.timestamp >= rounds[roundId].targetTime, "Aun no es tiempo");
-        
         BettingRound storage round = rounds[roundId];
+        require(round.targetTime != 0, "Ronda inexistente");
+        require(!round.resolved, "Ya resuelta");
+        require(block.timestamp >= round.targetTime, "Aun no es tiempo");
+
+        uint256 winningRange = _findWinningRange(actualPrice);
         round.actualPrice = actualPrice;
         round.resolved = true;
-        
-        uint256 winningRange = _findWinningRange(roundId, actualPrice);
+        round.winningRange = uint8(winningRange);
+
+        // Sin apuestas en el rango ganador (o precio fuera de la tabla) no se
+        // cobra fee: cada apostador recupera lo apostado con claim()
+        if(winningRange < rangeCount && round.rangeTotals[winningRange] > 0) {
+            uint256 ownerFee = round.totalPool * FEE_PERCENT / 100;
+            accumulatedFees += ownerFee;
+            round.prizePool = round.totalPool - ownerFee;
+        }
+
         emit RoundResolved(roundId, actualPrice, winningRange);
-        
-        _distributePrizes(roundId, winningRange);
         _startNewRound();
     }
-    
-    function _findWinningRange(uint256 roundId, uint256 price) internal view returns (uint256) {
-        BettingRound storage round = rounds[roundId];
-        
-        for(uint256 i = 0; i < round.rangeCount; i++) {
-            if(price >= round.ranges[i].minPrice && price < round.ranges[i].maxPrice) {
+
+    function _findWinningRange(uint256 price) internal view returns (uint256) {
+        if(price < priceRanges[0]) return rangeCount; // Fuera de rango
+        for(uint256 i = 0; i < rangeCount; i++) {
+            if(price < priceRanges[i + 1]) {
                 return i;
             }
         }
-        return round.rangeCount; // Fuera de rango
+        return rangeCount; // Fuera de rango
     }
-    
-    function _distributePrizes(uint256 roundId, uint256 winningRange) internal {
+
+    function claim(uint256 roundId) external returns (uint256 amount) {
         BettingRound storage round = rounds[roundId];
-        
-        if(winningRange >= round.rangeCount) return;
-        
-        PriceRange storage winningPriceRange = round.ranges[winningRange];
-        if(winningPriceRange.totalBets == 0) return;
-        
-        uint256 totalPrize = round.totalPool;
-        uint256 ownerFee = totalPrize * 5 / 100; // 5% fee
-        uint256 prizesPool = totalPrize - ownerFee;
-        
-        payable(owner).transfer(ownerFee);
-        
-        for(uint256 i = 0; i < winningPriceRange.bettors.length; i++) {
-            address bettor = winningPriceRange.bettors[i];
-            uint256 betAmount = winningPriceRange.betAmounts[bettor];
-            uint256 prize = (prizesPool * betAmount) / winningPriceRange.totalBets;
-            
-            payable(bettor).transfer(prize);
-            emit PrizeDistributed(roundId, bettor, prize);
+        require(round.resolved, "Ronda no resuelta");
+        require(!round.claimed[msg.sender], "Ya cobrado");
+
+        amount = _claimable(round, msg.sender);
+        require(amount > 0, "Nada para cobrar");
+        round.claimed[msg.sender] = true;
+
+        (bool sent, ) = payable(msg.sender).call{value: amount}("");
+        require(sent, "Transferencia fallida");
+
+        if(round.prizePool > 0) {
+            emit PrizeDistributed(roundId, msg.sender, amount);
+        } else {
+            emit BetRefunded(roundId, msg.sender, amount);
         }
     }
-    
+
+    function claimable(uint256 roundId, address user) external view returns (uint256) {
+        BettingRound storage round = rounds[roundId];
+        if(!round.resolved || round.claimed[user]) return 0;
+        return _claimable(round, user);
+    }
+
+    function _claimable(BettingRound storage round, address user) internal view returns (uint256 amount) {
+        if(round.prizePool > 0) {
+            uint256 winningRange = round.winningRange;
+            return round.prizePool * round.betAmounts[winningRange][user] / round.rangeTotals[winningRange];
+        }
+        for(uint256 i = 0; i < rangeCount; i++) {
+            amount += round.betAmounts[i][user];
+        }
+    }
+
+    function withdrawFees() external onlyOwner {
+        uint256 amount = accumulatedFees;
+        require(amount > 0, "Sin fees");
+        accumulatedFees = 0;
+
+        (bool sent, ) = payable(owner).call{value: amount}("");
+        require(sent, "Transferencia fallida");
+        emit FeesWithdrawn(owner, amount);
+    }
+
     function _startNewRound() internal {
+        // Grilla horaria fija: si el oráculo se atrasa, las rondas siguientes ya
+        // vencieron y se resuelven juntas con PriceOracle.updatePrices
+        uint256 previousTarget = rounds[currentRoundId].targetTime;
         currentRoundId++;
-        _initializeRound(currentRoundId, block.timestamp + 3600);
+        _initializeRound(currentRoundId, previousTarget + ROUND_DURATION);
     }
-    
+
     function getRoundInfo(uint256 roundId) external view returns (
-        uint256 id, uint256 targetTime, uint256 actualPrice, 
+        uint256 id, uint256 targetTime, uint256 actualPrice,
         bool resolved, uint256 totalPool
     ) {
         BettingRound storage round = rounds[roundId];
-        return (round.id, round.targetTime, round.actualPrice, round.resolved, round.totalPool);
+        if(round.targetTime == 0) return (0, 0, 0, false, 0);
+        return (roundId, round.targetTime, round.actualPrice, round.resolved, round.totalPool);
     }
-    
+
     function getRangeInfo(uint256 roundId, uint256 rangeIndex) external view returns (
         uint256 minPrice, uint256 maxPrice, uint256 totalBets
     ) {
+        if(rangeIndex >= rangeCount) return (0, 0, 0);
         return (
-            rounds[roundId].ranges[rangeIndex].minPrice,
-            rounds[roundId].ranges[rangeIndex].maxPrice,
-            rounds[roundId].ranges[rangeIndex].totalBets
+            priceRanges[rangeIndex],
+            priceRanges[rangeIndex + 1],
+            rounds[roundId].rangeTotals[rangeIndex]
         );
     }
-    
+
     function getUserBet(uint256 roundId, uint256 rangeIndex, address user) external view returns (uint256) {
-        return rounds[roundId].ranges[rangeIndex].betAmounts[user];
+        return rounds[roundId].betAmounts[rangeIndex][user];
     }
-}
\ No newline at end of file
+}
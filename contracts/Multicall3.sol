@@ -0,0 +1,33 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.19;
+
+// Subconjunto de Multicall3 (misma ABI que el contrato desplegado en
+// 0xcA11bde05977b3631167028862bE2a173976CA11 en Sepolia y mainnet) para redes
+// locales: agrupa varias lecturas en un solo eth_call.
+contract Multicall3 {
+    struct Call3 {
+        address target;
+        bool allowFailure;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    function aggregate3(Call3[] calldata calls) public payable returns (Result[] memory returnData) {
+        uint256 length = calls.length;
+        returnData = new Result[](length);
+        for (uint256 i = 0; i < length; i++) {
+            Call3 calldata call = calls[i];
+            (bool success, bytes memory result) = call.target.call(call.callData);
+            require(success || call.allowFailure, "Multicall3: call failed");
+            returnData[i] = Result(success, result);
+        }
+    }
+
+    function getBlockNumber() public view returns (uint256 blockNumber) {
+        blockNumber = block.number;
+    }
+}
@@ -8,50 +8,86 @@ interface IBettingContract {
 contract PriceOracle {
     address public owner;
     IBettingContract public bettingContract;
-    
+
+    // Precio, timestamp y ronda en un solo slot
     struct PriceUpdate {
-        uint256 price;
-        uint256 timestamp;
-        uint256 roundId;
+        uint128 price;
+        uint64 timestamp;
+        uint64 roundId;
     }
-    
-    mapping(uint256 => PriceUpdate) public priceUpdates;
+
+    // Historial acotado: las últimas HISTORY_SIZE actualizaciones en un ring
+    // buffer (los slots se reescriben en lugar de crecer). El historial
+    // completo queda en los eventos PriceUpdated.
+    uint256 public constant HISTORY_SIZE = 256;
+    PriceUpdate[HISTORY_SIZE] private history;
     uint256 public updateCount;
-    
+
     event PriceUpdated(uint256 roundId, uint256 price, uint256 timestamp);
-    
+
     modifier onlyOwner() {
         require(msg.sender == owner, "Solo el owner");
         _;
     }
-    
+
     constructor() {
         owner = msg.sender;
     }
-    
+
     function setBettingContract(address _bettingContract) external onlyOwner {
         bettingContract = IBettingContract(_bettingContract);
     }
-    
+
     function updatePrice(uint256 roundId, uint256 price) external onlyOwner {
         require(address(bettingContract) != address(0), "Contrato no configurado");
-        
-        updateCount++;
-        priceUpdates[updateCount] = PriceUpdate({
-            price: price,
-            timestamp: block.timestamp,
-            roundId: roundId
+
+        uint256 count = updateCount + 1;
+        _record(count, roundId, price);
+        updateCount = count;
+    }
+
+    // Resuelve varias rondas atrasadas en una sola transacción, en orden
+    function updatePrices(uint256[] calldata roundIds, uint256[] calldata prices) external onlyOwner {
+        require(address(bettingContract) != address(0), "Contrato no configurado");
+        require(roundIds.length == prices.length, "Largos distintos");
+        require(roundIds.length > 0, "Sin rondas");
+
+        uint256 count = updateCount;
+        for(uint256 i = 0; i < roundIds.length; i++) {
+            count++;
+            _record(count, roundIds[i], prices[i]);
+        }
+        updateCount = count;
+    }
+
+    function _record(uint256 count, uint256 roundId, uint256 price) internal {
+        require(price <= type(uint128).max, "Precio fuera de rango");
+        require(roundId <= type(uint64).max, "Ronda fuera de rango");
+
+        history[count % HISTORY_SIZE] = PriceUpdate({
+            price: uint128(price),
+            timestamp: uint64(block.timestamp),
+            roundId: uint64(roundId)
         });
-        
+
         bettingContract.resolveRound(roundId, price);
         emit PriceUpdated(roundId, price, block.timestamp);
     }
-    
+
+    // Actualización número `updateId` (1..updateCount), si sigue en el historial
+    function priceUpdates(uint256 updateId) external view returns (uint256 price, uint256 timestamp, uint256 roundId) {
+        require(updateId > 0 && updateId <= updateCount, "Actualizacion inexistente");
+        require(updateCount - updateId < HISTORY_SIZE, "Fuera del historial");
+
+        PriceUpdate storage update = history[updateId % HISTORY_SIZE];
+        return (update.price, update.timestamp, update.roundId);
+    }
+
     function getLatestPrice() external view returns (uint256 price, uint256 timestamp) {
         if(updateCount > 0) {
-            PriceUpdate storage latest = priceUpdates[updateCount];
+            PriceUpdate storage latest = history[updateCount % HISTORY_SIZE];
             return (latest.price, latest.timestamp);
         }
         return (0, 0);
     }
-}
\ No newline at end of file
+}
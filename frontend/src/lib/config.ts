@@ -16,6 +16,8 @@ export const CONTRACT_CONFIG = {
     "function getRangeInfo(uint256 roundId, uint256 rangeIndex) view returns (uint256 minPrice, uint256 maxPrice, uint256 totalBets)",
     "function getUserBet(uint256 roundId, uint256 rangeIndex, address user) view returns (uint256)",
     "function placeBet(uint256 roundId, uint256 rangeIndex) payable",
+    "function claim(uint256 roundId) returns (uint256)",
+    "function claimable(uint256 roundId, address user) view returns (uint256)",
     "function resolveRound(uint256 roundId) external",
     "function getWinningRange(uint256 roundId) view returns (uint256)"
   ]
@@ -0,0 +1,35 @@
+# Configuración de gunicorn para app.py: `gunicorn app:app -c gunicorn.conf.py`
+import os
+
+# El modelo se carga en el master antes del fork; los workers heredan los pesos
+# mapeados con mmap y comparten esas páginas (copy-on-write) en lugar de cargar
+# cada uno su copia. Un hilo de carga en el master no sobrevive al fork, por eso
+# se fuerza la carga sincrónica.
+os.environ.setdefault('MODEL_LOAD_MODE', 'sync')
+preload_app = True
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# Con varios workers no se escribe archivo de log por default: cada uno lo
+# rotaría por su cuenta. Los logs van a stdout (ver log_config.py)
+if workers > 1:
+    os.environ.setdefault('LOG_FILE', '')
+
+
+def post_fork(server, worker):
+    # Repartir los cores entre workers: sin esto cada proceso usa todos los
+    # hilos de torch y compiten entre sí
+    import torch
+    default_threads = max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(int(os.environ.get('TORCH_NUM_THREADS', default_threads)))
+
+
+def post_worker_init(worker):
+    # El worker reinicia sus señales al arrancar: se vuelve a instalar el
+    # perfil por señal (PROFILE_SIGNAL, default SIGUSR2) en cada uno
+    from app import profiler
+    from profiling import install_signal_handler
+    install_signal_handler(profiler, name='app')
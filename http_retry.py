@@ -0,0 +1,21 @@
+"""Lectura del header `Retry-After`, compartida por los clientes HTTP del repo
+(`client.py` y `ml/downloader.py`)."""
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """Segundos de espera de un `Retry-After` (segundos o fecha HTTP); None si no se entiende."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
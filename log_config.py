@@ -0,0 +1,226 @@
+"""Configuración de logging no bloqueante para la API y el oráculo.
+
+Los loggers solo encolan el registro (`QueueHandler`); un hilo de fondo
+(`QueueListener`) lo formatea y lo escribe a stdout y/o a un archivo con
+rotación por tamaño. Así las escrituras a disco y a la consola salen del hot
+path de las requests.
+
+- Formato: JSON por línea (`LOG_FORMAT=json`, default) o texto.
+- Niveles: `LOG_LEVEL` global y `LOG_LEVELS=ml.predict=WARNING,werkzeug=INFO`
+  por módulo.
+- Muestreo: cada logger puede emitir hasta `LOG_SAMPLE_RATE` registros INFO/DEBUG
+  por segundo; pasado ese cupo se deja pasar 1 de cada `LOG_SAMPLE_EVERY`. Los
+  WARNING y superiores nunca se muestrean.
+- Varios procesos (workers de gunicorn): apenas el proceso hace fork, el
+  archivo deja de rotarse y pasa a `WatchedFileHandler` en todos los procesos
+  (solo append, se reabre si otro lo movió). Si cada worker rotara el mismo
+  archivo por su cuenta se pisarían y perderían registros; la rotación queda a
+  cargo de logrotate o similar.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Atributos estándar de LogRecord: el resto son campos pasados con `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Limita los registros INFO/DEBUG por logger: `rate` por segundo y después 1 de cada `every`.
+
+    Al primer registro que pasa después de un descarte se le agrega el campo
+    `dropped` con la cantidad de registros omitidos desde el anterior.
+    """
+
+    def __init__(self, rate=20.0, every=100):
+        super().__init__()
+        self.rate = float(rate)
+        self.every = max(1, int(every))
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.dropped_total = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, skipped = self._buckets.get(record.name, (self.rate, now, 0))
+            tokens = min(self.rate, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                keep = True
+                tokens -= 1
+            else:
+                keep = (skipped + 1) % self.every == 0
+            if keep:
+                if skipped:
+                    record.dropped = skipped
+                skipped = 0
+            else:
+                skipped += 1
+                self.dropped_total += 1
+            self._buckets[record.name] = (tokens, now, skipped)
+        return keep
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Encola el registro con el mensaje ya resuelto, pero sin formatearlo.
+
+    `QueueHandler.prepare` formatea en el hilo que loguea; acá solo se resuelven
+    los argumentos y la excepción, el formato (JSON o texto) lo aplica el listener.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_state = {'listener': None, 'handlers': [], 'filter': None}
+
+
+def parse_levels(text):
+    """'ml.predict=WARNING,werkzeug=INFO' -> {'ml.predict': 'WARNING', 'werkzeug': 'INFO'}."""
+    levels = {}
+    for item in (text or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener():
+    log_queue = queue.Queue(-1)
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(_state['filter'])
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *_state['handlers'], respect_handler_level=True)
+    listener.start()
+    _state['listener'] = listener
+
+
+def _without_rotation():
+    """Reemplaza los handlers con rotación por uno de solo append. Devuelve True si cambió alguno."""
+    handlers, changed = [], False
+    for handler in _state['handlers']:
+        if isinstance(handler, logging.handlers.RotatingFileHandler):
+            watched = logging.handlers.WatchedFileHandler(handler.baseFilename, encoding='utf-8')
+            watched.setFormatter(handler.formatter)
+            handler.close()
+            handler, changed = watched, True
+        handlers.append(handler)
+    _state['handlers'] = handlers
+    return changed
+
+
+def _restart_after_fork():
+    # El hilo del listener no sobrevive al fork (workers de gunicorn): cola y hilo nuevos
+    if _state['listener'] is not None:
+        _without_rotation()
+        _start_listener()
+
+
+def _stop_rotation_in_parent():
+    # Con procesos hijos escribiendo el mismo archivo, el padre tampoco rota
+    listener = _state['listener']
+    if listener is None or not any(isinstance(h, logging.handlers.RotatingFileHandler) for h in _state['handlers']):
+        return
+    listener.stop()
+    _without_rotation()
+    _start_listener()
+
+
+def setup_logging(log_file=None, level=None, fmt=None, module_levels=None,
+                  max_bytes=None, backup_count=None, sample_rate=None, sample_every=None):
+    """Configura el logging raíz. Los argumentos en None se toman de las variables de entorno."""
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.environ.get('LOG_FORMAT', 'json')).lower()
+    log_file = log_file if log_file is not None else os.environ.get('LOG_FILE')
+    max_bytes = max_bytes or int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    backup_count = backup_count if backup_count is not None else int(os.environ.get('LOG_BACKUPS', 5))
+    sample_rate = sample_rate if sample_rate is not None else float(os.environ.get('LOG_SAMPLE_RATE', 20))
+    sample_every = sample_every or int(os.environ.get('LOG_SAMPLE_EVERY', 100))
+
+    if _state['listener'] is not None:
+        _state['listener'].stop()
+
+    formatter = JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _state['handlers'] = handlers
+    _state['filter'] = SamplingFilter(sample_rate, sample_every)
+    logging.getLogger().setLevel(level)
+    for name, module_level in {**parse_levels(os.environ.get('LOG_LEVELS')), **(module_levels or {})}.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    first_setup = _state['listener'] is None
+    _start_listener()
+    if first_setup:
+        os.register_at_fork(after_in_child=_restart_after_fork, after_in_parent=_stop_rotation_in_parent)
+        atexit.register(stop_logging)
+    return _state['listener']
+
+
+def stop_logging():
+    """Vacía la cola y detiene el hilo de escritura."""
+    listener = _state['listener']
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def sampling_stats():
+    sampling_filter = _state['filter']
+    if sampling_filter is None:
+        return {}
+    return {
+        'rate_per_logger': sampling_filter.rate,
+        'keep_one_every': sampling_filter.every,
+        'dropped_total': sampling_filter.dropped_total,
+    }
@@ -0,0 +1,112 @@
+"""Backends de inferencia para `ETHPriceLSTM`.
+
+Todos exponen `predict(X)` con X float32 de forma (B, L, 4) ya escalado y
+devuelven B predicciones (escaladas). `predict` es `run(to_input(X))`: armar
+la entrada (tensor o feed de ONNX) y el forward se pueden medir por separado.
+
+- `eager`: el modelo PyTorch tal cual.
+- `torchscript`: el modelo compilado con `torch.jit.script` + `freeze`.
+- `int8`: cuantización dinámica int8 de las capas LSTM y Linear (TorchScript).
+- `onnx`: el modelo exportado a ONNX, ejecutado con onnxruntime (opcional).
+
+Los artefactos los genera `python ml/export.py`, que además verifica la
+paridad numérica contra `eager` y guarda en `ml/backends.json` el backend más
+rápido que pasó la verificación.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS = {
+    'torchscript': 'ml/eth_price_model.ts.pt',
+    'int8': 'ml/eth_price_model.int8.pt',
+    'onnx': 'ml/eth_price_model.onnx',
+}
+BACKENDS = ('eager',) + tuple(ARTIFACTS)
+MANIFEST_PATH = 'ml/backends.json'
+
+
+class TorchBackend:
+    def __init__(self, name, module):
+        self.name = name
+        self.module = module
+
+    def to_input(self, X):
+        import torch
+        return torch.from_numpy(X)
+
+    def run(self, inputs):
+        import torch
+        with torch.no_grad():
+            return self.module(inputs).squeeze(1).numpy()
+
+    def predict(self, X):
+        return self.run(self.to_input(X))
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, path, threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("El backend onnx requiere onnxruntime (pip install onnxruntime)")
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def to_input(self, X):
+        return {self.input_name: np.ascontiguousarray(X, dtype=np.float32)}
+
+    def run(self, inputs):
+        return self.session.run(None, inputs)[0][:, 0]
+
+    def predict(self, X):
+        return self.run(self.to_input(X))
+
+
+def read_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def default_backend(path=MANIFEST_PATH):
+    """Backend elegido por `ml/export.py`, o `eager` si todavía no se corrió."""
+    return read_manifest(path).get('default', 'eager')
+
+
+def load_backend(name, eager_model, reference_path=None):
+    """Crea el backend `name` ('auto' = el del manifest).
+
+    Si se pasa `reference_path` (el checkpoint), un artefacto más viejo que
+    ese archivo se considera desactualizado y se rechaza.
+    """
+    if name == 'auto':
+        name = default_backend()
+    if name == 'eager':
+        return TorchBackend('eager', eager_model)
+    if name not in ARTIFACTS:
+        raise ValueError(f"Backend desconocido: {name} (opciones: {', '.join(BACKENDS)}, auto)")
+
+    path = ARTIFACTS[name]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No existe {path}; correr python ml/export.py")
+    if reference_path and os.path.getmtime(path) < os.path.getmtime(reference_path):
+        raise ValueError(f"{path} es anterior a {reference_path}; correr python ml/export.py")
+
+    if name == 'onnx':
+        return OnnxBackend(path)
+    import torch
+    module = torch.jit.load(path, map_location='cpu')
+    module.eval()
+    return TorchBackend(name, module)
@@ -0,0 +1,223 @@
+"""Backtest del modelo sobre `eth_historical.parquet` con las reglas de `ETHPriceBetting`.
+
+Cada hora del histórico es una ronda: el modelo ve las 168 horas previas y
+predice el precio de la hora siguiente. Las ventanas se arman como vistas sobre
+un único array escalado y pasan por el LSTM en batches grandes, sin red ni
+`predict_next_price`.
+
+Predicción y precio realizado se asignan a los rangos de `priceRanges` del
+contrato (`[min, max)`; fuera de la tabla no gana nadie) y se simula el pozo:
+
+- la "multitud" apuesta `crowd_stake` por rango (`uniform`) o todo al rango del
+  último precio (`persistence`);
+- el modelo apuesta `stake` al rango predicho;
+- si el rango ganador tiene apuestas, el owner cobra el 5% del pozo y el resto
+  se reparte proporcionalmente entre los ganadores. Si no, cada apostador
+  recupera lo apostado (`refunded`), igual que `claim` en el contrato.
+
+    python ml/backtest.py
+    python ml/backtest.py --checkpoints ml/a.pth ml/b.pth --workers 2 --output backtest.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml.price_ranges import load_price_ranges, to_range
+
+PARQUET_PATH = 'eth_historical.parquet'
+FEATURES = ['price', 'volume', 'returns', 'log_returns']
+SEQ_LEN = 168
+FEE_PERCENT = 5
+
+
+def load_features(path=PARQUET_PATH):
+    return pd.read_parquet(path, columns=FEATURES).values.astype(np.float64)
+
+
+# === Inferencia ===
+def predict_windows(model, scaler, features, seq_len=SEQ_LEN, batch_size=2048):
+    """Precio predicho (USD) para cada ventana con target: la ronda `i` predice la fila `i + seq_len`."""
+    import torch
+    scaled = scaler.transform(features).astype(np.float32)
+    windows = sliding_window_view(scaled, seq_len, axis=0).transpose(0, 2, 1)[:-1]
+    preds = np.empty(len(windows), dtype=np.float64)
+    with torch.inference_mode():
+        for start in range(0, len(windows), batch_size):
+            batch = torch.from_numpy(np.ascontiguousarray(windows[start:start + batch_size]))
+            preds[start:start + len(batch)] = model(batch).squeeze(1).numpy()
+    return (preds - scaler.min_[0]) / scaler.scale_[0]
+
+
+# === Simulación ===
+def crowd_bets(last_bucket, n_ranges, crowd='uniform', crowd_stake=1.0):
+    """Apuestas de la multitud (rondas, rangos)."""
+    bets = np.zeros((len(last_bucket), n_ranges))
+    if crowd == 'uniform':
+        bets[:] = crowd_stake
+    elif crowd == 'persistence':
+        in_range = last_bucket < n_ranges
+        bets[np.flatnonzero(in_range), last_bucket[in_range]] = crowd_stake * n_ranges
+    else:
+        raise ValueError(f"Multitud desconocida: {crowd} (opciones: uniform, persistence)")
+    return bets
+
+
+def simulate_pools(predicted_bucket, actual_bucket, last_bucket, n_ranges,
+                   stake=1.0, crowd='uniform', crowd_stake=1.0, fee_percent=FEE_PERCENT):
+    """Reparto de cada ronda según `claim` del contrato; devuelve totales de la simulación."""
+    rounds = np.arange(len(actual_bucket))
+    bets = crowd_bets(last_bucket, n_ranges, crowd, crowd_stake)
+    model_bets = predicted_bucket < n_ranges
+    bets[rounds[model_bets], predicted_bucket[model_bets]] += stake
+
+    pools = bets.sum(axis=1)
+    winner_in_range = actual_bucket < n_ranges
+    winning_bets = np.zeros(len(rounds))
+    winning_bets[winner_in_range] = bets[rounds[winner_in_range], actual_bucket[winner_in_range]]
+    distributed = winner_in_range & (winning_bets > 0)
+
+    fees = np.where(distributed, pools * fee_percent / 100, 0.0)
+    prize_pools = pools - fees
+    model_won = distributed & model_bets & (predicted_bucket == actual_bucket)
+    model_prizes = np.zeros(len(rounds))
+    model_prizes[model_won] = prize_pools[model_won] * stake / winning_bets[model_won]
+    model_prizes[~distributed & model_bets] = stake
+
+    staked = stake * np.count_nonzero(model_bets)
+    returned = float(model_prizes.sum())
+    return {
+        'rounds': int(len(rounds)),
+        'model_bets': int(np.count_nonzero(model_bets)),
+        'model_wins': int(np.count_nonzero(model_won)),
+        'model_staked': round(staked, 6),
+        'model_returned': round(returned, 6),
+        'model_pnl': round(returned - staked, 6),
+        'model_roi': round((returned - staked) / staked, 6) if staked else None,
+        'total_pool': round(float(pools.sum()), 6),
+        'fees': round(float(fees.sum()), 6),
+        'refunded': round(float(pools[~distributed].sum()), 6),
+        'rounds_without_winner': int(np.count_nonzero(~distributed)),
+    }
+
+
+def evaluate(predicted, actual, last, edges, **pool_kwargs):
+    """Métricas de precio y de rangos más la simulación de pozos."""
+    n_ranges = len(edges) - 1
+    predicted_bucket = to_range(predicted, edges)
+    actual_bucket = to_range(actual, edges)
+    last_bucket = to_range(last, edges)
+    in_range = actual_bucket < n_ranges
+    errors = predicted - actual
+
+    return {
+        'mae_usd': round(float(np.abs(errors).mean()), 4),
+        'mape_pct': round(float((np.abs(errors) / actual).mean() * 100), 4),
+        'direction_accuracy': round(float((np.sign(predicted - last) == np.sign(actual - last)).mean()), 4),
+        'range_hit_rate': round(float((predicted_bucket[in_range] == actual_bucket[in_range]).mean()), 4) if in_range.any() else None,
+        'persistence_hit_rate': round(float((last_bucket[in_range] == actual_bucket[in_range]).mean()), 4) if in_range.any() else None,
+        'actual_out_of_range': round(float((~in_range).mean()), 4),
+        'predicted_out_of_range': round(float((predicted_bucket == n_ranges).mean()), 4),
+        'pools': simulate_pools(predicted_bucket, actual_bucket, last_bucket, n_ranges, **pool_kwargs),
+    }
+
+
+# === Backtest ===
+def backtest(checkpoint, features=None, edges=None, seq_len=SEQ_LEN, batch_size=2048, threads=None, **pool_kwargs):
+    import torch
+    from ml.predict import load_model
+
+    if threads:
+        torch.set_num_threads(threads)
+    features = load_features() if features is None else features
+    edges = load_price_ranges() if edges is None else edges
+
+    model, scaler = load_model(checkpoint)
+    started = time.perf_counter()
+    predicted = predict_windows(model, scaler, features, seq_len, batch_size)
+    inference_s = time.perf_counter() - started
+
+    prices = features[:, 0]
+    actual = prices[seq_len:]
+    last = prices[seq_len - 1:-1]
+    result = evaluate(predicted, actual, last, edges, **pool_kwargs)
+    result.update({
+        'checkpoint': checkpoint,
+        'windows': int(len(predicted)),
+        'inference_s': round(inference_s, 3),
+        'windows_per_s': round(len(predicted) / inference_s, 1),
+    })
+    return result
+
+
+def sweep(checkpoints, workers=None, **kwargs):
+    """Backtest de varios checkpoints en paralelo (un proceso por checkpoint, hilos de torch repartidos)."""
+    workers = max(1, min(workers or len(checkpoints), len(checkpoints)))
+    if workers == 1:
+        return [backtest(c, **kwargs) for c in checkpoints]
+    kwargs.setdefault('threads', max(1, (os.cpu_count() or 1) // workers))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn')) as executor:
+        futures = [executor.submit(backtest, c, **kwargs) for c in checkpoints]
+        return [f.result() for f in futures]
+
+
+# === Main ===
+def main():
+    from ml.predict import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checkpoints', nargs='+', default=[MODEL_PATH])
+    parser.add_argument('--workers', type=int, help="Procesos para el sweep (default: uno por checkpoint)")
+    parser.add_argument('--batch-size', type=int, default=2048)
+    parser.add_argument('--ranges', help="Bordes de los rangos en USD, ej. 1500,2000,2500 (default: priceRanges del contrato)")
+    parser.add_argument('--stake', type=float, default=1.0, help="Apuesta del modelo por ronda")
+    parser.add_argument('--crowd', choices=['uniform', 'persistence'], default='uniform')
+    parser.add_argument('--crowd-stake', type=float, default=1.0, help="Apuesta de la multitud por rango y ronda")
+    parser.add_argument('--output', help="Archivo JSON con los resultados")
+    args = parser.parse_args()
+
+    features = load_features()
+    edges = np.array([float(v) for v in args.ranges.split(',')]) if args.ranges else load_price_ranges()
+    print(f"{len(features) - SEQ_LEN} rondas horarias, {len(edges) - 1} rangos "
+          f"(${edges[0]:,.0f} - ${edges[-1]:,.0f}), {len(args.checkpoints)} checkpoint(s)")
+
+    started = time.perf_counter()
+    results = sweep(
+        args.checkpoints, args.workers, features=features, edges=edges, batch_size=args.batch_size,
+        stake=args.stake, crowd=args.crowd, crowd_stake=args.crowd_stake,
+    )
+    elapsed = time.perf_counter() - started
+
+    for r in results:
+        pools = r['pools']
+        print(f"\n📊 {r['checkpoint']} ({r['windows']} ventanas, {r['windows_per_s']:,.0f} ventanas/s)")
+        print(f"   MAE ${r['mae_usd']:.2f} | MAPE {r['mape_pct']:.3f}% | dirección {r['direction_accuracy']:.1%}")
+        print(f"   Acierto de rango {r['range_hit_rate']} (persistencia {r['persistence_hit_rate']}) | "
+              f"fuera de rango: real {r['actual_out_of_range']:.1%}, predicho {r['predicted_out_of_range']:.1%}")
+        print(f"   Pozos: ganó {pools['model_wins']}/{pools['model_bets']} | PnL {pools['model_pnl']:+.2f} "
+              f"(ROI {pools['model_roi']}) | fees {pools['fees']:.2f} | sin ganador {pools['rounds_without_winner']}")
+    print(f"\n⏱️  {elapsed:.1f}s en total")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(),
+                'parquet': PARQUET_PATH,
+                'ranges': edges.tolist(),
+                'crowd': args.crowd,
+                'results': results,
+            }, f, indent=2)
+        print(f"Resultados: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Dataset de ventanas deslizantes sin copias por ventana.
+
+Todas las ventanas se indexan sobre un único array float32 contiguo (en RAM o
+memory-mapped en disco). Un batch se arma con un solo gather sobre la vista
+de `sliding_window_view`, de modo que la única copia es la del batch que va
+al modelo. Con varias series (años/símbolos) concatenadas, las ventanas nunca
+cruzan el límite entre series.
+"""
+import json
+import os
+
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from torch.utils.data import DataLoader, Dataset
+
+from ml.kline_store import DEFAULT_STORE_DIR, KlineStore, to_features
+
+FEATURES = ['price', 'volume', 'returns', 'log_returns']
+
+
+class SlidingWindowDataset(Dataset):
+    """Pares (ventana (seq_len, F), siguiente valor de `target_col`)."""
+
+    def __init__(self, data, seq_len=168, lengths=None, target_col=0):
+        if data.ndim != 2:
+            raise ValueError("data debe ser 2D (filas, features)")
+        if len(data) < seq_len:
+            raise ValueError(f"Datos insuficientes: {len(data)} < {seq_len}")
+        self.data = data
+        self.seq_len = seq_len
+        self.target_col = target_col
+        self.lengths = list(lengths) if lengths is not None else [len(data)]
+        if sum(self.lengths) != len(data):
+            raise ValueError("La suma de lengths no coincide con las filas de data")
+
+        # Inicio válido de cada ventana: la ventana y su target quedan dentro de la misma serie
+        starts, offset = [], 0
+        for length in self.lengths:
+            count = max(length - seq_len - 1, 0)
+            starts.append(np.arange(offset, offset + count, dtype=np.int64))
+            offset += length
+        self.starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+        # Vista (filas - seq_len + 1, seq_len, F) sin copiar datos
+        self.windows = sliding_window_view(data, (seq_len, data.shape[1]))[:, 0]
+
+    @property
+    def num_features(self):
+        return self.data.shape[1]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        start = self.starts[index]
+        window = self.data[start:start + self.seq_len]
+        if not window.flags.writeable:
+            window = np.array(window)
+        target = np.array(self.data[start + self.seq_len, self.target_col:self.target_col + 1])
+        return torch.from_numpy(window), torch.from_numpy(target)
+
+    def __getitems__(self, indices):
+        """Batch completo con un solo gather (lo usa el DataLoader con `collate_batch`)."""
+        starts = self.starts[np.asarray(indices)]
+        X = self.windows[starts]
+        y = self.data[starts + self.seq_len, self.target_col][:, np.newaxis]
+        return torch.from_numpy(np.ascontiguousarray(X)), torch.from_numpy(np.ascontiguousarray(y))
+
+    @classmethod
+    def from_memmap(cls, path, seq_len=168, target_col=0):
+        """Abre un dataset escrito con `write_memmap` sin cargarlo en RAM."""
+        data = np.load(path, mmap_mode='r')
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        return cls(data, seq_len=seq_len, lengths=meta['lengths'], target_col=target_col)
+
+
+def collate_batch(batch):
+    # __getitems__ ya devuelve el batch apilado
+    return batch
+
+
+def make_loader(dataset, batch_size=256, shuffle=True, **kwargs):
+    """DataLoader que arma cada batch con `__getitems__` (un gather por batch)."""
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, collate_fn=collate_batch, **kwargs)
+
+
+def fit_scaler(series_factory, scaler):
+    """Ajusta el scaler recorriendo las series de a una (`partial_fit`)."""
+    for series in series_factory():
+        scaler.partial_fit(np.asarray(series, dtype=np.float64))
+    return scaler
+
+
+def write_memmap(path, series_factory, scaler, features=FEATURES):
+    """Escala y concatena varias series en un `.npy` float32 memory-mapped.
+
+    `series_factory` es un callable que devuelve un iterable nuevo de arrays
+    (filas, F) en cada llamada: se recorre una vez para contar filas y otra
+    para escribir, así nunca hay más de una serie en memoria.
+    """
+    lengths = [len(series) for series in series_factory()]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(sum(lengths), len(features)))
+    offset = 0
+    for series in series_factory():
+        scaled = scaler.transform(np.asarray(series, dtype=np.float64))
+        out[offset:offset + len(scaled)] = scaled
+        offset += len(scaled)
+    out.flush()
+    del out
+
+    with open(f"{path}.json", 'w') as f:
+        json.dump({'lengths': lengths, 'features': list(features)}, f)
+    return lengths
+
+
+def kline_store_series(symbols, interval='1h', start_ms=None, root=DEFAULT_STORE_DIR):
+    """`series_factory` que lee del almacén de velas un símbolo por vez."""
+    def factory():
+        for symbol in symbols:
+            store = KlineStore(root, symbol=symbol, interval=interval)
+            yield to_features(store.read_range(start_ms=start_ms))[FEATURES].values
+    return factory
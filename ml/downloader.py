@@ -0,0 +1,149 @@
+"""Descarga paralela y reanudable de velas históricas.
+
+El rango pedido se divide en chunks de una página (`page_limit` velas) que se
+descargan en paralelo con un pool acotado sobre una sesión HTTP compartida.
+Cada chunk se guarda en disco apenas termina, así que si el proceso se corta
+la siguiente ejecución solo descarga los que faltan. Las requests respetan
+un presupuesto de tasa configurable y se reintentan con backoff exponencial.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_retry import parse_retry_after
+from ml.kline_store import INTERVAL_MS, BinanceKlineSource, klines_to_frame, now_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = os.environ.get('KLINE_DOWNLOAD_DIR', 'data/downloads')
+RETRYABLE_STATUS = {418, 429, 500, 502, 503, 504}
+
+
+class RateBudget:
+    """Token bucket compartido entre hilos: `rate` requests por segundo, ráfagas de hasta `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        while True:
+            with self.lock:
+                current = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (current - self.updated) * self.rate)
+                self.updated = current
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def pooled_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ParallelKlineDownloader:
+    def __init__(self, source=None, checkpoint_dir=DEFAULT_CHECKPOINT_DIR, max_workers=4,
+                 requests_per_second=10, max_retries=5, backoff_base=0.5, backoff_max=30.0,
+                 page_limit=1000):
+        self.source = source or BinanceKlineSource(session=pooled_session(max_workers))
+        self.checkpoint_dir = checkpoint_dir
+        self.max_workers = max_workers
+        self.budget = RateBudget(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.page_limit = page_limit
+
+    # === Chunks ===
+    def chunks(self, interval, start_ms, end_ms):
+        span = self.page_limit * INTERVAL_MS[interval]
+        start = int(start_ms)
+        while start < end_ms:
+            yield start, min(start + span, int(end_ms))
+            start += span
+
+    def _chunk_path(self, symbol, interval, start, end):
+        return os.path.join(self.checkpoint_dir, symbol, interval, f"{start}_{end}.parquet")
+
+    # === Requests ===
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _fetch_with_retry(self, symbol, interval, start, end):
+        for attempt in range(self.max_retries + 1):
+            self.budget.acquire()
+            try:
+                return self.source.fetch(symbol, interval, start, end - 1, limit=self.page_limit)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRYABLE_STATUS or attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt, parse_retry_after(e.response.headers.get('Retry-After')))
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            logger.warning(f"Chunk {symbol} {start}-{end}: reintento {attempt + 1} en {delay:.1f}s")
+            time.sleep(delay)
+
+    def _download_chunk(self, symbol, interval, start, end):
+        path = self._chunk_path(symbol, interval, start, end)
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+
+        df = klines_to_frame(self._fetch_with_retry(symbol, interval, start, end))
+        # Solo se guarda el chunk si todas sus velas ya cerraron
+        if end <= now_ms():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        return df
+
+    # === API ===
+    def download(self, symbol, interval, start_ms, end_ms):
+        """Descarga `[start_ms, end_ms)` y devuelve las velas deduplicadas y ordenadas."""
+        chunks = list(self.chunks(interval, start_ms, end_ms))
+        frames = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._download_chunk, symbol, interval, start, end): (start, end)
+                for start, end in chunks
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                frames.append(future.result())
+                if done % 10 == 0 or done == len(chunks):
+                    logger.info(f"{symbol} {interval}: {done}/{len(chunks)} chunks")
+
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return klines_to_frame([])
+        df = pd.concat(frames, ignore_index=True)
+        return df.drop_duplicates('open_time').sort_values('open_time').reset_index(drop=True)
+
+    def clear_checkpoints(self, symbol, interval):
+        """Borra los chunks guardados (por ejemplo, después de volcarlos al almacén)."""
+        directory = os.path.join(self.checkpoint_dir, symbol, interval)
+        if not os.path.isdir(directory):
+            return
+        for name in os.listdir(directory):
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(directory, name))
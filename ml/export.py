@@ -0,0 +1,211 @@
+"""Exporta el checkpoint a TorchScript, int8 y ONNX y compara los backends en CPU.
+
+1. Genera los artefactos de `ml/backends.py` a partir de `ml/eth_price_model.pth`.
+2. Verifica la paridad contra el modelo eager sobre ventanas de
+   `eth_historical.parquet`: error relativo sobre el precio desescalado y,
+   además, el mismo rango de apuesta de `ETHPriceBetting` en cada ventana.
+3. Mide cada backend en un proceso aparte: latencia con batch 1, throughput
+   con batches grandes y memoria residente.
+4. Guarda los resultados en `ml/backends.json`; el backend más rápido que
+   pasó la paridad queda como default de la API (`INFERENCE_BACKEND=auto`).
+
+Uso: `python ml/export.py [--windows 512] [--skip-bench]`
+"""
+import argparse
+import copy
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml.backends import ARTIFACTS, BACKENDS, MANIFEST_PATH, load_backend
+from ml.price_ranges import load_price_ranges, to_range
+from ml.predict import MODEL_PATH, load_model
+
+PARQUET_PATH = 'eth_historical.parquet'
+FEATURES = ['price', 'volume', 'returns', 'log_returns']
+SEQ_LEN = 168
+
+# Error relativo máximo tolerado sobre el precio predicho, respecto de eager.
+# int8: el error observado es ~7e-3; los rangos del contrato son de $100 (~3%)
+PARITY_TOLERANCE = {'eager': 0.0, 'torchscript': 1e-5, 'onnx': 1e-4, 'int8': 1e-2}
+
+
+# === Exportación ===
+def export_torchscript(model, path):
+    scripted = torch.jit.freeze(torch.jit.script(model.eval()))
+    torch.jit.save(scripted, path)
+
+
+def export_int8(model, path):
+    quantized = torch.ao.quantization.quantize_dynamic(
+        copy.deepcopy(model).eval(), {nn.LSTM, nn.Linear}, dtype=torch.qint8
+    )
+    torch.jit.save(torch.jit.script(quantized), path)
+
+
+def export_onnx(model, path, seq_len=SEQ_LEN):
+    torch.onnx.export(
+        model.eval(), torch.zeros(1, seq_len, 4), path,
+        input_names=['input'], output_names=['price'],
+        dynamic_axes={'input': {0: 'batch', 1: 'sequence'}, 'price': {0: 'batch'}},
+        opset_version=17,
+    )
+
+
+def export_all(model):
+    exported = []
+    for name, exporter in (('torchscript', export_torchscript), ('int8', export_int8), ('onnx', export_onnx)):
+        try:
+            exporter(model, ARTIFACTS[name])
+            exported.append(name)
+            print(f"✅ {name}: {ARTIFACTS[name]} ({os.path.getsize(ARTIFACTS[name]) / 1024:.0f} KB)")
+        except Exception as e:
+            print(f"⚠️  No se pudo exportar {name}: {e}")
+    return exported
+
+
+# === Paridad ===
+def parity_windows(scaler, count=512, seq_len=SEQ_LEN, path=PARQUET_PATH):
+    """`count` ventanas escaladas repartidas a lo largo del histórico."""
+    data = scaler.transform(pd.read_parquet(path, columns=FEATURES).values).astype(np.float32)
+    windows = sliding_window_view(data, seq_len, axis=0).transpose(0, 2, 1)
+    picks = np.linspace(0, len(windows) - 1, min(count, len(windows))).astype(int)
+    return np.ascontiguousarray(windows[picks])
+
+
+def to_price(scaler, pred_scaled):
+    return (np.asarray(pred_scaled, dtype=np.float64) - scaler.min_[0]) / scaler.scale_[0]
+
+
+def check_parity(name, backend, windows, reference, scaler, edges=None):
+    """Pasa si el error relativo está dentro de la tolerancia y cada ventana cae en el mismo rango que eager."""
+    edges = load_price_ranges() if edges is None else edges
+    prices = to_price(scaler, backend.predict(windows))
+    rel_error = np.abs(prices - reference) / np.abs(reference)
+    reference_ranges = to_range(reference, edges)
+    result = {
+        'max_rel_error': float(rel_error.max()),
+        'mean_abs_error_usd': float(np.abs(prices - reference).mean()),
+        'tolerance': PARITY_TOLERANCE[name],
+        'range_mismatches': int(np.count_nonzero(to_range(prices, edges) != reference_ranges)),
+        'windows_in_table': int(np.count_nonzero(reference_ranges < len(edges) - 1)),
+    }
+    result['passed'] = result['max_rel_error'] <= result['tolerance'] and result['range_mismatches'] == 0
+    return result
+
+
+# === Benchmark ===
+def _rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def _bench_worker(name, windows, batch_size, iterations, queue):
+    """Corre en un proceso nuevo para que la memoria medida sea solo la de este backend."""
+    torch.set_num_threads(int(os.environ.get('TORCH_NUM_THREADS', os.cpu_count() or 1)))
+    baseline = _rss_mb()
+    model, _ = load_model(MODEL_PATH)
+    backend = load_backend(name, model)
+    if name != 'eager':
+        del model
+    backend.predict(windows[:batch_size])
+
+    single = []
+    for i in range(iterations):
+        x = windows[i % len(windows)][np.newaxis]
+        started = time.perf_counter()
+        backend.predict(x)
+        single.append(time.perf_counter() - started)
+
+    batches = [windows[i:i + batch_size] for i in range(0, len(windows), batch_size)]
+    started = time.perf_counter()
+    for batch in batches:
+        backend.predict(batch)
+    elapsed = time.perf_counter() - started
+
+    single_ms = np.array(single) * 1000
+    queue.put({
+        'latency_p50_ms': round(float(np.percentile(single_ms, 50)), 3),
+        'latency_p99_ms': round(float(np.percentile(single_ms, 99)), 3),
+        'throughput_windows_s': round(len(windows) / elapsed, 1),
+        'rss_mb': round(_rss_mb() - baseline, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+
+def benchmark(name, windows, batch_size=64, iterations=200):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_bench_worker, args=(name, windows, batch_size, iterations, queue))
+    process.start()
+    try:
+        return queue.get(timeout=600)
+    finally:
+        process.join()
+
+
+# === Main ===
+def main():
+    parser = argparse.ArgumentParser(description="Exporta y compara backends de inferencia")
+    parser.add_argument('--windows', type=int, default=512, help="Ventanas de eth_historical.parquet para paridad/benchmark")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--skip-bench', action='store_true', help="Solo exportar y verificar paridad")
+    args = parser.parse_args()
+
+    model, scaler = load_model(MODEL_PATH)
+    exported = export_all(model)
+
+    windows = parity_windows(scaler, count=args.windows)
+    reference = to_price(scaler, load_backend('eager', model).predict(windows))
+    print(f"\nParidad sobre {len(windows)} ventanas de {PARQUET_PATH}:")
+
+    results = {}
+    for name in [b for b in BACKENDS if b == 'eager' or b in exported]:
+        try:
+            results[name] = {'parity': check_parity(name, load_backend(name, model), windows, reference, scaler)}
+        except Exception as e:
+            print(f"⚠️  {name}: {e}")
+            continue
+        parity = results[name]['parity']
+        print(f"  {'✅' if parity['passed'] else '❌'} {name:<12} error rel. máx {parity['max_rel_error']:.2e} "
+              f"(tolerancia {parity['tolerance']:.0e}), MAE ${parity['mean_abs_error_usd']:.4f}, "
+              f"rangos distintos {parity['range_mismatches']}/{parity['windows_in_table']} en la tabla")
+
+    if args.skip_bench:
+        return
+
+    print(f"\nBenchmark CPU ({torch.get_num_threads()} hilos):")
+    for name in results:
+        results[name]['bench'] = benchmark(name, windows, batch_size=args.batch_size)
+        bench = results[name]['bench']
+        print(f"  {name:<12} p50 {bench['latency_p50_ms']:>7} ms   p99 {bench['latency_p99_ms']:>7} ms   "
+              f"{bench['throughput_windows_s']:>9} ventanas/s   +{bench['rss_mb']} MB")
+
+    # Default: la menor latencia con batch 1 (el caso de /predict) entre los que pasan la paridad
+    candidates = [n for n, r in results.items() if r['parity']['passed'] and 'bench' in r]
+    default = min(candidates, key=lambda n: results[n]['bench']['latency_p50_ms']) if candidates else 'eager'
+    manifest = {
+        'default': default,
+        'generated_at': datetime.now().isoformat(),
+        'source': MODEL_PATH,
+        'windows': len(windows),
+        'backends': results,
+    }
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"\nBackend por defecto: {default} (guardado en {MANIFEST_PATH})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Almacén local de velas (klines) particionado por mes.
+
+Las velas cerradas se guardan en `<root>/<SYMBOL>/<interval>/YYYY-MM.parquet`
+con las columnas mínimas (`open_time`, `close`, `volume`). Cada sincronización
+descarga solo el hueco desde el último `open_time` guardado y reescribe
+únicamente las particiones de los meses que reciben velas nuevas (en el uso
+normal, la del mes en curso).
+Las lecturas cargan solo las columnas y particiones necesarias, con
+memory-mapping.
+"""
+import glob
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+KLINE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base', 'taker_buy_quote', 'ignore'
+]
+STORE_COLUMNS = ['open_time', 'close', 'volume']
+INTERVAL_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000}
+DEFAULT_STORE_DIR = os.environ.get('KLINE_STORE_DIR', 'data/klines')
+LEGACY_PARQUET = 'eth_historical.parquet'
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+# === Fuentes de velas ===
+class BinanceKlineSource:
+    """Descarga velas de la API pública de Binance reutilizando la conexión."""
+
+    url = "https://api.binance.com/api/v3/klines"
+
+    def __init__(self, session=None, timeout=15):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def fetch(self, symbol, interval, start_ms, end_ms, limit=1000):
+        params = {
+            'symbol': symbol,
+            'interval': interval,
+            'startTime': int(start_ms),
+            'endTime': int(end_ms),
+            'limit': limit
+        }
+        response = self.session.get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+class FakeKlineSource:
+    """Fuente determinística que reemplaza a Binance en tests y desarrollo local.
+
+    Cada vela depende solo de su `open_time` y de la semilla, así que el
+    resultado no cambia con la forma en que se pagina la descarga.
+    """
+
+    def __init__(self, base_price=3000.0, seed=0, now=None):
+        self.base_price = base_price
+        self.seed = seed
+        self.now = now
+        self.calls = 0
+
+    def _candle(self, open_time, interval_ms):
+        k = open_time // interval_ms
+        rng = np.random.default_rng([self.seed, k])
+        close = self.base_price * np.exp(0.1 * np.sin(k / 100) + 0.01 * rng.standard_normal())
+        open_ = close * (1 + 0.002 * rng.standard_normal())
+        high = max(open_, close) * (1 + abs(0.003 * rng.standard_normal()))
+        low = min(open_, close) * (1 - abs(0.003 * rng.standard_normal()))
+        volume = 1000 + 500 * rng.random()
+        return [
+            int(open_time), f"{open_:.2f}", f"{high:.2f}", f"{low:.2f}", f"{close:.2f}", f"{volume:.4f}",
+            int(open_time + interval_ms - 1), "0", 0, "0", "0", "0"
+        ]
+
+    def fetch(self, symbol, interval, start_ms, end_ms, limit=1000):
+        self.calls += 1
+        interval_ms = INTERVAL_MS[interval]
+        current = self.now if self.now is not None else now_ms()
+        end_ms = min(int(end_ms), current)
+        first = -(-int(start_ms) // interval_ms) * interval_ms
+        return [
+            self._candle(t, interval_ms)
+            for t in range(first, end_ms + 1, interval_ms)
+        ][:limit]
+
+
+def klines_to_frame(klines):
+    """Convierte la respuesta de /klines al esquema del almacén."""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    return pd.DataFrame({
+        'open_time': df['open_time'].astype('int64'),
+        'close': df['close'].astype(float),
+        'volume': df['volume'].astype(float),
+        'close_time': df['close_time'].astype('int64'),
+    })
+
+
+def to_features(df):
+    """Agrega las features del modelo (mismo cálculo que el pipeline original)."""
+    out = pd.DataFrame({
+        'timestamp': pd.to_datetime(df['open_time'], unit='ms'),
+        'price': df['close'].astype(float).values,
+        'volume': df['volume'].astype(float).values,
+    })
+    out['returns'] = out['price'].pct_change().fillna(0)
+    out['log_returns'] = np.log(out['price'] / out['price'].shift(1)).fillna(0)
+    return out.sort_values('timestamp').reset_index(drop=True)
+
+
+# === Almacén ===
+class KlineStore:
+    def __init__(self, root=DEFAULT_STORE_DIR, symbol='ETHUSDT', interval='1h'):
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.path = os.path.join(root, symbol, interval)
+        self._last_open_time = None
+
+    # --- Particiones ---
+    def _partition_path(self, month):
+        return os.path.join(self.path, f"{month}.parquet")
+
+    def partitions(self):
+        """Particiones existentes, de la más vieja a la más nueva."""
+        return sorted(glob.glob(os.path.join(self.path, '????-??.parquet')))
+
+    @staticmethod
+    def _month_of(open_time):
+        return datetime.fromtimestamp(open_time / 1000, tz=timezone.utc).strftime('%Y-%m')
+
+    @staticmethod
+    def _read(path, columns=STORE_COLUMNS):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+
+    def _write(self, path, df):
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def is_empty(self):
+        return not self.partitions()
+
+    def first_open_time(self):
+        partitions = self.partitions()
+        if not partitions:
+            return None
+        return int(self._read(partitions[0], ['open_time'])['open_time'].min())
+
+    def last_open_time(self):
+        if self._last_open_time is None:
+            partitions = self.partitions()
+            if partitions:
+                self._last_open_time = int(self._read(partitions[-1], ['open_time'])['open_time'].max())
+        return self._last_open_time
+
+    # --- Escritura ---
+    def append(self, df):
+        """Agrega velas que no estén guardadas. Devuelve cuántas se escribieron.
+
+        Solo se reescriben las particiones de los meses que reciben velas nuevas;
+        las velas ya guardadas nunca se modifican.
+        """
+        if df.empty:
+            return 0
+        df = df[STORE_COLUMNS].drop_duplicates('open_time').sort_values('open_time')
+        last = self.last_open_time()
+        # Caso común: todo es posterior a lo guardado y no hace falta deduplicar
+        only_newer = last is not None and df['open_time'].iloc[0] > last
+
+        os.makedirs(self.path, exist_ok=True)
+        added = 0
+        months = df['open_time'].map(self._month_of)
+        for month, chunk in df.groupby(months, sort=True):
+            path = self._partition_path(month)
+            if os.path.exists(path):
+                existing = self._read(path)
+                if not only_newer:
+                    chunk = chunk[~chunk['open_time'].isin(existing['open_time'])]
+                    if chunk.empty:
+                        continue
+                chunk = pd.concat([existing, chunk], ignore_index=True).sort_values('open_time')
+                added += len(chunk) - len(existing)
+            else:
+                added += len(chunk)
+            self._write(path, chunk.reset_index(drop=True))
+
+        newest = int(df['open_time'].iloc[-1])
+        self._last_open_time = newest if last is None else max(last, newest)
+        return added
+
+    def bootstrap_from_parquet(self, path=LEGACY_PARQUET):
+        """Inicializa el almacén vacío desde `eth_historical.parquet` (timestamp/price/volume)."""
+        if not self.is_empty() or not os.path.exists(path):
+            return 0
+        legacy = pd.read_parquet(path, columns=['timestamp', 'price', 'volume'])
+        df = pd.DataFrame({
+            # A milisegundos sin asumir la resolución guardada (ns, us o ms según pandas)
+            'open_time': pd.to_datetime(legacy['timestamp']).astype('datetime64[ms]').astype('int64'),
+            'close': legacy['price'].astype(float),
+            'volume': legacy['volume'].astype(float),
+        })
+        added = self.append(df)
+        logger.info(f"Almacén inicializado desde {path}: {added} velas")
+        return added
+
+    def _fetch_range(self, source, start_ms, end_ms, page_limit, downloader=None):
+        added = 0
+        closed_before = min(end_ms, now_ms())
+        if downloader is not None:
+            df = downloader.download(self.symbol, self.interval, start_ms, end_ms)
+            return self.append(df[df['close_time'] < closed_before])
+        while start_ms < end_ms:
+            klines = source.fetch(self.symbol, self.interval, start_ms, end_ms - 1, limit=page_limit)
+            if not klines:
+                break
+            page = klines_to_frame(klines)
+            added += self.append(page[page['close_time'] < closed_before])
+            start_ms = int(klines[-1][0]) + self.interval_ms
+            if len(klines) < page_limit:
+                break
+        return added
+
+    def sync(self, source=None, start_ms=None, end_ms=None, page_limit=1000, downloader=None):
+        """Completa el almacén para cubrir `[start_ms, end_ms)`.
+
+        Descarga solo lo que falta: velas anteriores a la primera guardada (si
+        `start_ms` es más viejo) y el hueco desde la última hasta `end_ms`. Se
+        guardan únicamente velas cerradas. Con `downloader` (un
+        `ParallelKlineDownloader`) los huecos grandes se descargan en paralelo.
+        Devuelve la cantidad agregada.
+        """
+        source = source or BinanceKlineSource()
+        end_ms = end_ms or now_ms()
+        if self.is_empty():
+            self.bootstrap_from_parquet()
+
+        added = 0
+        first = self.first_open_time()
+        if first is None:
+            start = start_ms if start_ms is not None else end_ms - 24 * self.interval_ms
+            added += self._fetch_range(source, start, end_ms, page_limit, downloader)
+        else:
+            if start_ms is not None and start_ms < first:
+                added += self._fetch_range(source, start_ms, first, page_limit, downloader)
+            added += self._fetch_range(source, self.last_open_time() + self.interval_ms, end_ms, page_limit, downloader)
+
+        if added:
+            logger.info(f"{self.symbol} {self.interval}: {added} velas nuevas")
+        return added
+
+    # --- Lectura ---
+    def latest(self, n):
+        """Últimas `n` velas, leyendo solo las particiones necesarias."""
+        frames, rows = [], 0
+        for path in reversed(self.partitions()):
+            frame = self._read(path)
+            frames.append(frame)
+            rows += len(frame)
+            if rows >= n:
+                break
+        if not frames:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        return pd.concat(frames[::-1], ignore_index=True).tail(n).reset_index(drop=True)
+
+    def read_range(self, start_ms=None, end_ms=None):
+        """Velas con `start_ms <= open_time < end_ms`."""
+        first_month = self._month_of(start_ms) if start_ms is not None else None
+        last_month = self._month_of(end_ms) if end_ms is not None else None
+        frames = []
+        for path in self.partitions():
+            month = os.path.basename(path)[:7]
+            if (first_month and month < first_month) or (last_month and month > last_month):
+                continue
+            frames.append(self._read(path))
+        if not frames:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        if start_ms is not None:
+            df = df[df['open_time'] >= start_ms]
+        if end_ms is not None:
+            df = df[df['open_time'] < end_ms]
+        return df.reset_index(drop=True)
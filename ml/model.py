@@ -0,0 +1,21 @@
+import torch.nn as nn
+
+# Modelo LSTM con capas densas para predecir precio ETH.
+# Definido en un módulo propio (solo depende de torch) para que la API pueda
+# importarlo de forma perezosa sin arrastrar pandas/sklearn/requests.
+class ETHPriceLSTM(nn.Module):
+    def __init__(self, input_size, hidden_size=128, num_layers=2, dropout=0.3):
+        super().__init__()
+        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=dropout)
+        self.fc1 = nn.Linear(hidden_size, 64)
+        self.fc2 = nn.Linear(64, 1)
+        self.relu = nn.ReLU()
+        self.dropout = nn.Dropout(dropout)
+
+    def forward(self, x):
+        out, _ = self.lstm(x)
+        out = out[:, -1, :]
+        out = self.relu(self.fc1(out))
+        out = self.dropout(out)
+        out = self.fc2(out)
+        return out
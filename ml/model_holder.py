@@ -0,0 +1,168 @@
+"""Modelo residente compartido por el oráculo y `predict_next_price`.
+
+El checkpoint se carga una sola vez y se recarga solo cuando el archivo cambia
+(tamaño o mtime). El hash SHA256 se calcula de forma perezosa y se guarda en
+un archivo `<checkpoint>.sha256.json` junto con el tamaño y mtime, así los
+arranques siguientes no vuelven a leer el checkpoint completo.
+
+El hash se toma al cargar y se guarda junto con el modelo: `model_hash` es el
+del modelo en memoria, no el del archivo en disco (que puede haber cambiado
+antes de que el watcher recargue).
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA256 del archivo, reutilizando el valor cacheado si tamaño y mtime no cambiaron."""
+    size, mtime_ns = file_signature(path)
+    key = (os.path.abspath(path), size, mtime_ns)
+    with _hash_lock:
+        if key in _hash_cache:
+            return _hash_cache[key]
+
+    sidecar = f"{path}.sha256.json"
+    try:
+        with open(sidecar) as f:
+            cached = json.load(f)
+        if cached.get('size') == size and cached.get('mtime_ns') == mtime_ns:
+            with _hash_lock:
+                _hash_cache[key] = cached['sha256']
+            return cached['sha256']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_cache[key] = value
+    try:
+        with open(sidecar, 'w') as f:
+            json.dump({'size': size, 'mtime_ns': mtime_ns, 'sha256': value}, f)
+    except OSError:
+        # Directorio de solo lectura: queda solo el cache en memoria
+        pass
+    return value
+
+
+class ModelHolder:
+    """Carga perezosa del modelo con recarga en caliente cuando cambia el checkpoint."""
+
+    def __init__(self, path, loader, check_interval=5.0):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._loaded = None
+        # (model, scaler, hash) reemplazado de una sola vez para lecturas consistentes sin lock
+        self._current = None
+        self._signature = None
+        self._last_check = 0.0
+        self._watcher = None
+
+        self.load_time = None
+        self.loaded_at = None
+        self.reload_count = 0
+
+    def _load(self):
+        # Llamar con el lock tomado
+        signature = file_signature(self.path)
+        model_hash = file_hash(self.path)
+        started = time.perf_counter()
+        model, scaler = self.loader(self.path)
+        self.load_time = time.perf_counter() - started
+        if file_signature(self.path) != signature:
+            # El archivo cambió durante la carga: el hash puede no ser el de lo cargado.
+            # Sin hash no se cachean predicciones; el watcher recarga en la próxima pasada.
+            model_hash = None
+        if self._loaded is not None:
+            self.reload_count += 1
+            logger.info(f"Modelo recargado desde {self.path} ({self.load_time * 1000:.0f} ms)")
+        else:
+            logger.info(f"Modelo cargado desde {self.path} ({self.load_time * 1000:.0f} ms)")
+        self._loaded = (model, scaler)
+        self._current = (model, scaler, model_hash)
+        self._signature = signature
+        self.loaded_at = datetime.now().isoformat()
+
+    def maybe_reload(self):
+        """Recarga si el archivo cambió. Devuelve True si hubo recarga."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                changed = file_signature(self.path) != self._signature
+            except OSError:
+                return False
+            if self._loaded is None or not changed:
+                return False
+            try:
+                self._load()
+            except Exception as e:
+                # Checkpoint a medio escribir o inválido: se sigue con el anterior
+                logger.error(f"Error recargando modelo, se mantiene el anterior: {e}")
+                return False
+            return True
+
+    def get(self):
+        """Devuelve (model, scaler), cargando o recargando si hace falta."""
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    self._load()
+                    self._last_check = time.monotonic()
+        elif self._watcher is None and time.monotonic() - self._last_check >= self.check_interval:
+            self.maybe_reload()
+        return self._loaded
+
+    def get_with_hash(self):
+        """Devuelve (model, scaler, hash) del mismo modelo, aunque haya una recarga en paralelo."""
+        self.get()
+        return self._current
+
+    @property
+    def model_hash(self):
+        """Hash del checkpoint tal como se cargó (None si todavía no hay modelo)."""
+        return self._current[2] if self._current is not None else None
+
+    def start_watching(self, interval=None):
+        """Hilo de fondo que revisa el checkpoint cada `interval` segundos."""
+        if self._watcher is not None:
+            return
+        interval = interval or self.check_interval
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                self.maybe_reload()
+
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'loaded': self._loaded is not None,
+            'loaded_at': self.loaded_at,
+            'load_time_ms': round(self.load_time * 1000, 2) if self.load_time is not None else None,
+            'reload_count': self.reload_count,
+        }
@@ -1,16 +1,20 @@
 import torch
-import torch.nn as nn
-import pandas as pd
 import numpy as np
 import requests
 import json
 import os
+import sys
 import logging
-import hashlib
 from datetime import datetime
 from sklearn.preprocessing import MinMaxScaler
 import sklearn.preprocessing._data
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml.prediction_cache import PredictionCache
+from ml.kline_store import KlineStore, to_features, now_ms, INTERVAL_MS
+from ml.model import ETHPriceLSTM
+from ml.model_holder import ModelHolder, file_hash
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -27,35 +31,21 @@ torch.serialization.add_safe_globals([
     tuple
 ])
 
-# MCP - Genera hash SHA256 del modelo
+# MCP - Genera hash SHA256 del modelo (cacheado por tamaño y mtime del archivo)
 def generate_model_hash(path):
-    with open(path, "rb") as f:
-        return hashlib.sha256(f.read()).hexdigest()
+    return file_hash(path)
 
 MODEL_PATH = 'ml/eth_price_model.pth'
-MODEL_HASH = generate_model_hash(MODEL_PATH)
 MODEL_VERSION = "v1.0.0"
 
-class ETHPriceLSTM(nn.Module):
-    def __init__(self, input_size, hidden_size=128, num_layers=2, dropout=0.3):
-        super().__init__()
-        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=dropout)
-        self.fc1 = nn.Linear(hidden_size, 64)
-        self.fc2 = nn.Linear(64, 1)
-        self.relu = nn.ReLU()
-        self.dropout = nn.Dropout(dropout)
-
-    def forward(self, x):
-        out, _ = self.lstm(x)
-        out = out[:, -1, :]
-        out = self.relu(self.fc1(out))
-        out = self.dropout(out)
-        out = self.fc2(out)
-        return out
-
-def load_model():
+# Cache de predicciones: evita repetir el forward sobre la misma ventana de 168h
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 256)),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+)
+
+def load_model(path=MODEL_PATH):
     """Carga el modelo y el scaler desde checkpoint."""
-    path = MODEL_PATH
     if not os.path.exists(path):
         raise FileNotFoundError(f"Modelo no encontrado en {path}")
 
@@ -70,6 +60,9 @@ def load_model():
 
     return model, scaler
 
+# Modelo residente: se carga una vez y se recarga solo si cambia el checkpoint
+model_holder = ModelHolder(MODEL_PATH, loader=load_model)
+
 def get_current_eth_price():
     """Obtiene precio ETH actual desde Binance."""
     try:
@@ -93,41 +86,28 @@ def get_current_eth_price():
             logger.error(f"Error obteniendo precio de CoinGecko: {e2}")
             return 3500.0
 
-def get_eth_historical_data(hours=200):
-    """Descarga datos históricos horarios de ETH de Binance."""
-    try:
-        end_time = int(datetime.now().timestamp() * 1000)
-        start_time = end_time - hours * 60 * 60 * 1000
-
-        url = "https://api.binance.com/api/v3/klines"
-        params = {
-            'symbol': 'ETHUSDT',
-            'interval': '1h',
-            'startTime': start_time,
-            'endTime': end_time,
-            'limit': min(1000, hours)
-        }
-
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-
-        df = pd.DataFrame(data, columns=[
-            'open_time', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
+def get_eth_historical_data(hours=200, store=None, source=None, end_ms=None):
+    """Obtiene las últimas velas horarias de ETH desde el almacén local.
 
-        df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
-        df['price'] = df['close'].astype(float)
-        df['volume'] = df['volume'].astype(float)
-
-        df['returns'] = df['price'].pct_change().fillna(0)
-        df['log_returns'] = np.log(df['price'] / df['price'].shift(1)).fillna(0)
-
-        df = df[['timestamp', 'price', 'volume', 'returns', 'log_returns']].sort_values('timestamp')
-
-        logger.info(f"Histórico Binance: {len(df)} registros")
+    Solo se descarga de Binance (o de `source`) el hueco desde la última vela guardada.
+    Con `end_ms` devuelve las velas ya cerradas a ese momento; si falta la última
+    (Binance no la devolvió todavía) se lanza ValueError en lugar de usar una ventana corrida.
+    """
+    try:
+        store = store or KlineStore()
+        if end_ms is None:
+            store.sync(source, start_ms=now_ms() - hours * 60 * 60 * 1000)
+            df = store.latest(hours)
+        else:
+            hour_ms = INTERVAL_MS['1h']
+            last_open = (end_ms // hour_ms - 1) * hour_ms
+            store.sync(source, start_ms=last_open - (hours - 1) * hour_ms, end_ms=last_open + hour_ms)
+            df = store.read_range(last_open - (hours - 1) * hour_ms, last_open + hour_ms)
+            if df.empty or int(df['open_time'].iloc[-1]) != last_open:
+                raise ValueError(f"Falta la vela de {datetime.fromtimestamp(last_open / 1000)}")
+        df = to_features(df)
+
+        logger.info(f"Histórico local: {len(df)} registros")
         return df
 
     except Exception as e:
@@ -150,36 +130,49 @@ def create_prediction_sequence(df, seq_len=168, scaler=None):
 
     return sequence_tensor
 
-def predict_next_price(model=None, scaler=None):
-    """Predice el próximo precio de ETH basado en los datos históricos."""
+def predict_next_price(model=None, scaler=None, as_of=None):
+    """Predice el próximo precio de ETH basado en los datos históricos.
+
+    Con `as_of` (timestamp en segundos) usa solo las velas cerradas a ese momento:
+    la misma ronda da la misma predicción aunque se resuelva tarde.
+    """
+    model_hash = None
     if model is None or scaler is None:
-        logger.info("Cargando modelo (si no se pasó como argumento)...")
-        loaded_model, loaded_scaler = load_model()
+        loaded_model, loaded_scaler, model_hash = model_holder.get_with_hash()
     else:
-        logger.info("Usando modelo y scaler pre-cargados.")
+        logger.debug("Usando modelo y scaler pre-cargados.")
         loaded_model = model
         loaded_scaler = scaler
 
     seq_len = 168
 
-    logger.info("Obteniendo datos históricos...")
-    df = get_eth_historical_data(hours=seq_len + 10)
+    logger.debug("Obteniendo datos históricos...")
+    df = get_eth_historical_data(hours=seq_len + 10, end_ms=as_of * 1000 if as_of is not None else None)
 
     if len(df) < seq_len:
         raise ValueError(f"Datos insuficientes: {len(df)} < {seq_len}")
 
-    logger.info("Preparando secuencia para predicción...")
+    logger.debug("Preparando secuencia para predicción...")
     X = create_prediction_sequence(df, seq_len, scaler=loaded_scaler)
 
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    logger.info(f"Usando dispositivo: {device}")
+    logger.debug(f"Usando dispositivo: {device}")
 
     loaded_model.to(device)
     X = X.to(device)
 
-    logger.info("Realizando predicción...")
-    with torch.no_grad():
-        pred_scaled = loaded_model(X).cpu().numpy()
+    # Solo se cachea con el modelo del checkpoint, con el hash tomado al cargarlo
+    cache_key = PredictionCache.make_key(X.cpu().numpy())
+    pred_scaled = prediction_cache.get(cache_key, model_hash) if model_hash else None
+
+    if pred_scaled is None:
+        logger.debug("Realizando predicción...")
+        with torch.no_grad():
+            pred_scaled = loaded_model(X).cpu().numpy()
+        if model_hash:
+            prediction_cache.put(cache_key, model_hash, pred_scaled)
+    else:
+        logger.debug("Predicción obtenida del cache.")
 
     dummy_data = np.zeros((pred_scaled.shape[0], 4))
     dummy_data[:, 0] = pred_scaled.flatten()
@@ -202,7 +195,7 @@ def predict_next_price(model=None, scaler=None):
             'features': ['price', 'volume', 'returns', 'log_returns']
         },
         'model_context_protocol': {
-            'model_hash': MODEL_HASH,
+            'model_hash': model_hash or model_holder.model_hash,
             'model_version': MODEL_VERSION
         }
     }
@@ -0,0 +1,87 @@
+"""Cache de predicciones indexado por contenido de la secuencia escalada.
+
+La clave es el SHA256 de los bytes de la secuencia (más su forma) combinado con
+el hash del modelo. Si llega una consulta con un hash de modelo distinto al
+actual, el cache se vacía automáticamente.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """Cache LRU acotado con TTL por entrada y contadores de hit/miss."""
+
+    def __init__(self, max_entries=4096, ttl_seconds=300.0):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_hash = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(sequence):
+        array = np.ascontiguousarray(sequence, dtype=np.float32)
+        digest = hashlib.sha256(array.tobytes())
+        digest.update(str(array.shape).encode())
+        return digest.hexdigest()
+
+    def _bind_model(self, model_hash):
+        # Llamar con el lock tomado
+        if model_hash != self._model_hash:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._model_hash = model_hash
+
+    def get(self, key, model_hash):
+        """Devuelve el valor cacheado o None."""
+        with self._lock:
+            self._bind_model(model_hash)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, model_hash, value):
+        with self._lock:
+            self._bind_model(model_hash)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "model_hash": self._model_hash,
+            }
@@ -0,0 +1,23 @@
+"""Tabla de rangos de `ETHPriceBetting` en USD, compartida por el backtest y la verificación de backends."""
+import re
+
+import numpy as np
+
+CONTRACT_PATH = 'contracts/ETHPriceBetting.sol'
+
+
+def load_price_ranges(path=CONTRACT_PATH):
+    """Bordes de `priceRanges` en USD, leídos del contrato para no duplicar la tabla."""
+    with open(path) as f:
+        source = f.read()
+    match = re.search(r'priceRanges\s*=\s*\[([^\]]*)\]', source)
+    if match is None:
+        raise ValueError(f"No se encontró priceRanges en {path}")
+    return np.array([float(v) for v in re.findall(r'(\d+(?:\.\d+)?)e18', match.group(1))])
+
+
+def to_range(prices, edges):
+    """Índice del rango `[edges[i], edges[i+1])` de cada precio; `len(edges) - 1` = fuera de rango."""
+    index = np.searchsorted(edges, prices, side='right') - 1
+    out_of_range = (index < 0) | (index >= len(edges) - 1)
+    return np.where(out_of_range, len(edges) - 1, index)
@@ -0,0 +1,191 @@
+"""Predicción incremental por símbolo a medida que llegan velas horarias.
+
+El modelo mira siempre la última ventana de `seq_len` filas, arrancando el
+LSTM con estado cero al inicio de la ventana. Como el estado de un LSTM no se
+puede "descontar" al sacar la fila más vieja, el predictor mantiene en vuelo
+una ventana por cada posible inicio (hasta `seq_len` estados h/c apilados en
+la dimensión de batch). Cada vela nueva avanza todas esas ventanas un solo
+paso en un único llamado al LSTM, y la ventana que completa `seq_len` pasos da
+la predicción: el resultado es el mismo que recalcular la secuencia entera,
+pero con un timestep secuencial por actualización en lugar de 168.
+"""
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ['price', 'volume', 'returns', 'log_returns']
+KLINE_INTERVAL_MS = 60 * 60 * 1000
+
+
+class KlineGapError(ValueError):
+    """Llegó una vela que no es la siguiente a la última procesada."""
+
+
+class _SymbolStream:
+    def __init__(self, seq_len):
+        # Suficientes filas para reconstruir todas las ventanas en vuelo
+        self.rows = deque(maxlen=2 * seq_len - 1)
+        self.last_price = None
+        self.last_open_time = None
+        self.h = None
+        self.c = None
+        self.ages = deque()
+        self.last_prediction = None
+        self.updates_since_resync = 0
+
+
+class StreamingPredictor:
+    """Mantiene ventana rodante y estados h/c del LSTM por símbolo."""
+
+    def __init__(self, model, scaler, seq_len=168, resync_every=24):
+        self.model = model.eval()
+        self.scaler = scaler
+        self.seq_len = seq_len
+        self.resync_every = resync_every
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    # === Features ===
+    def _scale(self, rows):
+        return self.scaler.transform(np.asarray(rows, dtype=np.float64)).astype(np.float32)
+
+    def _unscale(self, pred_scaled):
+        dummy_data = np.zeros((1, len(FEATURES)))
+        dummy_data[0, 0] = pred_scaled
+        return float(self.scaler.inverse_transform(dummy_data)[0, 0])
+
+    @staticmethod
+    def _parse_kline(kline):
+        """Acepta una vela de Binance (lista) o un dict con open_time/close/volume."""
+        if isinstance(kline, dict):
+            price = kline.get('close', kline.get('price'))
+            return int(kline['open_time']), float(price), float(kline['volume'])
+        return int(kline[0]), float(kline[4]), float(kline[5])
+
+    # === LSTM paso a paso ===
+    @torch.no_grad()
+    def _advance(self, stream, row):
+        """Avanza todas las ventanas en vuelo con una fila escalada; devuelve la predicción escalada si alguna se completó."""
+        lstm = self.model.lstm
+        zeros = torch.zeros(lstm.num_layers, 1, lstm.hidden_size)
+        if stream.h is None:
+            stream.h, stream.c = zeros, zeros.clone()
+        else:
+            stream.h = torch.cat([stream.h, zeros], dim=1)
+            stream.c = torch.cat([stream.c, zeros.clone()], dim=1)
+        stream.ages.append(0)
+
+        x = torch.from_numpy(row).view(1, 1, -1).expand(stream.h.shape[1], 1, -1).contiguous()
+        _, (stream.h, stream.c) = lstm(x, (stream.h, stream.c))
+        for i in range(len(stream.ages)):
+            stream.ages[i] += 1
+
+        if stream.ages[0] < self.seq_len:
+            return None
+
+        out = stream.h[-1, 0:1]
+        out = self.model.relu(self.model.fc1(out))
+        out = self.model.dropout(out)
+        pred_scaled = float(self.model.fc2(out).item())
+
+        stream.ages.popleft()
+        stream.h = stream.h[:, 1:].contiguous()
+        stream.c = stream.c[:, 1:].contiguous()
+        return pred_scaled
+
+    def _rebuild(self, stream):
+        """Reinicia los estados y vuelve a alimentar la ventana rodante."""
+        stream.h = stream.c = None
+        stream.ages.clear()
+        pred_scaled = None
+        for row in list(stream.rows):
+            result = self._advance(stream, row)
+            if result is not None:
+                pred_scaled = result
+        stream.updates_since_resync = 0
+        return pred_scaled
+
+    def _result(self, symbol, stream, pred_scaled):
+        if pred_scaled is None:
+            return None
+        stream.last_prediction = {
+            'symbol': symbol,
+            'predicted_price': round(self._unscale(pred_scaled), 2),
+            'predicted_scaled': pred_scaled,
+            'open_time': stream.last_open_time,
+            'current_price': stream.last_price,
+        }
+        return stream.last_prediction
+
+    # === API ===
+    def warmup(self, symbol, df):
+        """Inicializa el símbolo con un DataFrame histórico (columnas de `get_eth_historical_data`)."""
+        if len(df) < self.seq_len:
+            raise ValueError(f"Datos insuficientes: {len(df)} < {self.seq_len}")
+        tail = df.iloc[-(2 * self.seq_len - 1):]
+
+        stream = _SymbolStream(self.seq_len)
+        stream.rows.extend(self._scale(tail[FEATURES].values))
+        stream.last_price = float(tail['price'].iloc[-1])
+        if 'open_time' in tail:
+            stream.last_open_time = int(tail['open_time'].iloc[-1])
+        elif 'timestamp' in tail:
+            stream.last_open_time = int(tail['timestamp'].iloc[-1].value // 10**6)
+
+        with self._lock:
+            pred_scaled = self._rebuild(stream)
+            self._streams[symbol] = stream
+            return self._result(symbol, stream, pred_scaled)
+
+    def update(self, symbol, kline):
+        """Procesa una vela cerrada y devuelve la predicción para la hora siguiente."""
+        open_time, price, volume = self._parse_kline(kline)
+        with self._lock:
+            stream = self._streams.get(symbol)
+            if stream is None:
+                raise KeyError(f"Símbolo {symbol} sin warmup")
+
+            if stream.last_open_time is not None:
+                if open_time <= stream.last_open_time:
+                    return stream.last_prediction
+                if open_time - stream.last_open_time != KLINE_INTERVAL_MS:
+                    raise KlineGapError(
+                        f"{symbol}: se esperaba la vela {stream.last_open_time + KLINE_INTERVAL_MS}, llegó {open_time}"
+                    )
+
+            returns = price / stream.last_price - 1
+            log_returns = np.log(price / stream.last_price)
+            row = self._scale([[price, volume, returns, log_returns]])[0]
+            stream.rows.append(row)
+            stream.last_price = price
+            stream.last_open_time = open_time
+            stream.updates_since_resync += 1
+
+            if self.resync_every and stream.updates_since_resync >= self.resync_every:
+                pred_scaled = self._rebuild(stream)
+            else:
+                pred_scaled = self._advance(stream, row)
+            return self._result(symbol, stream, pred_scaled)
+
+    def resync(self, symbol):
+        """Descarta los estados acumulados y los recalcula desde la ventana rodante."""
+        with self._lock:
+            stream = self._streams[symbol]
+            return self._result(symbol, stream, self._rebuild(stream))
+
+    @torch.no_grad()
+    def full_recompute(self, symbol):
+        """Predicción escalada recalculando la última ventana completa (para verificación)."""
+        with self._lock:
+            stream = self._streams[symbol]
+            window = np.stack(list(stream.rows)[-self.seq_len:])
+        return float(self.model(torch.from_numpy(window).unsqueeze(0)).item())
+
+    def symbols(self):
+        with self._lock:
+            return list(self._streams)
@@ -0,0 +1,145 @@
+"""Formato plano de pesos para arranques rápidos.
+
+El checkpoint `.pth` es un pickle: cargarlo importa sklearn, deserializa
+objetos y copia cada tensor. Este módulo guarda lo mismo en dos archivos:
+
+- `eth_price_model.safetensors`: tensores crudos en el layout de safetensors
+  (8 bytes little-endian con el largo del header, header JSON, datos). Se
+  abre con `mmap`, así los tensores apuntan directo a las páginas del archivo
+  y varios procesos comparten la misma memoria física.
+- `eth_price_scaler.json`: los parámetros del MinMaxScaler. `FlatMinMaxScaler`
+  los aplica con NumPy, sin importar sklearn.
+
+Uso: `python ml/weights_format.py` convierte `ml/eth_price_model.pth`.
+"""
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+WEIGHTS_PATH = 'ml/eth_price_model.safetensors'
+SCALER_PATH = 'ml/eth_price_scaler.json'
+
+_DTYPES = {'F32': np.float32, 'F64': np.float64, 'F16': np.float16, 'I64': np.int64, 'I32': np.int32}
+_DTYPE_NAMES = {np.dtype(v): k for k, v in _DTYPES.items()}
+
+
+# === Pesos ===
+def save_weights(state_dict, path, metadata=None):
+    """Escribe un state_dict en formato safetensors."""
+    header, arrays, offset = {}, [], 0
+    for name, tensor in state_dict.items():
+        array = np.ascontiguousarray(tensor.detach().cpu().numpy())
+        header[name] = {
+            'dtype': _DTYPE_NAMES[array.dtype],
+            'shape': list(array.shape),
+            'data_offsets': [offset, offset + array.nbytes],
+        }
+        arrays.append(array)
+        offset += array.nbytes
+    if metadata:
+        header['__metadata__'] = {k: str(v) for k, v in metadata.items()}
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+    # Alinear el inicio de los datos a 8 bytes (el formato admite padding con espacios)
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for array in arrays:
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_weights(path):
+    """Abre un archivo safetensors con mmap y devuelve {nombre: tensor} sin copiar datos.
+
+    El mapeo es copy-on-write: las páginas se comparten entre procesos mientras
+    nadie escriba los pesos.
+    """
+    import torch
+
+    with open(path, 'rb') as f:
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+    data_start = 8 + header_len
+    buffer = np.memmap(path, dtype=np.uint8, mode='c')
+
+    tensors = {}
+    for name, info in header.items():
+        if name == '__metadata__':
+            continue
+        start, end = info['data_offsets']
+        array = buffer[data_start + start:data_start + end].view(_DTYPES[info['dtype']]).reshape(info['shape'])
+        tensors[name] = torch.from_numpy(array)
+    return tensors
+
+
+# === Scaler ===
+_SCALER_FIELDS = ('min_', 'scale_', 'data_min_', 'data_max_', 'data_range_')
+
+
+def save_scaler(scaler, path):
+    if type(scaler).__name__ != 'MinMaxScaler':
+        raise TypeError(f"Solo se soporta MinMaxScaler, no {type(scaler).__name__}")
+    payload = {'type': 'MinMaxScaler', 'feature_range': list(scaler.feature_range)}
+    payload.update({field: getattr(scaler, field).tolist() for field in _SCALER_FIELDS})
+    payload['n_samples_seen_'] = int(scaler.n_samples_seen_)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+
+class FlatMinMaxScaler:
+    """Equivalente NumPy de `MinMaxScaler.transform`/`inverse_transform` ya ajustado."""
+
+    def __init__(self, min_, scale_, data_min_=None, data_max_=None, data_range_=None,
+                 feature_range=(0, 1), **_):
+        self.min_ = np.asarray(min_, dtype=np.float64)
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+        self.data_min_ = np.asarray(data_min_, dtype=np.float64) if data_min_ is not None else None
+        self.data_max_ = np.asarray(data_max_, dtype=np.float64) if data_max_ is not None else None
+        self.data_range_ = np.asarray(data_range_, dtype=np.float64) if data_range_ is not None else None
+        self.feature_range = tuple(feature_range)
+        self.n_features_in_ = len(self.min_)
+
+    def transform(self, X):
+        # Mismas operaciones in-place que sklearn (float32 se mantiene float32)
+        X = np.array(X, dtype=np.float32 if np.asarray(X).dtype == np.float32 else np.float64)
+        X *= self.scale_
+        X += self.min_
+        return X
+
+    def inverse_transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.min_
+        X /= self.scale_
+        return X
+
+
+def load_scaler(path):
+    with open(path) as f:
+        payload = json.load(f)
+    if payload.pop('type', 'MinMaxScaler') != 'MinMaxScaler':
+        raise ValueError("Scaler no soportado")
+    return FlatMinMaxScaler(**payload)
+
+
+# === Conversión ===
+def convert_checkpoint(pth_path='ml/eth_price_model.pth', weights_path=WEIGHTS_PATH, scaler_path=SCALER_PATH):
+    """Genera los archivos planos a partir del checkpoint pickled."""
+    import torch
+
+    checkpoint = torch.load(pth_path, weights_only=False, map_location='cpu')
+    save_weights(checkpoint['model_state_dict'], weights_path, metadata={'source': os.path.basename(pth_path)})
+    save_scaler(checkpoint['scaler'], scaler_path)
+    return weights_path, scaler_path
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else 'ml/eth_price_model.pth'
+    weights, scaler_file = convert_checkpoint(source)
+    print(f"Pesos: {weights}\nScaler: {scaler_file}")
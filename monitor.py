@@ -2,83 +2,440 @@
 import requests
 import time
 import json
+import os
+import sys
+import random
+import logging
+import argparse
+import threading
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+logger = logging.getLogger(__name__)
+
+# Un probe es "bueno" si responde 200 en menos de `latency_ms`; `objective` es la
+# fracción de probes buenos comprometida (0.99 = presupuesto de error del 1%)
+SLO = namedtuple('SLO', 'latency_ms objective')
+DEFAULT_SLO = SLO(latency_ms=1000, objective=0.99)
+
+# (ventana corta, ventana larga, burn rate): se alerta si ambas ventanas superan
+# el umbral. 14.4 consume el 2% del presupuesto mensual en 1h; 6, el 5% en 6h
+BURN_ALERTS = ((300, 3600, 14.4), (1800, 21600, 6.0))
+
+TEST_SEQUENCE = [
+    [3000, 3050, 2980, 3020],
+    [3020, 3070, 3000, 3040],
+    [3040, 3090, 3020, 3060]
+]
+
+
+def percentile(sorted_values, q):
+    """Percentil `q` (0-100) con interpolación lineal sobre una lista ordenada."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class LatencyRing:
+    """Últimos `capacity` probes (timestamp, latencia, éxito) en arrays de tamaño fijo.
+
+    La memoria no crece con el tiempo de ejecución: al llenarse, cada probe nuevo
+    pisa al más viejo.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.latencies = array('d', bytes(8 * capacity))
+        self.ok = array('b', bytes(capacity))
+        self.count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def add(self, timestamp, latency, ok):
+        with self._lock:
+            self.timestamps[self._next] = timestamp
+            self.latencies[self._next] = latency
+            self.ok[self._next] = ok
+            self._next = (self._next + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def window(self, seconds=None, now=None):
+        """[(latencia, éxito)] de los probes de los últimos `seconds` (None = todos)."""
+        since = (now or time.time()) - seconds if seconds is not None else float('-inf')
+        with self._lock:
+            return [
+                (self.latencies[i], bool(self.ok[i]))
+                for i in range(self.count) if self.timestamps[i] >= since
+            ]
+
+    def percentiles(self, qs=(50, 95, 99), seconds=None):
+        latencies = sorted(latency for latency, ok in self.window(seconds) if ok)
+        if not latencies:
+            return {}
+        return {f'p{q}_ms': round(percentile(latencies, q) * 1000, 1) for q in qs}
+
+    def burn_rate(self, slo, seconds, now=None, min_samples=1):
+        """Consumo del presupuesto de error en la ventana: 1.0 = justo al ritmo del objetivo.
+
+        None si la ventana tiene menos de `min_samples` probes.
+        """
+        probes = self.window(seconds, now)
+        if len(probes) < max(min_samples, 1):
+            return None
+        bad = sum(1 for latency, ok in probes if not ok or latency * 1000 > slo.latency_ms) / len(probes)
+        return bad / (1 - slo.objective)
+
+
 class APIMonitor:
-    def __init__(self, api_url, check_interval=300):  # 5 minutos
+    def __init__(self, api_url, check_interval=300, name=None, session=None,
+                 history=4096, slo=DEFAULT_SLO, alert_cooldown=3600, failures_to_alert=3, min_samples=10,
+                 log_path='monitor_log.json'):  # 5 minutos
         self.api_url = api_url.rstrip('/')
         self.check_interval = check_interval
+        self.name = name or self.api_url
+        self.session = session or requests.Session()
+        self.slo = slo
+        self.alert_cooldown = alert_cooldown
+        self.log_path = log_path
+        self.failures_to_alert = failures_to_alert
+        self.min_samples = min_samples
         self.alerts_sent = {}
-        
+        self.active_alerts = set()
+        self.consecutive_failures = 0
+        self.rings = {'health': LatencyRing(history), 'predict': LatencyRing(history)}
+
+    def _record(self, check, result, started):
+        ok = result['status'] in ('healthy', 'success')
+        # Timeouts y errores de conexión cuentan con el tiempo que se esperó
+        latency = result.get('response_time', time.perf_counter() - started)
+        self.rings[check].add(time.time(), latency, ok)
+        return result
+
     def check_health(self):
         """Verificar salud de la API"""
+        started = time.perf_counter()
         try:
-            response = requests.get(f"{self.api_url}/health", timeout=10)
-            
+            response = self.session.get(f"{self.api_url}/health", timeout=10)
+
             if response.status_code == 200:
                 data = response.json()
-                return {
+                result = {
                     'status': 'healthy',
                     'response_time': response.elapsed.total_seconds(),
                     'data': data
                 }
             else:
-                return {
+                result = {
                     'status': 'unhealthy',
                     'status_code': response.status_code,
                     'response_time': response.elapsed.total_seconds()
                 }
-                
+
         except requests.exceptions.Timeout:
-            return {'status': 'timeout', 'error': 'Request timeout'}
+            result = {'status': 'timeout', 'error': 'Request timeout'}
         except requests.exceptions.ConnectionError:
-            return {'status': 'connection_error', 'error': 'Connection failed'}
+            result = {'status': 'connection_error', 'error': 'Connection failed'}
         except Exception as e:
-            return {'status': 'error', 'error': str(e)}
-    
+            result = {'status': 'error', 'error': str(e)}
+        return self._record('health', result, started)
+
     def test_prediction(self):
         """Probar funcionalidad de predicción"""
+        started = time.perf_counter()
         try:
-            # Datos de prueba
-            test_data = [
-                [3000, 3050, 2980, 3020],
-                [3020, 3070, 3000, 3040],
-                [3040, 3090, 3020, 3060]
-            ]
-            
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/predict",
-                json={"sequence": test_data},
+                json={"sequence": TEST_SEQUENCE},
                 timeout=30
             )
-            
+
             if response.status_code == 200:
                 result = response.json()
                 if result.get('success'):
-                    return {
+                    result = {
                         'status': 'success',
                         'predicted_price': result.get('predicted_price'),
                         'response_time': response.elapsed.total_seconds()
                     }
                 else:
-                    return {'status': 'failed', 'error': result.get('error')}
+                    result = {'status': 'failed', 'error': result.get('error')}
             else:
-                return {'status': 'http_error', 'status_code': response.status_code}
-                
+                result = {'status': 'http_error', 'status_code': response.status_code}
+
         except Exception as e:
-            return {'status': 'error', 'error': str(e)}
-    
+            result = {'status': 'error', 'error': str(e)}
+        return self._record('predict', result, started)
+
     def log_status(self, health_check, prediction_test):
         """Registrar estado en log"""
         timestamp = datetime.now().isoformat()
-        
+
         log_entry = {
             'timestamp': timestamp,
+            'endpoint': self.name,
             'health_check': health_check,
             'prediction_test': prediction_test
         }
-        
-        # Escribir a archivo de
\ No newline at end of file
+
+        # Escribir a archivo de log (una línea JSON por chequeo)
+        if self.log_path:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(log_entry) + '\n')
+        return log_entry
+
+    def slo_report(self, now=None):
+        """Percentiles de latencia y burn rates por tipo de chequeo."""
+        now = now or time.time()
+        report = {}
+        for check, ring in self.rings.items():
+            if not ring.count:
+                continue
+            probes = ring.window()
+            windows = sorted({s for short, long, _ in BURN_ALERTS for s in (short, long)})
+            report[check] = {
+                'samples': ring.count,
+                'availability': round(sum(ok for _, ok in probes) / len(probes), 4),
+                'latency': ring.percentiles(),
+                'latency_5m': ring.percentiles(seconds=300),
+                'burn_rate': {},
+            }
+            for seconds in windows:
+                rate = ring.burn_rate(self.slo, seconds, now)
+                report[check]['burn_rate'][f'{seconds}s'] = None if rate is None else round(rate, 2)
+        return report
+
+    def send_alert(self, subject, message):
+        """Envía el alerta por mail si SMTP_HOST y ALERT_EMAIL están configurados; si no, solo la loguea."""
+        logger.warning(f"🚨 {subject}: {message}")
+        host, to_address = os.environ.get('SMTP_HOST'), os.environ.get('ALERT_EMAIL')
+        if not host or not to_address:
+            return False
+        try:
+            msg = MIMEMultipart()
+            msg['From'] = os.environ.get('SMTP_FROM', to_address)
+            msg['To'] = to_address
+            msg['Subject'] = f"[ETH API] {subject}"
+            msg.attach(MIMEText(message, 'plain'))
+            with smtplib.SMTP(host, int(os.environ.get('SMTP_PORT', 587)), timeout=10) as server:
+                server.starttls()
+                if os.environ.get('SMTP_USER'):
+                    server.login(os.environ['SMTP_USER'], os.environ.get('SMTP_PASSWORD', ''))
+                server.send_message(msg)
+            return True
+        except Exception as e:
+            logger.error(f"❌ No se pudo enviar el alerta: {e}")
+            return False
+
+    def alert(self, key, subject, message, now=None):
+        """Alerta deduplicada: la misma `key` no se reenvía antes de `alert_cooldown` segundos,
+        aunque el problema se haya resuelto y vuelto a aparecer en el medio."""
+        now = now or time.time()
+        self.active_alerts.add(key)
+        last = self.alerts_sent.get(key)
+        if last is not None and now - last < self.alert_cooldown:
+            return False
+        self.alerts_sent[key] = now
+        self.send_alert(subject, message)
+        return True
+
+    def resolve_alert(self, key, message):
+        if key in self.active_alerts:
+            self.active_alerts.discard(key)
+            logger.info(f"✅ {self.name}: {message}")
+
+    def evaluate_alerts(self, health_check, now=None):
+        now = now or time.time()
+        key = 'down'
+        if health_check['status'] != 'healthy':
+            self.consecutive_failures += 1
+        else:
+            self.consecutive_failures = 0
+        if self.consecutive_failures >= self.failures_to_alert:
+            self.alert(key, f"{self.name} no responde",
+                       f"Estado: {health_check['status']} {health_check.get('error', health_check.get('status_code', ''))}", now)
+        elif self.consecutive_failures == 0:
+            self.resolve_alert(key, "servicio recuperado")
+
+        for check, ring in self.rings.items():
+            for short, long, threshold in BURN_ALERTS:
+                key = f'burn:{check}:{short}'
+                short_rate = ring.burn_rate(self.slo, short, now, self.min_samples)
+                long_rate = ring.burn_rate(self.slo, long, now, self.min_samples)
+                if short_rate is None or long_rate is None:
+                    continue
+                if short_rate >= threshold and long_rate >= threshold:
+                    self.alert(key, f"{self.name}: SLO de {check} en riesgo",
+                               f"Burn rate {short_rate:.1f} ({short}s) / {long_rate:.1f} ({long}s), umbral {threshold} "
+                               f"(objetivo {self.slo.objective:.2%} bajo {self.slo.latency_ms} ms)", now)
+                elif short_rate < threshold:
+                    self.resolve_alert(key, f"burn rate de {check} ({short}s) normalizado")
+
+    def run(self):
+        """Monitorea solo esta API cada `check_interval` segundos"""
+        MonitorEngine([self], interval=self.check_interval).run_forever()
+
+
+class MonitorEngine:
+    """Chequea muchas APIs en paralelo a intervalos fijos.
+
+    Todos los monitores comparten una `requests.Session` con un pool de
+    conexiones keep-alive por host, así cada ronda reutiliza las conexiones
+    abiertas en lugar de negociar TCP/TLS de nuevo. Cada `predict_every` rondas
+    también se prueba `/predict`.
+    """
+
+    def __init__(self, monitors, interval=30, max_workers=16, predict_every=10,
+                 status_path='monitor_status.json'):
+        self.monitors = monitors
+        self.interval = interval
+        self.predict_every = predict_every
+        self.status_path = status_path
+        self.rounds = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='monitor')
+
+    @classmethod
+    def for_urls(cls, urls, pool_size=16, **monitor_kwargs):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max(len(urls), 1), pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return [APIMonitor(url, session=session, **monitor_kwargs) for url in urls]
+
+    def _check(self, monitor, with_prediction):
+        health_check = monitor.check_health()
+        prediction_test = monitor.test_prediction() if with_prediction else None
+        monitor.log_status(health_check, prediction_test)
+        monitor.evaluate_alerts(health_check)
+        return health_check
+
+    def run_once(self):
+        """Una ronda de chequeos sobre todas las APIs; devuelve el reporte."""
+        with_prediction = self.predict_every and self.rounds % self.predict_every == 0
+        futures = [self.executor.submit(self._check, m, with_prediction) for m in self.monitors]
+        for monitor, future in zip(self.monitors, futures):
+            health_check = future.result()
+            logger.info(f"{'🟢' if health_check['status'] == 'healthy' else '🔴'} {monitor.name}: "
+                        f"{health_check['status']} ({health_check.get('response_time', 0) * 1000:.0f} ms)")
+        self.rounds += 1
+        report = self.report()
+        if self.status_path:
+            tmp_path = f"{self.status_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(report, f, indent=2)
+            os.replace(tmp_path, self.status_path)
+        return report
+
+    def report(self):
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'rounds': self.rounds,
+            'endpoints': {m.name: m.slo_report() for m in self.monitors},
+        }
+
+    def run_forever(self, rounds=None):
+        """Rondas cada `interval` segundos a horario fijo (el tiempo de los chequeos no se acumula)."""
+        started = time.monotonic()
+        try:
+            while rounds is None or self.rounds < rounds:
+                self.run_once()
+                delay = started + self.rounds * self.interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        except KeyboardInterrupt:
+            logger.info("🛑 Deteniendo monitor...")
+        finally:
+            self.executor.shutdown(wait=False)
+
+
+# === Servidor de prueba ===
+class StandInServer:
+    """API falsa local (`/health`, `/predict`) con latencia y tasa de error configurables.
+
+    Sirve para probar el monitor sin depender del modelo ni de la red.
+    """
+
+    def __init__(self, port=0, latency_ms=20, jitter_ms=10, error_rate=0.0):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, body):
+                time.sleep(max(0, random.gauss(stand_in.latency_ms, stand_in.jitter_ms)) / 1000)
+                status = 500 if random.random() < stand_in.error_rate else 200
+                payload = json.dumps(body if status == 200 else {"error": "falla simulada", "success": False}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._respond({"status": "healthy", "model_status": "loaded"})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self._respond({"success": True, "predicted_price": 3000.0})
+
+            def log_message(self, *args):
+                pass
+
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name='stand-in', daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor de las APIs de predicción")
+    parser.add_argument('urls', nargs='*', help="APIs a monitorear (default API_URL)")
+    parser.add_argument('--interval', type=float, default=30, help="Segundos entre rondas")
+    parser.add_argument('--rounds', type=int, help="Cantidad de rondas (default: sin fin)")
+    parser.add_argument('--workers', type=int, default=16, help="Chequeos concurrentes")
+    parser.add_argument('--predict-every', type=int, default=10, help="Probar /predict cada N rondas (0 = nunca)")
+    parser.add_argument('--slo-latency-ms', type=float, default=DEFAULT_SLO.latency_ms)
+    parser.add_argument('--slo-objective', type=float, default=DEFAULT_SLO.objective)
+    parser.add_argument('--stand-in', type=int, default=0,
+                        help="Levantar N APIs falsas locales (con latencias y errores distintos) y monitorearlas")
+    args = parser.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from log_config import setup_logging
+    setup_logging(log_file=os.environ.get('LOG_FILE', ''), fmt=os.environ.get('LOG_FORMAT', 'text'))
+
+    urls = list(args.urls)
+    stand_ins = [StandInServer(latency_ms=20 * (i + 1), error_rate=0.05 * i) for i in range(args.stand_in)]
+    urls += [s.url for s in stand_ins]
+    if not urls:
+        urls = [os.environ.get('API_URL', 'https://eth-betting-ml.onrender.com')]
+
+    monitors = MonitorEngine.for_urls(
+        urls, pool_size=args.workers, check_interval=args.interval,
+        slo=SLO(args.slo_latency_ms, args.slo_objective)
+    )
+    engine = MonitorEngine(monitors, interval=args.interval, max_workers=args.workers, predict_every=args.predict_every)
+    logger.info(f"🚀 Monitoreando {len(urls)} APIs cada {args.interval:g}s")
+    engine.run_forever(args.rounds)
+    print(json.dumps(engine.report(), indent=2))
+
+    for stand_in in stand_ins:
+        stand_in.close()
+
+
+if __name__ == "__main__":
+    main()
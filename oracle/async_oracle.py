@@ -0,0 +1,195 @@
+"""Runtime asyncio del oráculo: resolución de rondas justo en el `targetTime`.
+
+En lugar de dormir en intervalos fijos y hacer todo en serie al despertar,
+cada ronda tiene su propia tarea:
+
+1. `precompute_lead` segundos antes del `targetTime` se genera la predicción
+   (en un executor, sin bloquear el loop) con las velas cerradas al `targetTime`,
+   igual que el servicio síncrono. Si una vela horaria cierra dentro de ese
+   margen, se espera a que cierre.
+2. Poco antes del deadline se arma y firma la transacción `updatePrice`.
+3. Apenas el deadline pasa (más `submit_delay`), se envía.
+4. El seguimiento del receipt corre como tarea aparte, así el loop sigue
+   vigilando rondas mientras la transacción se confirma.
+
+Si hay más de una ronda vencida (la grilla horaria del contrato siguió
+avanzando mientras el oráculo no resolvía), se resuelven todas juntas con
+`resolve_backlog` del servicio, igual que en el modo síncrono.
+
+La latencia de resolución se mide como `timestamp del bloque - targetTime`.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml.kline_store import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+
+async def sleep_until(timestamp):
+    delay = timestamp - time.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+class AsyncOracleRuntime:
+    def __init__(self, service, poll_interval=15, precompute_lead=120, sign_lead=5,
+                 submit_delay=1.0, receipt_poll_interval=2, receipt_timeout=300):
+        self.service = service
+        self.poll_interval = poll_interval
+        self.precompute_lead = precompute_lead
+        self.sign_lead = sign_lead
+        self.submit_delay = submit_delay
+        self.receipt_poll_interval = receipt_poll_interval
+        self.receipt_timeout = receipt_timeout
+
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="oracle")
+        self.round_tasks = {}
+        # round_id -> tarea del receipt: mientras la TX está en vuelo no se reagenda la ronda
+        self.receipt_tasks = {}
+        self.backlog_task = None
+        self.latencies = []
+
+    # === Helpers ===
+    async def _call(self, fn, *args):
+        """Ejecuta una llamada bloqueante (web3, modelo) fuera del loop."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            'resolved_rounds': len(latencies),
+            'pending_rounds': len(self.round_tasks),
+            'pending_receipts': len(self.receipt_tasks),
+            'backlog_in_flight': self.backlog_task is not None,
+            'latency_seconds_last': self.latencies[-1] if self.latencies else None,
+            'latency_seconds_median': latencies[len(latencies) // 2] if latencies else None,
+            'latency_seconds_max': latencies[-1] if latencies else None,
+        }
+
+    # === Por ronda ===
+    async def _resolve_round(self, round_id, target_time):
+        service = self.service
+        try:
+            # La última vela que entra en la predicción cierra en `last_close`
+            hour = INTERVAL_MS['1h'] // 1000
+            last_close = target_time // hour * hour
+            await sleep_until(max(target_time - self.precompute_lead, last_close + self.submit_delay))
+            logger.info(f"🤖 Precalculando predicción para ronda {round_id}...")
+            predicted_price = (await self._call(service.get_round_prices, [target_time]))[0]
+            logger.info(f"💡 Precio predicho: ${predicted_price:.2f}")
+
+            # Firmar con gas y nonce frescos poco antes del deadline
+            await sleep_until(target_time - self.sign_lead)
+            transaction = await self._call(service.build_update_transaction, round_id, predicted_price)
+            signed_txn = await self._call(service.sign_transaction, transaction)
+
+            await sleep_until(target_time + self.submit_delay)
+            _, _, _, resolved, _ = await self._call(service.get_round_info, round_id)
+            if resolved:
+                service.nonces.release(transaction['nonce'])
+                logger.info(f"⏭️  Ronda {round_id} ya resuelta")
+                return
+            # Con pool vacío también se resuelve: si no, la ronda siguiente nunca arranca
+
+            try:
+                tx_hash = await self._call(service.send_signed_transaction, signed_txn, transaction)
+            except Exception:
+                service.nonces.release(transaction['nonce'])
+                raise
+            logger.info(f"⏳ TX enviada para ronda {round_id}: {tx_hash.hex()} "
+                        f"(+{time.time() - target_time:.1f}s del target)")
+
+            task = asyncio.create_task(self._track_receipt(round_id, target_time, transaction['nonce']))
+            self.receipt_tasks[round_id] = task
+            task.add_done_callback(lambda _: self.receipt_tasks.pop(round_id, None))
+
+        except Exception as e:
+            logger.error(f"❌ Error resolviendo ronda {round_id}: {e}")
+        finally:
+            self.round_tasks.pop(round_id, None)
+
+    async def _resolve_backlog(self, backlog):
+        """Un solo updatePrices para las rondas vencidas (predicción, envío y receipt en el executor)."""
+        try:
+            await self._call(self.service.resolve_backlog, backlog)
+        finally:
+            self.backlog_task = None
+
+    async def _track_receipt(self, round_id, target_time, nonce):
+        """Espera el receipt del nonce (incluye reemplazos con más gas)."""
+        w3 = self.service.w3
+        nonces = self.service.nonces
+        deadline = time.time() + self.receipt_timeout
+        while time.time() < deadline:
+            receipt = await self._call(nonces.find_receipt, nonce)
+            if receipt is not None:
+                block = await self._call(w3.eth.get_block, receipt.blockNumber)
+                latency = block.timestamp - target_time
+                if receipt.status == 1:
+                    self.latencies.append(latency)
+                    logger.info(f"✅ Ronda {round_id} resuelta en bloque {receipt.blockNumber} "
+                                f"({latency}s después del target, gas {receipt.gasUsed:,})")
+                else:
+                    logger.error(f"❌ Transacción de ronda {round_id} falló")
+                return receipt
+            await asyncio.sleep(self.receipt_poll_interval)
+        logger.warning(f"⌛ Sin receipt para ronda {round_id} (nonce {nonce}) tras {self.receipt_timeout}s")
+
+    async def _maintain_nonces(self, interval=30):
+        """Reemplaza periódicamente las transacciones trabadas."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                for nonce, tx_hash in await self._call(self.service.nonces.replace_stuck):
+                    logger.info(f"⛽ TX con nonce {nonce} reemplazada con más gas: {tx_hash.hex()}")
+            except Exception as e:
+                logger.error(f"❌ Error reemplazando transacciones: {e}")
+
+    # === Loop principal ===
+    async def watch_once(self):
+        """Lee la ronda actual y agenda su resolución (o la del lote atrasado) si todavía no está agendada."""
+        service = self.service
+        current_round_id = await self._call(service.betting_contract.functions.currentRoundId().call)
+        _, target_time, _, resolved, _ = await self._call(service.get_round_info, current_round_id)
+        if (resolved or self.backlog_task is not None
+                or current_round_id in self.round_tasks or current_round_id in self.receipt_tasks):
+            return current_round_id, target_time
+
+        backlog = service.pending_rounds(current_round_id, target_time)
+        if len(backlog) > 1:
+            logger.info(f"📚 {len(backlog)} rondas atrasadas ({backlog[0][0]}-{backlog[-1][0]}), resolviendo en lote...")
+            self.backlog_task = asyncio.create_task(self._resolve_backlog(backlog))
+        else:
+            logger.info(f"🗓️  Ronda {current_round_id} agendada para {datetime.fromtimestamp(target_time)}")
+            self.round_tasks[current_round_id] = asyncio.create_task(
+                self._resolve_round(current_round_id, target_time)
+            )
+        return current_round_id, target_time
+
+    async def run(self):
+        logger.info("🚀 Iniciando Oracle Service (asyncio)...")
+        maintenance = asyncio.create_task(self._maintain_nonces())
+        try:
+            while True:
+                try:
+                    await self.watch_once()
+                except Exception as e:
+                    logger.error(f"❌ Error leyendo rondas: {e}")
+                await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            maintenance.cancel()
+            for task in list(self.round_tasks.values()) + list(self.receipt_tasks.values()):
+                task.cancel()
+            if self.backlog_task is not None:
+                self.backlog_task.cancel()
+            self.executor.shutdown(wait=False)
+            logger.info("🛑 Deteniendo Oracle Service...")
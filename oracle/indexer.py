@@ -0,0 +1,346 @@
+"""Indexador local de eventos de `ETHPriceBetting` y `PriceOracle`.
+
+Trae los eventos con `eth_getLogs` en rangos grandes de bloques (un solo
+request por rango, para los dos contratos) y los guarda en SQLite con índices
+por ronda, usuario y rango. Las consultas (`round_summary`, `user_bets`, ...)
+pasan a ser lecturas locales en lugar de llamadas RPC.
+
+- Checkpoint: el último bloque indexado se guarda en la misma transacción que
+  los eventos del rango, así un corte nunca deja eventos a medias.
+- Reorgs: se guarda el hash de cada bloque indexado dentro de los últimos
+  `reorg_depth` de la cadena. En cada pasada se comparan con la cadena; si el
+  último cambió, se borra todo lo posterior al bloque más nuevo que coincide y
+  se reindexa desde ahí. Una reorg más profunda que `reorg_depth` es un error.
+- El tamaño del rango se achica a la mitad si el provider rechaza el pedido
+  (demasiados resultados o rango muy grande) y vuelve a crecer después.
+
+    python oracle/indexer.py --rpc http://127.0.0.1:8545 --deployment deployments/localhost.json
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+from web3 import Web3
+from web3.exceptions import BlockNotFound
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.environ.get('INDEXER_DB', 'data/indexer.sqlite')
+
+# evento -> (contrato, tabla, [(argumento, tipo solidity, columna, tipo SQL)])
+# Los montos uint256 se guardan como texto decimal: no entran en INTEGER de SQLite
+EVENTS = {
+    'BetPlaced': ('betting', 'bets', [
+        ('roundId', 'uint256', 'round_id', 'INTEGER'),
+        ('bettor', 'address', 'bettor', 'TEXT'),
+        ('rangeIndex', 'uint256', 'range_index', 'INTEGER'),
+        ('amount', 'uint256', 'amount', 'TEXT'),
+    ]),
+    'RoundResolved': ('betting', 'resolutions', [
+        ('roundId', 'uint256', 'round_id', 'INTEGER'),
+        ('actualPrice', 'uint256', 'actual_price', 'TEXT'),
+        ('winningRange', 'uint256', 'winning_range', 'INTEGER'),
+    ]),
+    'PrizeDistributed': ('betting', 'prizes', [
+        ('roundId', 'uint256', 'round_id', 'INTEGER'),
+        ('winner', 'address', 'winner', 'TEXT'),
+        ('amount', 'uint256', 'amount', 'TEXT'),
+    ]),
+    'BetRefunded': ('betting', 'refunds', [
+        ('roundId', 'uint256', 'round_id', 'INTEGER'),
+        ('bettor', 'address', 'bettor', 'TEXT'),
+        ('amount', 'uint256', 'amount', 'TEXT'),
+    ]),
+    'PriceUpdated': ('oracle', 'price_updates', [
+        ('roundId', 'uint256', 'round_id', 'INTEGER'),
+        ('price', 'uint256', 'price', 'TEXT'),
+        ('timestamp', 'uint256', 'timestamp', 'INTEGER'),
+    ]),
+}
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS bets_round_range ON bets (round_id, range_index)',
+    'CREATE INDEX IF NOT EXISTS bets_bettor ON bets (bettor, round_id)',
+    'CREATE INDEX IF NOT EXISTS prizes_winner ON prizes (winner, round_id)',
+    'CREATE INDEX IF NOT EXISTS prizes_round ON prizes (round_id)',
+    'CREATE INDEX IF NOT EXISTS refunds_round ON refunds (round_id)',
+    'CREATE INDEX IF NOT EXISTS resolutions_round ON resolutions (round_id)',
+    'CREATE INDEX IF NOT EXISTS price_updates_round ON price_updates (round_id)',
+]
+
+# Mensajes con los que los providers rechazan un eth_getLogs demasiado grande
+RANGE_ERRORS = ('more than', 'too many', 'range', 'limit exceeded', 'response size', 'timeout')
+
+
+def event_abi(name):
+    _, _, fields = EVENTS[name]
+    return {
+        'anonymous': False,
+        'name': name,
+        'type': 'event',
+        'inputs': [{'indexed': False, 'name': arg, 'type': sol_type} for arg, sol_type, _, _ in fields],
+    }
+
+
+def event_topic(name):
+    _, _, fields = EVENTS[name]
+    return Web3.keccak(text=f"{name}({','.join(sol_type for _, sol_type, _, _ in fields)})")
+
+
+class EventIndexer:
+    def __init__(self, w3, betting_address, oracle_address=None, db_path=DEFAULT_DB_PATH,
+                 start_block=0, batch_size=2000, max_batch_size=10000, reorg_depth=64, confirmations=0):
+        self.w3 = w3
+        self.addresses = {'betting': Web3.to_checksum_address(betting_address)}
+        if oracle_address:
+            self.addresses['oracle'] = Web3.to_checksum_address(oracle_address)
+        self.start_block = start_block
+        self.batch_size = batch_size
+        self.max_batch_size = max_batch_size
+        self.reorg_depth = reorg_depth
+        self.confirmations = confirmations
+
+        events = {name: spec for name, spec in EVENTS.items() if spec[0] in self.addresses}
+        self.contracts = {
+            key: w3.eth.contract(address=address, abi=[event_abi(n) for n, s in events.items() if s[0] == key])
+            for key, address in self.addresses.items()
+        }
+        self.topics = {bytes(event_topic(name)): name for name in events}
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        # WAL: otros procesos pueden consultar mientras se indexa
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self._create_schema()
+
+    # === Esquema y checkpoint ===
+    def _create_schema(self):
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS blocks (number INTEGER PRIMARY KEY, hash TEXT NOT NULL)')
+            for _, table, fields in EVENTS.values():
+                columns = ', '.join(f'{column} {sql_type}' for _, _, column, sql_type in fields)
+                self.db.execute(
+                    f'CREATE TABLE IF NOT EXISTS {table} (block_number INTEGER NOT NULL, tx_hash TEXT NOT NULL, '
+                    f'log_index INTEGER NOT NULL, {columns}, PRIMARY KEY (tx_hash, log_index))'
+                )
+                self.db.execute(f'CREATE INDEX IF NOT EXISTS {table}_block ON {table} (block_number)')
+            for statement in INDEXES:
+                self.db.execute(statement)
+
+    @property
+    def last_block(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+        return int(row['value']) if row else self.start_block - 1
+
+    def _set_last_block(self, number):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_block', ?)", (str(number),))
+
+    def _remember_block(self, number, block_hash):
+        self.db.execute('INSERT OR REPLACE INTO blocks (number, hash) VALUES (?, ?)', (number, Web3.to_hex(block_hash)))
+
+    # === Reorgs ===
+    def check_reorg(self):
+        """Devuelve el bloque desde el que hay que reindexar, o None si no hubo reorg."""
+        rows = self.db.execute('SELECT number, hash FROM blocks ORDER BY number DESC').fetchall()
+        if not rows or self._chain_hash(rows[0]['number']) == rows[0]['hash']:
+            return None
+        for row in rows[1:]:
+            if self._chain_hash(row['number']) == row['hash']:
+                return row['number']
+        raise RuntimeError(f"Reorg más profunda que {self.reorg_depth} bloques: reindexar desde cero")
+
+    def _chain_hash(self, number):
+        try:
+            return Web3.to_hex(self.w3.eth.get_block(number)['hash'])
+        except BlockNotFound:
+            # La cadena nueva todavía es más corta que la indexada
+            return None
+
+    def rollback(self, ancestor):
+        """Borra todo lo indexado después de `ancestor`."""
+        with self.db:
+            for _, table, _ in EVENTS.values():
+                self.db.execute(f'DELETE FROM {table} WHERE block_number > ?', (ancestor,))
+            self.db.execute('DELETE FROM blocks WHERE number > ?', (ancestor,))
+            self._set_last_block(ancestor)
+        logger.warning(f"🔀 Reorg detectada: reindexando desde el bloque {ancestor + 1}")
+
+    # === Indexado ===
+    def _get_logs(self, from_block, to_block):
+        return self.w3.eth.get_logs({
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': list(self.addresses.values()),
+            'topics': [[Web3.to_hex(topic) for topic in self.topics]],
+        })
+
+    def _store(self, logs, from_block, to_block, chain_head):
+        counts = {}
+        with self.db:
+            for log in logs:
+                name = self.topics.get(bytes(log['topics'][0]))
+                if name is None:
+                    continue
+                contract_key, table, fields = EVENTS[name]
+                args = self.contracts[contract_key].events[name]().process_log(log)['args']
+                values = [args[arg] if sql_type == 'INTEGER' else str(args[arg]) for arg, _, _, sql_type in fields]
+                columns = ', '.join(column for _, _, column, _ in fields)
+                self.db.execute(
+                    f'INSERT OR REPLACE INTO {table} (block_number, tx_hash, log_index, {columns}) '
+                    f'VALUES (?, ?, ?, {", ".join("?" * len(fields))})',
+                    [log['blockNumber'], Web3.to_hex(log['transactionHash']), log['logIndex']] + values
+                )
+                counts[name] = counts.get(name, 0) + 1
+            # Solo los bloques que todavía pueden sufrir una reorg
+            for number in range(max(from_block, chain_head - self.reorg_depth + 1), to_block + 1):
+                self._remember_block(number, self.w3.eth.get_block(number)['hash'])
+            self.db.execute('DELETE FROM blocks WHERE number <= ?', (to_block - self.reorg_depth,))
+            self._set_last_block(to_block)
+        return counts
+
+    def sync(self, to_block=None):
+        """Indexa hasta `to_block` (default: cabeza - `confirmations`). Devuelve la cantidad de eventos."""
+        ancestor = self.check_reorg()
+        if ancestor is not None:
+            self.rollback(ancestor)
+
+        chain_head = self.w3.eth.block_number
+        head = chain_head - self.confirmations if to_block is None else min(to_block, chain_head)
+        total = 0
+        from_block = self.last_block + 1
+        while from_block <= head:
+            end = min(from_block + self.batch_size - 1, head)
+            try:
+                logs = self._get_logs(from_block, end)
+            except Exception as e:
+                if self.batch_size > 1 and any(error in str(e).lower() for error in RANGE_ERRORS):
+                    self.batch_size = max(1, self.batch_size // 2)
+                    logger.info(f"📉 Rango rechazado por el provider, bajando a {self.batch_size} bloques")
+                    continue
+                raise
+            counts = self._store(logs, from_block, end, chain_head)
+            total += sum(counts.values())
+            if counts:
+                logger.info(f"📥 Bloques {from_block}-{end}: {counts}")
+            self.batch_size = min(self.batch_size * 2, self.max_batch_size)
+            from_block = end + 1
+        return total
+
+    def run_forever(self, poll_interval=12):
+        logger.info(f"🚀 Indexando desde el bloque {self.last_block + 1}...")
+        while True:
+            try:
+                self.sync()
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error indexando: {e}")
+            time.sleep(poll_interval)
+
+    # === Consultas ===
+    def round_summary(self, round_id):
+        """Pozo, apuestas por rango y resultado de una ronda (todo en wei)."""
+        ranges, bettors = {}, set()
+        for row in self.db.execute('SELECT bettor, range_index, amount FROM bets WHERE round_id = ?', (round_id,)):
+            ranges[row['range_index']] = ranges.get(row['range_index'], 0) + int(row['amount'])
+            bettors.add(row['bettor'])
+        resolution = self.db.execute(
+            'SELECT actual_price, winning_range FROM resolutions WHERE round_id = ?', (round_id,)
+        ).fetchone()
+        prizes = self.db.execute('SELECT amount FROM prizes WHERE round_id = ?', (round_id,)).fetchall()
+        refunds = self.db.execute('SELECT amount FROM refunds WHERE round_id = ?', (round_id,)).fetchall()
+        return {
+            'round_id': round_id,
+            'total_pool': sum(ranges.values()),
+            'ranges': dict(sorted(ranges.items())),
+            'bettors': len(bettors),
+            'resolved': resolution is not None,
+            'actual_price': int(resolution['actual_price']) if resolution else None,
+            'winning_range': resolution['winning_range'] if resolution else None,
+            'prizes_paid': sum(int(row['amount']) for row in prizes),
+            'refunds_paid': sum(int(row['amount']) for row in refunds),
+        }
+
+    def range_bets(self, round_id, range_index):
+        """{apostador: monto} de un rango, como `getUserBet` para todos los usuarios."""
+        totals = {}
+        for row in self.db.execute(
+            'SELECT bettor, amount FROM bets WHERE round_id = ? AND range_index = ?', (round_id, range_index)
+        ):
+            totals[row['bettor']] = totals.get(row['bettor'], 0) + int(row['amount'])
+        return totals
+
+    def user_bets(self, address, round_id=None):
+        query = 'SELECT round_id, range_index, amount, block_number, tx_hash FROM bets WHERE bettor = ?'
+        params = [Web3.to_checksum_address(address)]
+        if round_id is not None:
+            query += ' AND round_id = ?'
+            params.append(round_id)
+        return [dict(row) for row in self.db.execute(query + ' ORDER BY block_number, log_index', params)]
+
+    def user_prizes(self, address):
+        return [dict(row) for row in self.db.execute(
+            'SELECT round_id, amount, block_number, tx_hash FROM prizes WHERE winner = ? ORDER BY block_number',
+            (Web3.to_checksum_address(address),)
+        )]
+
+    def stats(self):
+        counts = {table: self.db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for _, table, _ in EVENTS.values()}
+        return {'last_block': self.last_block, 'batch_size': self.batch_size, 'events': counts}
+
+
+def main():
+    from dotenv import load_dotenv
+    from log_config import setup_logging
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Indexador de eventos de ETHPriceBetting y PriceOracle")
+    parser.add_argument('--rpc', default=os.getenv('INDEXER_RPC_URL', os.getenv('SEPOLIA_RPC_URL', 'http://127.0.0.1:8545')))
+    parser.add_argument('--deployment', help="deployments/<red>.json (default: BETTING_ADDRESS/ORACLE_ADDRESS)")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--start-block', type=int, default=int(os.getenv('INDEXER_START_BLOCK', 0)))
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--reorg-depth', type=int, default=64)
+    parser.add_argument('--confirmations', type=int, default=0)
+    parser.add_argument('--poll', type=float, default=12, help="Segundos entre pasadas")
+    parser.add_argument('--once', action='store_true', help="Indexar hasta la cabeza y salir")
+    parser.add_argument('--round', type=int, help="Mostrar el resumen de una ronda después de indexar")
+    args = parser.parse_args()
+    setup_logging(log_file=os.getenv('LOG_FILE', ''), fmt=os.getenv('LOG_FORMAT', 'text'))
+
+    betting, oracle = os.getenv('BETTING_ADDRESS'), os.getenv('ORACLE_ADDRESS')
+    if args.deployment:
+        with open(args.deployment) as f:
+            deployment = json.load(f)
+        betting, oracle = deployment['betting'], deployment.get('oracle')
+    if not betting:
+        raise ValueError("Falta la dirección de ETHPriceBetting (--deployment o BETTING_ADDRESS)")
+
+    w3 = Web3(Web3.HTTPProvider(args.rpc))
+    indexer = EventIndexer(
+        w3, betting, oracle, db_path=args.db, start_block=args.start_block,
+        batch_size=args.batch_size, reorg_depth=args.reorg_depth, confirmations=args.confirmations,
+    )
+    if args.once or args.round is not None:
+        indexer.sync()
+        print(json.dumps(indexer.stats(), indent=2))
+        if args.round is not None:
+            print(json.dumps(indexer.round_summary(args.round), indent=2))
+    else:
+        try:
+            indexer.run_forever(args.poll)
+        except KeyboardInterrupt:
+            logger.info("🛑 Deteniendo indexador...")
+
+
+if __name__ == "__main__":
+    main()
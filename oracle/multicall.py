@@ -0,0 +1,232 @@
+"""Lecturas agrupadas de contratos con Multicall3.
+
+`MulticallReader.aggregate` empaqueta varias llamadas `view` en un único
+`eth_call` a `aggregate3` e incluye `getBlockNumber()` en el mismo pedido, así
+cada resultado sabe de qué bloque es. Los resultados se cachean por bloque:
+pedir lo mismo para un bloque ya leído no hace ningún request, y las lecturas
+de `latest` se reutilizan durante `max_age` segundos.
+
+`round_snapshot` arma el estado completo de una ronda (`getRoundInfo`, los
+`getRangeInfo` de todos los rangos y los `getUserBet` pedidos) en un solo
+round trip, en lugar de 1 + N + usuarios × N. La cantidad de rangos se lee una
+vez de `rangeCount()` (es inmutable en el contrato).
+
+Si no hay Multicall3 en la red (nodo local sin desplegarlo), cae a llamadas
+individuales con el mismo resultado.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+# Dirección canónica de Multicall3 (Sepolia, mainnet y la mayoría de las redes)
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [{
+            "components": [
+                {"name": "target", "type": "address"},
+                {"name": "allowFailure", "type": "bool"},
+                {"name": "callData", "type": "bytes"}
+            ],
+            "name": "calls",
+            "type": "tuple[]"
+        }],
+        "name": "aggregate3",
+        "outputs": [{
+            "components": [
+                {"name": "success", "type": "bool"},
+                {"name": "returnData", "type": "bytes"}
+            ],
+            "name": "returnData",
+            "type": "tuple[]"
+        }],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"name": "blockNumber", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+class Call(namedtuple('Call', 'contract fn_name args')):
+    """Llamada `view` a agrupar: `Call(betting_contract, 'getRangeInfo', (round_id, 3))`."""
+
+    def __new__(cls, contract, fn_name, args=()):
+        return super().__new__(cls, contract, fn_name, tuple(args))
+
+    @property
+    def key(self):
+        return (self.contract.address, self.fn_name, self.args)
+
+    def output_types(self):
+        return [output['type'] for output in self.contract.get_function_by_name(self.fn_name).abi['outputs']]
+
+    def encode(self):
+        return self.contract.encodeABI(fn_name=self.fn_name, args=list(self.args))
+
+    def decode(self, w3, data):
+        values = w3.codec.decode(self.output_types(), data)
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def call(self, block_identifier):
+        return getattr(self.contract.functions, self.fn_name)(*self.args).call(block_identifier=block_identifier)
+
+
+class MulticallReader:
+    def __init__(self, w3, address=None, max_age=2.0, cached_blocks=16, max_calls=500):
+        self.w3 = w3
+        self.address = Web3.to_checksum_address(address or os.getenv('MULTICALL_ADDRESS', MULTICALL3_ADDRESS))
+        self.multicall = w3.eth.contract(address=self.address, abi=MULTICALL3_ABI)
+        self.max_age = max_age
+        self.cached_blocks = cached_blocks
+        self.max_calls = max_calls
+
+        self._lock = threading.Lock()
+        self._available = None
+        # bloque -> {clave de llamada: resultado}
+        self._cache = OrderedDict()
+        self._latest = (None, 0.0)
+        self._range_counts = {}
+        self.round_trips = 0
+        self.cache_hits = 0
+
+    @property
+    def available(self):
+        if self._available is None:
+            self._available = len(self.w3.eth.get_code(self.address)) > 0
+            if not self._available:
+                logger.warning(f"⚠️  No hay Multicall3 en {self.address}: se usan llamadas individuales")
+        return self._available
+
+    # === Cache por bloque ===
+    def _cached(self, block, calls):
+        entries = self._cache.get(block)
+        if entries is None or any(call.key not in entries for call in calls):
+            return None
+        return [entries[call.key] for call in calls]
+
+    def _store(self, block, calls, results):
+        entries = self._cache.setdefault(block, {})
+        self._cache.move_to_end(block)
+        entries.update({call.key: result for call, result in zip(calls, results)})
+        while len(self._cache) > self.cached_blocks:
+            self._cache.popitem(last=False)
+
+    # === Lectura ===
+    def aggregate(self, calls, block_identifier='latest'):
+        """Ejecuta `calls` en un solo eth_call; devuelve (bloque, resultados en orden).
+
+        Una llamada que revierte devuelve None en su posición.
+        """
+        calls = list(calls)
+        with self._lock:
+            block = block_identifier
+            if block == 'latest':
+                latest, read_at = self._latest
+                if latest is not None and time.monotonic() - read_at < self.max_age:
+                    block = latest
+            if isinstance(block, int):
+                cached = self._cached(block, calls)
+                if cached is not None:
+                    self.cache_hits += 1
+                    return block, cached
+
+        block, results = self._fetch(calls, block_identifier)
+
+        with self._lock:
+            self._store(block, calls, results)
+            if block_identifier == 'latest':
+                self._latest = (block, time.monotonic())
+        return block, results
+
+    def _fetch(self, calls, block_identifier):
+        if not self.available:
+            block = self.w3.eth.block_number if block_identifier == 'latest' else block_identifier
+            results = []
+            for call in calls:
+                try:
+                    results.append(call.call(block))
+                except Exception:
+                    results.append(None)
+            self.round_trips += len(calls) + (block_identifier == 'latest')
+            return block, results
+
+        block, results = None, []
+        # Lotes de `max_calls` para no pasar el límite de gas del eth_call
+        for start in range(0, len(calls), self.max_calls):
+            chunk = calls[start:start + self.max_calls]
+            payload = [(self.address, False, self.multicall.encodeABI(fn_name='getBlockNumber'))]
+            payload += [(call.contract.address, True, call.encode()) for call in chunk]
+            # Todos los lotes se leen del mismo bloque que el primero
+            responses = self.multicall.functions.aggregate3(payload).call(
+                block_identifier=block if block is not None else block_identifier
+            )
+            self.round_trips += 1
+            if block is None:
+                block = self.w3.codec.decode(['uint256'], responses[0][1])[0]
+            for call, (success, data) in zip(chunk, responses[1:]):
+                results.append(call.decode(self.w3, data) if success and data else None)
+        return block, results
+
+    def range_count(self, betting_contract):
+        """`rangeCount()` del contrato de apuestas, leído una sola vez por dirección."""
+        address = betting_contract.address
+        if address not in self._range_counts:
+            self._range_counts[address] = betting_contract.functions.rangeCount().call()
+        return self._range_counts[address]
+
+    def round_snapshot(self, betting_contract, round_id, users=(), range_count=None, block_identifier='latest'):
+        """Estado completo de una ronda en un solo round trip.
+
+        `ranges[i]` es el rango `i`; si su `getRangeInfo` falló, queda None en esa posición.
+        """
+        if range_count is None:
+            range_count = self.range_count(betting_contract)
+        users = [Web3.to_checksum_address(u) for u in users]
+        calls = [Call(betting_contract, 'getRoundInfo', (round_id,))]
+        calls += [Call(betting_contract, 'getRangeInfo', (round_id, i)) for i in range(range_count)]
+        calls += [Call(betting_contract, 'getUserBet', (round_id, i, u)) for u in users for i in range(range_count)]
+        block, results = self.aggregate(calls, block_identifier)
+
+        info = results[0]
+        if info is None:
+            raise ValueError(f"getRoundInfo({round_id}) revirtió")
+        ranges = [
+            {'min_price': r[0], 'max_price': r[1], 'total_bets': r[2]} if r is not None else None
+            for r in results[1:1 + range_count]
+        ]
+        bets = {}
+        user_results = results[1 + range_count:]
+        for j, user in enumerate(users):
+            amounts = user_results[j * range_count:(j + 1) * range_count]
+            bets[user] = {i: amount for i, amount in enumerate(amounts) if amount}
+        return {
+            'block': block,
+            'round_id': info[0],
+            'target_time': info[1],
+            'actual_price': info[2],
+            'resolved': info[3],
+            'total_pool': info[4],
+            'ranges': ranges,
+            'bets': bets,
+        }
+
+    def stats(self):
+        return {
+            'multicall': self.address if self.available else None,
+            'round_trips': self.round_trips,
+            'cache_hits': self.cache_hits,
+            'cached_blocks': len(self._cache),
+        }
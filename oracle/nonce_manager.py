@@ -0,0 +1,267 @@
+"""Manejo local de nonces para la cuenta del oráculo.
+
+El contador se sincroniza con la cadena una vez y después se incrementa en
+memoria, así varias transacciones `updatePrice` pueden estar en vuelo a la
+vez sin pedir `get_transaction_count` para cada una ni pisarse entre sí.
+Las transacciones enviadas quedan registradas hasta que aparece su receipt;
+si alguna se traba, se reemplaza con el mismo nonce y gas más alto.
+
+Con `journal_path`, las transacciones en vuelo se guardan en un JSON chico
+que `reconcile` vuelve a cargar: después de reiniciar el proceso se siguen
+buscando sus receipts y se reemplazan si estaban trabadas.
+
+Solo usa `w3.eth` (`get_transaction_count`, `send_raw_transaction`,
+`get_transaction_receipt`, `gas_price`) y la firma local de la cuenta, por lo
+que funciona igual contra Sepolia, un nodo de desarrollo (Hardhat) o un
+provider mockeado.
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from web3.exceptions import TransactionNotFound
+
+logger = logging.getLogger(__name__)
+
+NONCE_ERRORS = ('nonce too low', 'already known', 'replacement transaction underpriced', 'nonce has already been used')
+
+
+class PendingTransaction:
+    def __init__(self, nonce, transaction, tx_hash):
+        self.nonce = nonce
+        self.transaction = dict(transaction)
+        self.tx_hashes = [tx_hash]
+        self.sent_at = time.time()
+        self.replacements = 0
+
+    @property
+    def gas_price(self):
+        return self.transaction['gasPrice']
+
+    @property
+    def tx_hash(self):
+        return self.tx_hashes[-1]
+
+    def to_json(self):
+        return {
+            'transaction': self.transaction,
+            'tx_hashes': [to_hex(tx_hash) for tx_hash in self.tx_hashes],
+            'sent_at': self.sent_at,
+            'replacements': self.replacements,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        transaction = data['transaction']
+        pending = cls(transaction['nonce'], transaction, data['tx_hashes'][0])
+        pending.tx_hashes = list(data['tx_hashes'])
+        pending.sent_at = data['sent_at']
+        pending.replacements = data.get('replacements', 0)
+        return pending
+
+
+def to_hex(tx_hash):
+    if isinstance(tx_hash, str):
+        return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+    return '0x' + bytes(tx_hash).hex()
+
+
+class NonceManager:
+    def __init__(self, w3, account, bump_ratio=1.125, stuck_after=180, max_gas_price=None, journal_path=None):
+        self.w3 = w3
+        self.account = account
+        self.bump_ratio = bump_ratio
+        self.stuck_after = stuck_after
+        self.max_gas_price = max_gas_price
+        self.journal_path = journal_path
+
+        self._lock = threading.RLock()
+        self._next_nonce = None
+        self._released = []
+        self.pending = {}
+        # Últimos receipts confirmados, para quien los consulte después de que otro hilo los encontró
+        self.confirmed = OrderedDict()
+        self.confirmed_limit = 256
+
+    # === Contador ===
+    def sync(self):
+        """Alinea el contador local con los nonces que la cadena ya conoce (incluye mempool)."""
+        with self._lock:
+            chain_nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+            self._next_nonce = max(chain_nonce, self._next_nonce or 0)
+            self._released = [n for n in self._released if n >= chain_nonce]
+            heapq.heapify(self._released)
+            return self._next_nonce
+
+    def reserve(self):
+        """Reserva el próximo nonce libre (reutiliza primero los liberados)."""
+        with self._lock:
+            if self._next_nonce is None:
+                self.sync()
+            if self._released:
+                return heapq.heappop(self._released)
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def release(self, nonce):
+        """Devuelve un nonce reservado que finalmente no se envió."""
+        with self._lock:
+            if nonce in self.pending:
+                return
+            if nonce == self._next_nonce - 1:
+                self._next_nonce -= 1
+            else:
+                heapq.heappush(self._released, nonce)
+
+    # === Journal ===
+    def _save_journal(self):
+        """Escribe las transacciones en vuelo (llamar con el lock tomado)."""
+        if not self.journal_path:
+            return
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({str(nonce): p.to_json() for nonce, p in self.pending.items()}, f)
+        os.replace(tmp_path, self.journal_path)
+
+    def _load_journal(self):
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return {}
+        try:
+            with open(self.journal_path) as f:
+                entries = json.load(f)
+            return {int(nonce): PendingTransaction.from_json(data) for nonce, data in entries.items()}
+        except (ValueError, KeyError, IndexError) as e:
+            logger.warning(f"⚠️  Journal de nonces ilegible ({self.journal_path}): {e}")
+            return {}
+
+    # === Envío y seguimiento ===
+    def _sign_and_send(self, transaction):
+        signed = self.w3.eth.account.sign_transaction(transaction, self.account.key)
+        return self.w3.eth.send_raw_transaction(signed.rawTransaction)
+
+    def track(self, transaction, tx_hash):
+        with self._lock:
+            self.pending[transaction['nonce']] = PendingTransaction(transaction['nonce'], transaction, tx_hash)
+            self._save_journal()
+
+    def send(self, transaction):
+        """Firma, envía y registra una transacción que ya tiene nonce asignado."""
+        try:
+            tx_hash = self._sign_and_send(transaction)
+        except ValueError as e:
+            if any(error in str(e).lower() for error in NONCE_ERRORS):
+                # Otro proceso usó el nonce: resincronizar para la próxima
+                self.sync()
+            raise
+        self.track(transaction, tx_hash)
+        return tx_hash
+
+    def find_receipt(self, nonce):
+        """Busca el receipt de cualquiera de los hashes enviados con ese nonce."""
+        with self._lock:
+            if nonce in self.confirmed:
+                return self.confirmed[nonce]
+            pending = self.pending.get(nonce)
+            tx_hashes = list(pending.tx_hashes) if pending else []
+        for tx_hash in reversed(tx_hashes):
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            if receipt is not None:
+                with self._lock:
+                    if self.pending.pop(nonce, None) is not None:
+                        self._save_journal()
+                    self.confirmed[nonce] = receipt
+                    while len(self.confirmed) > self.confirmed_limit:
+                        self.confirmed.popitem(last=False)
+                return receipt
+        return None
+
+    def poll_pending(self):
+        """Revisa todas las transacciones en vuelo; devuelve {nonce: receipt} de las confirmadas."""
+        with self._lock:
+            nonces = list(self.pending)
+        confirmed = {}
+        for nonce in nonces:
+            receipt = self.find_receipt(nonce)
+            if receipt is not None:
+                confirmed[nonce] = receipt
+        return confirmed
+
+    def replace_stuck(self, now=None):
+        """Reenvía con gas más alto las transacciones sin receipt después de `stuck_after` segundos."""
+        now = now or time.time()
+        with self._lock:
+            stuck = [p for p in self.pending.values() if now - p.sent_at >= self.stuck_after]
+        replaced = []
+        for pending in stuck:
+            if self.find_receipt(pending.nonce) is not None:
+                continue
+            # Los nodos exigen al menos +10% para aceptar un reemplazo
+            new_gas_price = max(math.ceil(pending.gas_price * self.bump_ratio), self.w3.eth.gas_price)
+            if self.max_gas_price is not None and new_gas_price > self.max_gas_price:
+                continue
+            transaction = dict(pending.transaction, gasPrice=new_gas_price)
+            try:
+                tx_hash = self._sign_and_send(transaction)
+            except ValueError as e:
+                if 'nonce too low' in str(e).lower():
+                    # Se confirmó una de las versiones anteriores
+                    continue
+                raise
+            with self._lock:
+                pending.transaction = transaction
+                pending.tx_hashes.append(tx_hash)
+                pending.sent_at = now
+                pending.replacements += 1
+                self._save_journal()
+            replaced.append((pending.nonce, tx_hash))
+        return replaced
+
+    def reconcile(self):
+        """Después de un reinicio: recupera del journal lo que estaba en vuelo,
+        descarta lo ya minado y realinea el contador con la cadena.
+
+        Devuelve los nonces que quedaron como hueco (reservados localmente pero
+        desconocidos para la cadena), que se reutilizan en las próximas reservas.
+        """
+        address = self.account.address
+        with self._lock:
+            for nonce, pending in self._load_journal().items():
+                self.pending.setdefault(nonce, pending)
+            mined = self.w3.eth.get_transaction_count(address, 'latest')
+            for nonce in [n for n in self.pending if n < mined]:
+                del self.pending[nonce]
+            self._save_journal()
+
+            chain_nonce = self.w3.eth.get_transaction_count(address, 'pending')
+            self.sync()
+            if self.pending:
+                # Una transacción del journal que el nodo descartó sigue ocupando su nonce
+                self._next_nonce = max(self._next_nonce, max(self.pending) + 1)
+            gaps = [
+                n for n in range(chain_nonce, self._next_nonce)
+                if n not in self.pending and n not in self._released
+            ]
+            for nonce in gaps:
+                heapq.heappush(self._released, nonce)
+            return gaps
+
+    def stats(self):
+        with self._lock:
+            return {
+                'next_nonce': self._next_nonce,
+                'in_flight': len(self.pending),
+                'released': sorted(self._released),
+                'replacements': sum(p.replacements for p in self.pending.values()),
+            }
@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 import time
@@ -8,9 +9,29 @@ from dotenv import load_dotenv
 
 # Importar módulos ML
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from ml.predict import predict_next_price
+from ml.predict import predict_next_price, model_holder
+from oracle.nonce_manager import NonceManager
+from oracle.multicall import MulticallReader
+from profiling import SamplingProfiler, SlowLog, install_signal_handler
+from log_config import setup_logging
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Rondas cuya resolución tarda más que ORACLE_SLOW_MS quedan en profiles/oracle-slow.json
+profiler = SamplingProfiler()
+slow_rounds = SlowLog(
+    float(os.getenv('ORACLE_SLOW_MS', 120000)),
+    capacity=100,
+    path=os.path.join(profiler.output_dir, 'oracle-slow.json')
+)
+
+# Las rondas de ETHPriceBetting van en una grilla fija de ROUND_DURATION segundos
+ROUND_DURATION = 3600
+# Máximo de rondas atrasadas por transacción updatePrices
+MAX_BATCH = int(os.getenv('ORACLE_MAX_BATCH', 24))
+BATCH_GAS_BASE = 60000
+BATCH_GAS_PER_ROUND = 130000
 
 class SepoliaOracleService:
     def __init__(self):
@@ -24,7 +45,7 @@ class SepoliaOracleService:
         if not self.w3.is_connected():
             raise ConnectionError("No se pudo conectar a Sepolia")
         
-        print(f"✅ Conectado a Sepolia - Block: {self.w3.eth.block_number}")
+        logger.info(f"✅ Conectado a Sepolia - Block: {self.w3.eth.block_number}")
         
         # Cargar configuración
         self.oracle_address = os.getenv('ORACLE_ADDRESS')
@@ -37,15 +58,24 @@ class SepoliaOracleService:
         # Configurar cuenta
         self.account = self.w3.eth.account.from_key(private_key)
         
-        print(f"🔑 Usando cuenta: {self.account.address}")
+        logger.info(f"🔑 Usando cuenta: {self.account.address}")
+        
+        # Nonces locales: varias transacciones en vuelo sin consultar la cadena cada vez
+        # Las transacciones en vuelo se guardan en ORACLE_NONCE_JOURNAL para retomarlas al reiniciar
+        self.nonces = NonceManager(
+            self.w3, self.account,
+            journal_path=os.getenv('ORACLE_NONCE_JOURNAL', 'data/oracle-pending.json')
+        )
+        gaps = self.nonces.reconcile()
+        logger.info(f"🔢 Próximo nonce: {self.nonces.stats()['next_nonce']}" + (f" (huecos: {gaps})" if gaps else ""))
         
         # Verificar balance
         balance = self.w3.eth.get_balance(self.account.address)
         balance_eth = self.w3.from_wei(balance, 'ether')
-        print(f"💰 Balance: {balance_eth:.4f} ETH")
+        logger.info(f"💰 Balance: {balance_eth:.4f} ETH")
         
         if balance_eth < 0.01:
-            print("⚠️  Advertencia: Balance bajo, necesitás más ETH para las transacciones")
+            logger.warning("⚠️  Advertencia: Balance bajo, necesitás más ETH para las transacciones")
         
         # ABIs de contratos
         self.oracle_abi = [
@@ -56,6 +86,13 @@ class SepoliaOracleService:
                 "stateMutability": "nonpayable",
                 "type": "function"
             },
+            {
+                "inputs": [{"name": "roundIds", "type": "uint256[]"}, {"name": "prices", "type": "uint256[]"}],
+                "name": "updatePrices",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
             {
                 "inputs": [],
                 "name": "getLatestPrice",
@@ -73,6 +110,13 @@ class SepoliaOracleService:
                 "stateMutability": "view",
                 "type": "function"
             },
+            {
+                "inputs": [],
+                "name": "rangeCount",
+                "outputs": [{"name": "", "type": "uint256"}],
+                "stateMutability": "view",
+                "type": "function"
+            },
             {
                 "inputs": [{"name": "roundId", "type": "uint256"}],
                 "name": "getRoundInfo",
@@ -85,6 +129,28 @@ class SepoliaOracleService:
                 ],
                 "stateMutability": "view",
                 "type": "function"
+            },
+            {
+                "inputs": [{"name": "roundId", "type": "uint256"}, {"name": "rangeIndex", "type": "uint256"}],
+                "name": "getRangeInfo",
+                "outputs": [
+                    {"name": "minPrice", "type": "uint256"},
+                    {"name": "maxPrice", "type": "uint256"},
+                    {"name": "totalBets", "type": "uint256"}
+                ],
+                "stateMutability": "view",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                    {"name": "roundId", "type": "uint256"},
+                    {"name": "rangeIndex", "type": "uint256"},
+                    {"name": "user", "type": "address"}
+                ],
+                "name": "getUserBet",
+                "outputs": [{"name": "", "type": "uint256"}],
+                "stateMutability": "view",
+                "type": "function"
             }
         ]
         
@@ -99,8 +165,18 @@ class SepoliaOracleService:
             abi=self.betting_abi
         )
         
-        print(f"📜 Oracle: {self.oracle_address}")
-        print(f"📜 Betting: {self.betting_address}")
+        logger.info(f"📜 Oracle: {self.oracle_address}")
+        logger.info(f"📜 Betting: {self.betting_address}")
+        
+        # Lecturas agrupadas en un solo eth_call (Multicall3), cacheadas por bloque
+        self.reader = MulticallReader(self.w3)
+        
+        # Modelo residente compartido con predict_next_price, con recarga en caliente
+        self.model_holder = model_holder
+        self.model_holder.get()
+        self.model_holder.start_watching()
+        stats = self.model_holder.stats()
+        logger.info(f"🧠 Modelo cargado en {stats['load_time_ms']} ms (hash {(self.model_holder.model_hash or '?')[:12]}...)")
     
     def get_gas_price(self):
         """Obtiene precio de gas dinámico"""
@@ -117,114 +193,251 @@ class SepoliaOracleService:
             current_round_id = self.betting_contract.functions.currentRoundId().call()
             current_time = int(time.time())
             
-            print(f"🔍 Verificando ronda {current_round_id}...")
+            logger.info(f"🔍 Verificando ronda {current_round_id}...")
             
-            # Verificar ronda actual
-            round_info = self.betting_contract.functions.getRoundInfo(current_round_id).call()
-            round_id, target_time, actual_price, resolved, total_pool = round_info
+            # Verificar ronda actual: info y rangos en un solo round trip
+            snapshot = self.get_round_snapshot(current_round_id)
+            target_time, resolved, total_pool = snapshot['target_time'], snapshot['resolved'], snapshot['total_pool']
             
             pool_eth = self.w3.from_wei(total_pool, 'ether')
-            print(f"⏰ Target: {datetime.fromtimestamp(target_time)}")
-            print(f"💰 Pool: {pool_eth:.4f} ETH")
-            print(f"✅ Resuelta: {resolved}")
+            logger.info(f"⏰ Target: {datetime.fromtimestamp(target_time)}")
+            logger.info(f"💰 Pool: {pool_eth:.4f} ETH")
+            logger.info(f"✅ Resuelta: {resolved}")
+            for i, r in enumerate(snapshot['ranges']):
+                if r is None:
+                    logger.warning(f"⚠️  Rango {i}: getRangeInfo falló")
+                elif r['total_bets']:
+                    logger.info(f"   Rango {i} (${self.w3.from_wei(r['min_price'], 'ether'):,.0f}-"
+                                f"${self.w3.from_wei(r['max_price'], 'ether'):,.0f}): "
+                                f"{self.w3.from_wei(r['total_bets'], 'ether'):.4f} ETH")
+            
+            # Si el oráculo se atrasó, las rondas siguientes ya vencieron: van todas en un updatePrices
+            backlog = [] if resolved else self.pending_rounds(current_round_id, target_time, current_time)
+            if len(backlog) > 1:
+                logger.info(f"📚 {len(backlog)} rondas atrasadas ({backlog[0][0]}-{backlog[-1][0]}), resolviendo en lote...")
+                self.resolve_backlog(backlog)
+                return True
             
             if not resolved and current_time >= target_time and total_pool > 0:
-                print(f"🎯 Resolviendo ronda {current_round_id}...")
-                self.resolve_round(current_round_id)
+                logger.info(f"🎯 Resolviendo ronda {current_round_id}...")
+                self.resolve_round(current_round_id, target_time)
                 return True
             
             return False
             
         except Exception as e:
-            print(f"❌ Error verificando rondas: {e}")
+            logger.error(f"❌ Error verificando rondas: {e}")
             return False
     
-    def resolve_round(self, round_id):
+    def get_round_info(self, round_id):
+        """Devuelve (id, targetTime, actualPrice, resolved, totalPool) de una ronda"""
+        return self.betting_contract.functions.getRoundInfo(round_id).call()
+    
+    def get_round_snapshot(self, round_id, users=(), block_identifier='latest'):
+        """Info, rangos y apuestas de `users` de una ronda en un solo eth_call"""
+        return self.reader.round_snapshot(self.betting_contract, round_id, users, block_identifier=block_identifier)
+    
+    def pending_rounds(self, round_id, target_time, now=None):
+        """Rondas vencidas desde `round_id` como [(roundId, targetTime)], hasta MAX_BATCH"""
+        now = int(time.time()) if now is None else now
+        if now < target_time:
+            return []
+        count = min((now - target_time) // ROUND_DURATION + 1, MAX_BATCH)
+        return [(round_id + i, target_time + i * ROUND_DURATION) for i in range(count)]
+    
+    def get_round_prices(self, target_times):
+        """Predicción del modelo para cada ronda, con las velas cerradas a su targetTime"""
+        return [predict_next_price(as_of=target_time)['predicted_price'] for target_time in target_times]
+    
+    def build_update_transaction(self, round_id, predicted_price, nonce=None, gas_price=None):
+        """Arma la transacción updatePrice para una ronda"""
+        price_wei = self.w3.to_wei(predicted_price, 'ether')
+        return self.oracle_contract.functions.updatePrice(
+            round_id,
+            price_wei
+        ).build_transaction({
+            'from': self.account.address,
+            'gas': 200000,
+            'gasPrice': gas_price if gas_price is not None else self.get_gas_price(),
+            'nonce': nonce if nonce is not None else self.nonces.reserve()
+        })
+    
+    def build_batch_transaction(self, round_ids, prices, nonce=None, gas_price=None):
+        """Arma la transacción updatePrices para varias rondas en orden"""
+        prices_wei = [self.w3.to_wei(price, 'ether') for price in prices]
+        return self.oracle_contract.functions.updatePrices(
+            list(round_ids),
+            prices_wei
+        ).build_transaction({
+            'from': self.account.address,
+            'gas': BATCH_GAS_BASE + BATCH_GAS_PER_ROUND * len(round_ids),
+            'gasPrice': gas_price if gas_price is not None else self.get_gas_price(),
+            'nonce': nonce if nonce is not None else self.nonces.reserve()
+        })
+    
+    def sign_transaction(self, transaction):
+        return self.w3.eth.account.sign_transaction(transaction, self.account.key)
+    
+    def send_signed_transaction(self, signed_txn, transaction):
+        """Envía una transacción ya firmada y la registra en el NonceManager"""
+        tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        self.nonces.track(transaction, tx_hash)
+        return tx_hash
+    
+    def wait_for_nonce(self, nonce, timeout=300, poll_interval=3):
+        """Espera el receipt de cualquier versión de la transacción con ese nonce"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            receipt = self.nonces.find_receipt(nonce)
+            if receipt is not None:
+                return receipt
+            for replaced_nonce, tx_hash in self.nonces.replace_stuck():
+                logger.info(f"⛽ TX con nonce {replaced_nonce} reemplazada con más gas: {tx_hash.hex()}")
+            time.sleep(poll_interval)
+        return None
+    
+    def resolve_round(self, round_id, target_time):
         """Resuelve ronda con predicción ML"""
+        started = time.perf_counter()
+        stages = {}
+
+        def mark(name, since):
+            now = time.perf_counter()
+            stages[name] = round((now - since) * 1000, 1)
+            return now
+
         try:
-            print("🤖 Generando predicción ML...")
-            prediction = predict_next_price()
-            predicted_price = prediction['predicted_price']
+            logger.info("🤖 Generando predicción ML...")
+            predicted_price = self.get_round_prices([target_time])[0]
+            checkpoint = mark('predict', started)
             
-            print(f"💡 Precio predicho: ${predicted_price:.2f}")
+            logger.info(f"💡 Precio predicho: ${predicted_price:.2f}")
             
-            # Convertir a wei
-            price_wei = self.w3.to_wei(predicted_price, 'ether')
+            # Preparar, firmar y enviar transacción
+            transaction = self.build_update_transaction(round_id, predicted_price)
+            checkpoint = mark('build', checkpoint)
+            tx_hash = self.nonces.send(transaction)
+            checkpoint = mark('send', checkpoint)
             
-            # Preparar transacción
-            gas_price = self.get_gas_price()
+            logger.info(f"⏳ TX enviada: {tx_hash.hex()}")
             
-            transaction = self.oracle_contract.functions.updatePrice(
-                round_id,
-                price_wei
-            ).build_transaction({
-                'from': self.account.address,
-                'gas': 200000,
-                'gasPrice': gas_price,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address)
-            })
+            # Esperar confirmación (reemplazando con más gas si se traba)
+            receipt = self.wait_for_nonce(transaction['nonce'], timeout=300)
+            mark('confirm', checkpoint)
+            if receipt is None:
+                logger.warning(f"⌛ Sin confirmación para nonce {transaction['nonce']}")
+                return
+            
+            if receipt.status == 1:
+                logger.info(f"✅ Ronda {round_id} resuelta exitosamente!")
+                logger.info(f"⛽ Gas usado: {receipt.gasUsed:,}")
+                logger.info(f"🔗 TX: https://sepolia.etherscan.io/tx/{receipt.transactionHash.hex()}")
+            else:
+                logger.error(f"❌ Transacción de ronda {round_id} falló")
+            
+        except Exception as e:
+            logger.error(f"❌ Error resolviendo ronda {round_id}: {e}")
+        finally:
+            if slow_rounds.maybe_record((time.perf_counter() - started) * 1000, round_id=round_id, stages_ms=stages):
+                logger.warning(f"🐢 Ronda {round_id} lenta: {stages}")
+    
+    def resolve_backlog(self, backlog):
+        """Resuelve varias rondas vencidas en una sola transacción updatePrices"""
+        started = time.perf_counter()
+        stages = {}
+        round_ids = [round_id for round_id, _ in backlog]
+        
+        def mark(name, since):
+            now = time.perf_counter()
+            stages[name] = round((now - since) * 1000, 1)
+            return now
+        
+        try:
+            # Misma regla que una ronda al día: cada una con las velas cerradas a su targetTime.
+            # Si falta el histórico de alguna, el lote se reintenta en el próximo chequeo
+            try:
+                prices = self.get_round_prices([target_time for _, target_time in backlog])
+            except Exception as e:
+                logger.warning(f"⚠️  Sin histórico para predecir las rondas atrasadas ({e}), se reintenta en el próximo chequeo")
+                return
+            checkpoint = mark('predict', started)
             
-            # Firmar y enviar
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            transaction = self.build_batch_transaction(round_ids, prices)
+            checkpoint = mark('build', checkpoint)
+            tx_hash = self.nonces.send(transaction)
+            checkpoint = mark('send', checkpoint)
             
-            print(f"⏳ TX enviada: {tx_hash.hex()}")
+            logger.info(f"⏳ TX enviada: {tx_hash.hex()}")
             
-            # Esperar confirmación
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+            receipt = self.wait_for_nonce(transaction['nonce'], timeout=300)
+            mark('confirm', checkpoint)
+            if receipt is None:
+                logger.warning(f"⌛ Sin confirmación para nonce {transaction['nonce']}")
+                return
             
             if receipt.status == 1:
-                print(f"✅ Ronda {round_id} resuelta exitosamente!")
-                print(f"⛽ Gas usado: {receipt.gasUsed:,}")
-                print(f"🔗 TX: https://sepolia.etherscan.io/tx/{tx_hash.hex()}")
+                logger.info(f"✅ Rondas {round_ids[0]}-{round_ids[-1]} resueltas en una TX!")
+                logger.info(f"⛽ Gas usado: {receipt.gasUsed:,} ({receipt.gasUsed // len(round_ids):,} por ronda)")
+                logger.info(f"🔗 TX: https://sepolia.etherscan.io/tx/{receipt.transactionHash.hex()}")
             else:
-                print(f"❌ Transacción falló")
+                logger.error(f"❌ Transacción de rondas {round_ids[0]}-{round_ids[-1]} falló")
             
         except Exception as e:
-            print(f"❌ Error resolviendo ronda {round_id}: {e}")
+            logger.error(f"❌ Error resolviendo rondas {round_ids[0]}-{round_ids[-1]}: {e}")
+        finally:
+            if slow_rounds.maybe_record((time.perf_counter() - started) * 1000, round_id=round_ids, stages_ms=stages):
+                logger.warning(f"🐢 Lote {round_ids[0]}-{round_ids[-1]} lento: {stages}")
     
     def run_forever(self):
         """Ejecuta el oráculo continuamente"""
-        print("🚀 Iniciando Oracle Service para Sepolia...")
-        print("⏹️  Presiona Ctrl+C para detener")
+        logger.info("🚀 Iniciando Oracle Service para Sepolia...")
+        logger.info("⏹️  Presiona Ctrl+C para detener")
         
         check_interval = 300  # 5 minutos
         
         while True:
             try:
-                print(f"\n🕒 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                logger.info(f"🕒 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                 
                 resolved = self.check_rounds_to_resolve()
                 
                 if resolved:
-                    print("⏳ Esperando 30s antes del próximo check...")
+                    logger.info("⏳ Esperando 30s antes del próximo check...")
                     time.sleep(30)
                 else:
-                    print(f"😴 Esperando {check_interval}s...")
+                    logger.info(f"😴 Esperando {check_interval}s...")
                     time.sleep(check_interval)
                     
             except KeyboardInterrupt:
-                print("\n🛑 Deteniendo Oracle Service...")
+                logger.info("🛑 Deteniendo Oracle Service...")
                 break
             except Exception as e:
-                print(f"❌ Error en loop principal: {e}")
-                print("🔄 Reintentando en 60s...")
+                logger.error(f"❌ Error en loop principal: {e}")
+                logger.info("🔄 Reintentando en 60s...")
                 time.sleep(60)
     
     def run_once(self):
         """Ejecuta una verificación única"""
-        print("🔍 Ejecutando verificación única...")
+        logger.info("🔍 Ejecutando verificación única...")
         self.check_rounds_to_resolve()
 
 if __name__ == "__main__":
+    # Formato y archivo: LOG_FORMAT, LOG_FILE (default oracle.log), LOG_LEVELS... ver log_config.py
+    setup_logging(log_file=os.getenv('LOG_FILE', 'oracle.log'))
     try:
+        # `kill -USR2 <pid>` graba un perfil por muestreo en profiles/ (PROFILE_SECONDS, default 30s)
+        install_signal_handler(profiler, name='oracle')
         oracle = SepoliaOracleService()
         
         if len(sys.argv) > 1 and sys.argv[1] == "--once":
             oracle.run_once()
+        elif len(sys.argv) > 1 and sys.argv[1] == "--async":
+            import asyncio
+            from oracle.async_oracle import AsyncOracleRuntime
+            asyncio.run(AsyncOracleRuntime(oracle).run())
         else:
             oracle.run_forever()
             
     except Exception as e:
-        print(f"💥 Error fatal: {e}")
-        sys.exit(1)
\ No newline at end of file
+        logger.error(f"💥 Error fatal: {e}")
+        sys.exit(1)
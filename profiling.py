@@ -0,0 +1,167 @@
+"""Profiler por muestreo y registro de operaciones lentas.
+
+`SamplingProfiler` toma cada `interval` segundos el stack de todos los hilos
+(`sys._current_frames`) durante un tiempo acotado y escribe los stacks en
+formato "collapsed" (`frame;frame;frame cantidad`), el que leen
+`flamegraph.pl`, speedscope y `inferno`. No instrumenta nada mientras no
+está corriendo, así que puede quedar instalado en producción.
+
+`SlowLog` guarda en un buffer circular acotado las operaciones que superan un
+umbral, con sus tiempos por etapa y lo que haga falta para reproducirlas.
+"""
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+DEFAULT_PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir=DEFAULT_PROFILE_DIR, interval=0.005, max_duration=120):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_duration = max_duration
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_profile = None
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=10, name='profile'):
+        """Arranca un perfil de `duration` segundos en segundo plano.
+
+        Devuelve la ruta del archivo que se va a escribir, o None si ya hay uno corriendo.
+        """
+        duration = min(float(duration), self.max_duration)
+        with self._lock:
+            if self.running:
+                return None
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{name}-{os.getpid()}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded")
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._sample, args=(duration, path), name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return path
+
+    def _sample(self, duration, path):
+        own_id = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                stacks[';'.join(reversed(labels))] += 1
+            time.sleep(self.interval)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp_path, path)
+        self.last_profile = path
+
+    def status(self):
+        profiles = []
+        if os.path.isdir(self.output_dir):
+            profiles = sorted(n for n in os.listdir(self.output_dir) if n.endswith('.folded'))
+        return {
+            'running': self.running,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            'last_profile': self.last_profile,
+            'profiles': profiles,
+        }
+
+
+def install_signal_handler(profiler, signum=None, duration=None, name='profile'):
+    """Un perfil de `duration` segundos cada vez que el proceso recibe `signum`.
+
+    Por defecto SIGUSR2 (`PROFILE_SIGNAL`): gunicorn usa SIGUSR1 en los workers
+    para reabrir logs. Solo se puede llamar desde el hilo principal.
+    """
+    signum = signum or getattr(signal, os.environ.get('PROFILE_SIGNAL', 'SIGUSR2'))
+    duration = duration or float(os.environ.get('PROFILE_SECONDS', 30))
+
+    def handler(sig, frame):
+        profiler.start(duration, name=name)
+
+    signal.signal(signum, handler)
+    return signum
+
+
+class SlowLog:
+    """Buffer circular de operaciones más lentas que `threshold_ms`.
+
+    Si se pasa `path`, el contenido se vuelca a ese archivo JSON cada vez que
+    entra una operación (para procesos sin endpoint HTTP, como el oráculo).
+    """
+
+    def __init__(self, threshold_ms, capacity=200, path=None):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def maybe_record(self, duration_ms, **details):
+        """Registra la operación si superó el umbral. Devuelve True si quedó registrada."""
+        if self.threshold_ms is None or duration_ms < self.threshold_ms:
+            return False
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'duration_ms': round(duration_ms, 2),
+            'pid': os.getpid(),
+            **details,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+            if self.path:
+                self._dump()
+        return True
+
+    def _dump(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(list(self._entries), f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def recent(self, limit=50, min_ms=None):
+        """Las últimas `limit` entradas, de la más nueva a la más vieja."""
+        with self._lock:
+            entries = list(self._entries)
+        if min_ms is not None:
+            entries = [e for e in entries if e['duration_ms'] >= min_ms]
+        return entries[::-1][:limit]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'threshold_ms': self.threshold_ms,
+                'buffered': len(self._entries),
+                'capacity': self._entries.maxlen,
+                'recorded': self.recorded,
+            }
@@ -0,0 +1,243 @@
+"""Rate limiting con token bucket para la API.
+
+Cada combinación (ruta, cliente) tiene un bucket de `requests` tokens que se
+rellena a `requests / per` tokens por segundo: consumir un token es O(1) y no
+hace falta guardar la lista de timestamps de cada request. Los límites se
+configuran por ruta y por API key (header `X-API-Key`).
+
+Backends:
+- `LocalBackend`: dict del proceso, con límite de claves y desalojo de las
+  inactivas. Es el que se usa con `app.run` y en pruebas.
+- `SharedMemoryBackend`: tabla de tamaño fijo en memoria compartida. Creada
+  antes del fork (gunicorn con `preload_app`), la ven todos los workers. Si
+  no hay lugar para una clave nueva, la request se rechaza (nunca se pisa el
+  bucket de un cliente activo) y se cuenta en `table_full`.
+"""
+import hashlib
+import multiprocessing as mp
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+
+class Limit(namedtuple('Limit', ['requests', 'per'])):
+    """`requests` por cada `per` segundos."""
+
+    @property
+    def capacity(self):
+        return float(self.requests)
+
+    @property
+    def refill_rate(self):
+        return self.requests / self.per
+
+    @classmethod
+    def parse(cls, text):
+        """'100/60' -> Limit(100, 60.0)."""
+        requests_, _, per = text.strip().partition('/')
+        return cls(int(requests_), float(per or 60))
+
+
+def parse_limits(text):
+    """'/predict=100/60,/predict/batch=20/60' -> {'/predict': Limit(100, 60.0), ...}."""
+    limits = {}
+    for item in (text or '').split(','):
+        if not item.strip():
+            continue
+        name, _, spec = item.rpartition('=')
+        if not name:
+            raise ValueError(f"Límite inválido: {item!r} (formato nombre=requests/segundos)")
+        limits[name.strip()] = Limit.parse(spec)
+    return limits
+
+
+def _refill(tokens, updated, limit, now):
+    return min(limit.capacity, tokens + max(0.0, now - updated) * limit.refill_rate)
+
+
+# === Backends ===
+class LocalBackend:
+    """Buckets en memoria del proceso, con un máximo de claves.
+
+    Hay un orden LRU por cada período (`per`): dentro de uno, el bucket menos
+    reciente es también el primero en vencer, así el desalojo corta en el
+    primero activo sin que un límite largo tape a los cortos.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = {}  # per -> OrderedDict key -> (tokens, último uso)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, now):
+        """Consume un token. Devuelve (permitido, segundos hasta el próximo token)."""
+        with self._lock:
+            buckets = self._buckets.setdefault(limit.per, OrderedDict())
+            bucket = buckets.pop(key, None)
+            if bucket is None:
+                self._count += 1
+            tokens = limit.capacity if bucket is None else _refill(bucket[0], bucket[1], limit, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            buckets[key] = (tokens, now)
+            if self._count > self.max_keys:
+                self._drop_oldest()
+        return allowed, 0.0 if allowed else (1 - tokens) / limit.refill_rate
+
+    def _drop_oldest(self):
+        # Llamar con el lock tomado. El cliente menos reciente es el primero de alguno de los órdenes
+        oldest = min((b for b in self._buckets.values() if b), key=lambda b: next(iter(b.values()))[1])
+        oldest.popitem(last=False)
+        self._count -= 1
+
+    def evict(self, now):
+        """Borra los buckets que ya se rellenaron por completo (equivalen a uno nuevo)."""
+        removed = 0
+        with self._lock:
+            for per, buckets in self._buckets.items():
+                while buckets:
+                    key, (_, updated) = next(iter(buckets.items()))
+                    if now - updated < per:
+                        break
+                    del buckets[key]
+                    removed += 1
+            self._count -= removed
+        return removed
+
+    def __len__(self):
+        return self._count
+
+
+class SharedMemoryBackend:
+    """Buckets en una tabla de memoria compartida entre procesos.
+
+    Cada slot guarda el hash de la clave (int64) y (tokens, último uso, período)
+    como float64. La tabla tiene tamaño fijo: una clave nueva ocupa un slot libre
+    o vencido entre `probe` candidatos. Si todos están en uso, la request se
+    rechaza: pisar el slot de otro cliente le devolvería el bucket lleno.
+    """
+
+    def __init__(self, slots=4096, probe=8):
+        self.slots = slots
+        self.probe = probe
+        self._lock = mp.Lock()
+        self._keys = mp.Array('q', slots, lock=False)
+        self._values = mp.Array('d', slots * 3, lock=False)
+        self._table_full = mp.Value('q', 0, lock=False)
+
+    @staticmethod
+    def _key_hash(key):
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little', signed=True)
+        return value or 1  # 0 marca un slot libre
+
+    def _slot(self, key_hash, now):
+        """(slot, encontrado) para la clave; slot None si no hay ninguno libre o vencido."""
+        start = key_hash % self.slots
+        free = None
+        for i in range(self.probe):
+            slot = (start + i) % self.slots
+            if self._keys[slot] == key_hash:
+                return slot, True
+            updated, per = self._values[slot * 3 + 1], self._values[slot * 3 + 2]
+            if free is None and (self._keys[slot] == 0 or now - updated >= per):
+                free = slot
+        return free, False
+
+    @property
+    def table_full(self):
+        """Requests rechazadas porque no había slot libre para la clave (todos los workers)."""
+        return self._table_full.value
+
+    def consume(self, key, limit, now):
+        key_hash = self._key_hash(key)
+        with self._lock:
+            slot, found = self._slot(key_hash, now)
+            if slot is None:
+                self._table_full.value += 1
+                return False, limit.per / limit.requests
+            base = slot * 3
+            if found:
+                tokens = _refill(self._values[base], self._values[base + 1], limit, now)
+            else:
+                self._keys[slot] = key_hash
+                tokens = limit.capacity
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._values[base], self._values[base + 1], self._values[base + 2] = tokens, now, limit.per
+        return allowed, 0.0 if allowed else (1 - tokens) / limit.refill_rate
+
+    def evict(self, now):
+        removed = 0
+        with self._lock:
+            for slot in range(self.slots):
+                if self._keys[slot] != 0 and now - self._values[slot * 3 + 1] >= self._values[slot * 3 + 2]:
+                    self._keys[slot] = 0
+                    removed += 1
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for slot in range(self.slots) if self._keys[slot] != 0)
+
+
+# === Limitador ===
+class RateLimiter:
+    def __init__(self, default_limit, backend=None, route_limits=None, key_limits=None, evict_interval=30.0):
+        self.default_limit = default_limit
+        self.backend = backend if backend is not None else LocalBackend()
+        self.route_limits = dict(route_limits or {})
+        self.key_limits = dict(key_limits or {})
+        self.evict_interval = evict_interval
+
+        self.allowed = 0
+        self.rejected = 0
+        self._evictor = None
+
+    def limit_for(self, route, api_key=None):
+        """Límite e identidad del cliente: una API key conocida reemplaza a la IP."""
+        if api_key and api_key in self.key_limits:
+            return self.key_limits[api_key], f"key:{api_key}"
+        return self.route_limits.get(route, self.default_limit), None
+
+    def check(self, route, client_ip, api_key=None, now=None):
+        """Devuelve (permitido, retry_after en segundos)."""
+        if self._evictor is None:
+            self.start_evictor()
+        now = time.time() if now is None else now
+        limit, identity = self.limit_for(route, api_key)
+        allowed, retry_after = self.backend.consume(f"{route}|{identity or client_ip}", limit, now)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return allowed, retry_after
+
+    def start_evictor(self):
+        """Hilo que desaloja periódicamente los buckets inactivos.
+
+        Se arranca en la primera request y no en el import: con gunicorn el
+        import ocurre en el master y los hilos no sobreviven al fork.
+        """
+        if self._evictor is not None:
+            return
+
+        def evict():
+            while True:
+                time.sleep(self.evict_interval)
+                self.backend.evict(time.time())
+
+        self._evictor = threading.Thread(target=evict, name="rate-limit-evictor", daemon=True)
+        self._evictor.start()
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'tracked_keys': len(self.backend),
+            'allowed': self.allowed,
+            'rejected': self.rejected,
+            'table_full': getattr(self.backend, 'table_full', 0),
+            'default_limit': f"{self.default_limit.requests}/{self.default_limit.per:g}s",
+        }
@@ -31,6 +31,17 @@ async function main() {
     console.log("✅ ETHPriceBetting desplegado en:", betting.address);
     console.log("🔗 TX hash:", betting.deployTransaction.hash);
     
+    // En Sepolia y mainnet Multicall3 ya existe en la dirección canónica; en redes locales se despliega
+    let multicallAddress = "0xcA11bde05977b3631167028862bE2a173976CA11";
+    if (hre.network.name !== "sepolia") {
+        console.log("\n📜 Desplegando Multicall3...");
+        const Multicall3 = await hre.ethers.getContractFactory("Multicall3");
+        const multicall = await Multicall3.deploy();
+        await multicall.deployed();
+        multicallAddress = multicall.address;
+        console.log("✅ Multicall3 desplegado en:", multicallAddress);
+    }
+    
     console.log("\n🔧 Configurando Oracle...");
     const setBettingTx = await oracle.setBettingContract(betting.address);
     await setBettingTx.wait();
@@ -41,6 +52,7 @@ async function main() {
         network: hre.network.name,
         oracle: oracle.address,
         betting: betting.address,
+        multicall: multicallAddress,
         deployer: deployer.address,
         timestamp: new Date().toISOString()
     };
@@ -49,6 +61,11 @@ async function main() {
     let envContent = fs.readFileSync('.env', 'utf8');
     envContent = envContent.replace(/ORACLE_ADDRESS=.*/, `ORACLE_ADDRESS=${oracle.address}`);
     envContent = envContent.replace(/BETTING_ADDRESS=.*/, `BETTING_ADDRESS=${betting.address}`);
+    if (/MULTICALL_ADDRESS=.*/.test(envContent)) {
+        envContent = envContent.replace(/MULTICALL_ADDRESS=.*/, `MULTICALL_ADDRESS=${multicallAddress}`);
+    } else {
+        envContent += `\nMULTICALL_ADDRESS=${multicallAddress}\n`;
+    }
     fs.writeFileSync('.env', envContent);
     
     // Guardar deployment info
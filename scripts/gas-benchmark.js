@@ -0,0 +1,94 @@
+const hre = require("hardhat");
+
+// Compara el gas de la liquidación push (contracts/legacy/ETHPriceBettingV1.sol,
+// reparte en resolveRound) contra la pull actual (claim por usuario).
+// Peor caso para V1: todos los apostadores eligen el rango ganador.
+//   BETTORS=10,100,1000 npm run bench:gas
+const BET = hre.ethers.utils.parseEther("0.01");
+const WINNING_RANGE = 1;                                   // $1600 - $1700
+const PRICE = hre.ethers.utils.parseEther("1650");
+
+async function fundedWallets(count) {
+    const wallets = [];
+    for (let i = 0; i < count; i++) {
+        const wallet = hre.ethers.Wallet.createRandom().connect(hre.ethers.provider);
+        await hre.network.provider.send("hardhat_setBalance", [wallet.address, "0x56BC75E2D63100000"]); // 100 ETH
+        wallets.push(wallet);
+    }
+    return wallets;
+}
+
+async function gasOf(txPromise) {
+    const receipt = await (await txPromise).wait();
+    return receipt.gasUsed;
+}
+
+async function measure(contractName, wallets, blockGasLimit) {
+    const [deployer] = await hre.ethers.getSigners();
+    // El deployer hace de oráculo para llamar resolveRound directamente
+    const Factory = await hre.ethers.getContractFactory(contractName);
+    const betting = await Factory.deploy(deployer.address);
+    await betting.deployed();
+    const roundId = await betting.currentRoundId();
+
+    let betGas = hre.ethers.BigNumber.from(0);
+    for (const wallet of wallets) {
+        betGas = betGas.add(await gasOf(betting.connect(wallet).placeBet(roundId, WINNING_RANGE, { value: BET })));
+    }
+
+    await hre.network.provider.send("evm_increaseTime", [3601]);
+    await hre.network.provider.send("evm_mine");
+
+    let resolveGas = null;
+    try {
+        resolveGas = await gasOf(betting.resolveRound(roundId, PRICE, { gasLimit: blockGasLimit }));
+    } catch (error) {
+        console.log(`   ❌ ${contractName}: resolveRound falló con ${wallets.length} apostadores (${error.message.split("\n")[0]})`);
+    }
+
+    let claimGas = hre.ethers.BigNumber.from(0);
+    if (resolveGas && betting.claim) {
+        for (const wallet of wallets) {
+            claimGas = claimGas.add(await gasOf(betting.connect(wallet).claim(roundId)));
+        }
+    }
+
+    return {
+        placeBet: betGas.div(wallets.length).toNumber(),
+        resolveRound: resolveGas ? resolveGas.toNumber() : null,
+        claim: claimGas.isZero() ? null : claimGas.div(wallets.length).toNumber(),
+    };
+}
+
+async function main() {
+    if (hre.network.name !== "hardhat") {
+        console.log("⚠️  El benchmark crea miles de transacciones: correlo en la red hardhat en memoria");
+    }
+    const sizes = (process.env.BETTORS || "10,100,1000").split(",").map(Number);
+    const blockGasLimit = (await hre.ethers.provider.getBlock("latest")).gasLimit;
+
+    const rows = [];
+    for (const n of sizes) {
+        console.log(`\n⏳ ${n} apostadores...`);
+        const wallets = await fundedWallets(n);
+        const v1 = await measure("ETHPriceBettingV1", wallets, blockGasLimit);
+        const v2 = await measure("ETHPriceBetting", wallets, blockGasLimit);
+        rows.push({
+            bettors: n,
+            "V1 placeBet": v1.placeBet,
+            "V1 resolveRound": v1.resolveRound ?? "sin gas",
+            "V1 % bloque": v1.resolveRound ? (100 * v1.resolveRound / blockGasLimit.toNumber()).toFixed(1) : "-",
+            "V2 placeBet": v2.placeBet,
+            "V2 resolveRound": v2.resolveRound,
+            "V2 claim (c/u)": v2.claim,
+        });
+    }
+
+    console.log("\n📊 Gas por operación (promedio por apostador en placeBet y claim):");
+    console.table(rows);
+}
+
+main().catch((error) => {
+    console.error(error);
+    process.exitCode = 1;
+});
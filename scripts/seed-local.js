@@ -0,0 +1,49 @@
+const hre = require("hardhat");
+const fs = require('fs');
+
+// Genera actividad en la red local (hardhat node) para probar el indexador:
+// varias cuentas apuestan en rangos al azar, el oráculo resuelve cada ronda
+// adelantando el reloj de la cadena y los ganadores cobran.
+//   ROUNDS=5 BETS_PER_ROUND=20 npm run seed:local
+async function main() {
+    const deployment = JSON.parse(fs.readFileSync(`deployments/${hre.network.name}.json`, 'utf8'));
+    const rounds = parseInt(process.env.ROUNDS || "3");
+    const betsPerRound = parseInt(process.env.BETS_PER_ROUND || "10");
+
+    const signers = await hre.ethers.getSigners();
+    const oracle = await hre.ethers.getContractAt("PriceOracle", deployment.oracle);
+    const betting = await hre.ethers.getContractAt("ETHPriceBetting", deployment.betting);
+
+    for (let r = 0; r < rounds; r++) {
+        const roundId = await betting.currentRoundId();
+        for (let i = 0; i < betsPerRound; i++) {
+            const bettor = signers[1 + (i % (signers.length - 1))];
+            const rangeIndex = Math.floor(Math.random() * 10);
+            const amount = hre.ethers.utils.parseEther((0.01 * (1 + Math.floor(Math.random() * 10))).toFixed(2));
+            await (await betting.connect(bettor).placeBet(roundId, rangeIndex, { value: amount })).wait();
+        }
+
+        await hre.network.provider.send("evm_increaseTime", [3601]);
+        await hre.network.provider.send("evm_mine");
+
+        const price = 1500 + Math.floor(Math.random() * 1000);
+        await (await oracle.updatePrice(roundId, hre.ethers.utils.parseEther(price.toString()))).wait();
+
+        // Liquidación pull: cada ganador (o cada apostador si no hubo ganadores) cobra con claim()
+        let claims = 0;
+        for (const signer of signers.slice(1)) {
+            if ((await betting.claimable(roundId, signer.address)).gt(0)) {
+                await (await betting.connect(signer).claim(roundId)).wait();
+                claims++;
+            }
+        }
+        console.log(`✅ Ronda ${roundId}: ${betsPerRound} apuestas, resuelta a $${price}, ${claims} cobros`);
+    }
+
+    console.log("📦 Bloque actual:", await hre.ethers.provider.getBlockNumber());
+}
+
+main().catch((error) => {
+    console.error(error);
+    process.exitCode = 1;
+});
@@ -0,0 +1,26 @@
+"""Estado compartido entre los workers de gunicorn.
+
+Los objetos se crean durante el import de app.py. Con `preload_app` ese import
+ocurre en el proceso master, y los workers heredan la memoria compartida al
+hacer fork: los contadores son del servicio completo, no de cada proceso
+(el rate limit compartido está en `rate_limiter.SharedMemoryBackend`). Con
+`app.run` (un solo proceso) funcionan igual.
+"""
+import multiprocessing as mp
+
+
+class SharedCounter:
+    """Contador entero (int64) compartido entre procesos."""
+
+    def __init__(self, initial=0):
+        self._value = mp.Value('q', initial)
+
+    def add(self, n=1):
+        """Suma `n` y devuelve el valor resultante."""
+        with self._value.get_lock():
+            self._value.value += n
+            return self._value.value
+
+    @property
+    def value(self):
+        return self._value.value
@@ -75,7 +75,7 @@ describe("ETH Price Betting System", function () {
             ).to.emit(betting, "RoundResolved");
         });
         
-        it("Should distribute prizes to winners", async function () {
+        it("Should let winners claim their prize", async function () {
             const roundId = await betting.currentRoundId();
             const betAmount = ethers.utils.parseEther("0.1");
             
@@ -88,12 +88,75 @@ describe("ETH Price Betting System", function () {
             
             // Set price to $1650 (in winning range)
             const winningPrice = ethers.utils.parseEther("1650");
-            
-            const initialBalance = await user1.getBalance();
             await oracle.updatePrice(roundId, winningPrice);
-            const finalBalance = await user1.getBalance();
             
-            expect(finalBalance).to.be.gt(initialBalance);
+            const prize = betAmount.mul(95).div(100);
+            expect(await betting.claimable(roundId, user1.address)).to.equal(prize);
+            
+            await expect(betting.connect(user1).claim(roundId))
+                .to.emit(betting, "PrizeDistributed")
+                .withArgs(roundId, user1.address, prize);
+            expect(await betting.claimable(roundId, user1.address)).to.equal(0);
+        });
+        
+        it("Should not pay twice or pay losers", async function () {
+            const roundId = await betting.currentRoundId();
+            await betting.connect(user1).placeBet(roundId, 1, { value: ethers.utils.parseEther("0.1") });
+            await betting.connect(user2).placeBet(roundId, 5, { value: ethers.utils.parseEther("0.1") });
+            
+            await expect(betting.connect(user1).claim(roundId)).to.be.revertedWith("Ronda no resuelta");
+            
+            await ethers.provider.send("evm_increaseTime", [3700]);
+            await ethers.provider.send("evm_mine");
+            await oracle.updatePrice(roundId, ethers.utils.parseEther("1650"));
+            
+            await betting.connect(user1).claim(roundId);
+            await expect(betting.connect(user1).claim(roundId)).to.be.revertedWith("Ya cobrado");
+            await expect(betting.connect(user2).claim(roundId)).to.be.revertedWith("Nada para cobrar");
+        });
+        
+        it("Should refund bets when nobody wins", async function () {
+            const roundId = await betting.currentRoundId();
+            await betting.connect(user1).placeBet(roundId, 0, { value: ethers.utils.parseEther("0.1") });
+            await betting.connect(user1).placeBet(roundId, 3, { value: ethers.utils.parseEther("0.2") });
+            
+            await ethers.provider.send("evm_increaseTime", [3700]);
+            await ethers.provider.send("evm_mine");
+            await oracle.updatePrice(roundId, ethers.utils.parseEther("3000")); // Out of range
+            
+            await expect(betting.connect(user1).claim(roundId))
+                .to.emit(betting, "BetRefunded")
+                .withArgs(roundId, user1.address, ethers.utils.parseEther("0.3"));
+            expect(await betting.accumulatedFees()).to.equal(0);
+        });
+        
+        it("Should let the owner withdraw fees", async function () {
+            const roundId = await betting.currentRoundId();
+            await betting.connect(user1).placeBet(roundId, 1, { value: ethers.utils.parseEther("1") });
+            
+            await ethers.provider.send("evm_increaseTime", [3700]);
+            await ethers.provider.send("evm_mine");
+            await oracle.updatePrice(roundId, ethers.utils.parseEther("1650"));
+            
+            const fee = ethers.utils.parseEther("0.05");
+            expect(await betting.accumulatedFees()).to.equal(fee);
+            await expect(betting.connect(user1).withdrawFees()).to.be.revertedWith("Solo el owner puede llamar");
+            await expect(betting.withdrawFees())
+                .to.emit(betting, "FeesWithdrawn")
+                .withArgs(owner.address, fee);
+            expect(await betting.accumulatedFees()).to.equal(0);
+        });
+        
+        it("Should share range bounds across rounds", async function () {
+            const roundId = await betting.currentRoundId();
+            await ethers.provider.send("evm_increaseTime", [3700]);
+            await ethers.provider.send("evm_mine");
+            await oracle.updatePrice(roundId, ethers.utils.parseEther("1750"));
+            
+            const next = await betting.getRangeInfo(roundId.add(1), 3);
+            expect(next.minPrice).to.equal(ethers.utils.parseEther("1800"));
+            expect(next.maxPrice).to.equal(ethers.utils.parseEther("1900"));
+            expect(next.totalBets).to.equal(0);
         });
     });
     
@@ -109,7 +172,7 @@ describe("ETH Price Betting System", function () {
             expect(rangeInfo.totalBets).to.equal(betAmount.mul(2));
         });
         
-        it("Should distribute prizes proportionally", async function () {
+        it("Should split prizes proportionally", async function () {
             const roundId = await betting.currentRoundId();
             
             // User1 bets 0.1 ETH, User2 bets 0.2 ETH in same range
@@ -120,9 +183,6 @@ describe("ETH Price Betting System", function () {
                 value: ethers.utils.parseEther("0.2") 
             });
             
-            const initialBalance1 = await user1.getBalance();
-            const initialBalance2 = await user2.getBalance();
-            
             // Fast forward and resolve
             await ethers.provider.send("evm_increaseTime", [3700]);
             await ethers.provider.send("evm_mine");
@@ -130,14 +190,118 @@ describe("ETH Price Betting System", function () {
             const winningPrice = ethers.utils.parseEther("1650");
             await oracle.updatePrice(roundId, winningPrice);
             
-            const finalBalance1 = await user1.getBalance();
-            const finalBalance2 = await user2.getBalance();
+            const prize1 = await betting.claimable(roundId, user1.address);
+            const prize2 = await betting.claimable(roundId, user2.address);
+            
+            // User2 gets 2x more; together they take the pool minus the 5% fee
+            expect(prize2).to.equal(prize1.mul(2));
+            expect(prize1.add(prize2)).to.equal(ethers.utils.parseEther("0.285"));
+        });
+    });
+    
+    describe("PriceOracle", function () {
+        it("Should keep the latest price", async function () {
+            const roundId = await betting.currentRoundId();
+            await ethers.provider.send("evm_increaseTime", [3700]);
+            await ethers.provider.send("evm_mine");
+            
+            expect((await oracle.getLatestPrice()).price).to.equal(0);
+            await oracle.updatePrice(roundId, ethers.utils.parseEther("1750"));
+            
+            const latest = await oracle.getLatestPrice();
+            expect(latest.price).to.equal(ethers.utils.parseEther("1750"));
+            expect(await oracle.updateCount()).to.equal(1);
+            
+            const update = await oracle.priceUpdates(1);
+            expect(update.roundId).to.equal(roundId);
+            expect(update.timestamp).to.equal(latest.timestamp);
+        });
+        
+        it("Should schedule rounds on a fixed hourly grid", async function () {
+            const first = await betting.getRoundInfo(1);
+            
+            // Oracle is 3 hours late: rounds 2 and 3 are already due when round 1 resolves
+            await ethers.provider.send("evm_increaseTime", [3 * 3600 + 100]);
+            await ethers.provider.send("evm_mine");
+            await oracle.updatePrice(1, ethers.utils.parseEther("1750"));
+            
+            const second = await betting.getRoundInfo(2);
+            expect(second.targetTime).to.equal(first.targetTime.add(3600));
+        });
+        
+        it("Should resolve a backlog of rounds in one transaction", async function () {
+            await ethers.provider.send("evm_increaseTime", [3 * 3600 + 100]);
+            await ethers.provider.send("evm_mine");
+            
+            const prices = ["1650", "1750", "1850"].map((p) => ethers.utils.parseEther(p));
+            await expect(oracle.updatePrices([1, 2, 3], prices))
+                .to.emit(betting, "RoundResolved").withArgs(3, prices[2], 3);
+            
+            expect(await betting.currentRoundId()).to.equal(4);
+            expect((await betting.getRoundInfo(2)).actualPrice).to.equal(prices[1]);
+            expect((await oracle.getLatestPrice()).price).to.equal(prices[2]);
+            expect(await oracle.updateCount()).to.equal(3);
+        });
+        
+        it("Should reject invalid batches", async function () {
+            await ethers.provider.send("evm_increaseTime", [3700]);
+            await ethers.provider.send("evm_mine");
+            
+            await expect(
+                oracle.updatePrices([1, 2], [ethers.utils.parseEther("1650")])
+            ).to.be.revertedWith("Largos distintos");
+            await expect(
+                oracle.connect(user1).updatePrices([1], [ethers.utils.parseEther("1650")])
+            ).to.be.revertedWith("Solo el owner");
+            // Round 2 is not due yet: the whole batch reverts
+            await expect(
+                oracle.updatePrices([1, 2], [ethers.utils.parseEther("1650"), ethers.utils.parseEther("1750")])
+            ).to.be.revertedWith("Aun no es tiempo");
+        });
+        
+        it("Should only keep the last HISTORY_SIZE updates", async function () {
+            const size = (await oracle.HISTORY_SIZE()).toNumber();
+            const rounds = size + 2;
+            await ethers.provider.send("evm_increaseTime", [rounds * 3600 + 100]);
+            await ethers.provider.send("evm_mine");
+            
+            const ids = Array.from({ length: rounds }, (_, i) => i + 1);
+            const prices = ids.map((id) => ethers.utils.parseEther(String(1500 + id)));
+            await oracle.updatePrices(ids.slice(0, 130), prices.slice(0, 130));
+            await oracle.updatePrices(ids.slice(130), prices.slice(130));
+            
+            await expect(oracle.priceUpdates(2)).to.be.revertedWith("Fuera del historial");
+            const oldest = await oracle.priceUpdates(3);
+            expect(oldest.roundId).to.equal(3);
+            expect(oldest.price).to.equal(prices[2]);
+        });
+    });
+    
+    describe("Multicall3", function () {
+        it("Should read a round snapshot in a single call", async function () {
+            const Multicall3 = await ethers.getContractFactory("Multicall3");
+            const multicall = await Multicall3.deploy();
+            await multicall.deployed();
+            
+            const roundId = await betting.currentRoundId();
+            await betting.connect(user1).placeBet(roundId, 2, { value: ethers.utils.parseEther("0.1") });
+            
+            const calls = [
+                { target: betting.address, allowFailure: false, callData: betting.interface.encodeFunctionData("getRoundInfo", [roundId]) },
+                { target: betting.address, allowFailure: false, callData: betting.interface.encodeFunctionData("getRangeInfo", [roundId, 2]) },
+                { target: betting.address, allowFailure: false, callData: betting.interface.encodeFunctionData("getUserBet", [roundId, 2, user1.address]) },
+                { target: betting.address, allowFailure: true, callData: betting.interface.encodeFunctionData("getRangeInfo", [roundId, 99]) }
+            ];
+            const results = await multicall.callStatic.aggregate3(calls);
             
-            const prize1 = finalBalance1.sub(initialBalance1);
-            const prize2 = finalBalance2.sub(initialBalance2);
+            const roundInfo = betting.interface.decodeFunctionResult("getRoundInfo", results[0].returnData);
+            const rangeInfo = betting.interface.decodeFunctionResult("getRangeInfo", results[1].returnData);
+            const userBet = betting.interface.decodeFunctionResult("getUserBet", results[2].returnData);
             
-            // User2 should get approximately 2x more (minus fees)
-            expect(prize2).to.be.gt(prize1);
+            expect(roundInfo.totalPool).to.equal(ethers.utils.parseEther("0.1"));
+            expect(rangeInfo.totalBets).to.equal(ethers.utils.parseEther("0.1"));
+            expect(userBet[0]).to.equal(ethers.utils.parseEther("0.1"));
+            expect(results[3].success).to.equal(true);
         });
     });
 });
\ No newline at end of file
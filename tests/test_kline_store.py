@@ -0,0 +1,98 @@
+"""KlineStore contra FakeKlineSource (sin red)."""
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('pyarrow')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml import kline_store
+from ml.kline_store import FakeKlineSource, KlineStore, klines_to_frame
+
+HOUR_MS = 3_600_000
+
+
+def ms(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def candles(source, start_ms, end_ms):
+    return klines_to_frame(source.fetch('ETHUSDT', '1h', start_ms, end_ms - 1))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Sin eth_historical.parquet del repo a mano: el almacén arranca vacío
+    monkeypatch.chdir(tmp_path)
+    return KlineStore(root=str(tmp_path / 'klines'))
+
+
+def freeze_clock(monkeypatch, now):
+    """Mismo reloj para la fuente y para el filtro de velas cerradas del almacén."""
+    monkeypatch.setattr(kline_store, 'now_ms', lambda: now)
+    return FakeKlineSource(now=now)
+
+
+def test_sync_fills_gap_across_months(store, monkeypatch):
+    source = freeze_clock(monkeypatch, ms(2024, 2, 1, 5, 30))
+    store.append(candles(source, ms(2024, 1, 31, 0), ms(2024, 1, 31, 12)))
+
+    added = store.sync(source)
+
+    months = [os.path.basename(path) for path in store.partitions()]
+    assert months == ['2024-01.parquet', '2024-02.parquet']
+    # 12:00 del 31 hasta las 04:00 del 1° (la vela de las 05:00 sigue abierta)
+    assert added == 12 + 5
+    df = store.read_range()
+    assert df['open_time'].diff().dropna().eq(HOUR_MS).all()
+    assert int(df['open_time'].iloc[-1]) == ms(2024, 2, 1, 4)
+    # Las velas guardadas coinciden con las de la fuente, sin importar la paginación
+    expected = candles(source, ms(2024, 1, 31, 0), ms(2024, 2, 1, 5))
+    assert df['close'].tolist() == expected['close'].tolist()
+
+
+def test_append_drops_duplicate_open_times(store):
+    source = FakeKlineSource(now=ms(2024, 3, 2))
+    first = candles(source, ms(2024, 3, 1, 0), ms(2024, 3, 1, 6))
+    assert store.append(first) == 6
+
+    overlap = candles(source, ms(2024, 3, 1, 3), ms(2024, 3, 1, 9))
+    assert store.append(pd.concat([overlap, overlap], ignore_index=True)) == 3
+    assert store.append(first) == 0
+
+    df = store.read_range()
+    assert len(df) == 9
+    assert df['open_time'].is_unique and df['open_time'].is_monotonic_increasing
+
+
+def test_latest_and_read_range_only_closed_candles(store, monkeypatch):
+    now = ms(2024, 4, 10, 8, 20)
+    store.sync(freeze_clock(monkeypatch, now), start_ms=now - 48 * HOUR_MS)
+
+    latest = store.latest(10)
+    assert len(latest) == 10
+    assert int(latest['open_time'].iloc[-1]) + HOUR_MS <= now
+
+    window = store.read_range(ms(2024, 4, 10, 0), ms(2024, 4, 10, 12))
+    assert window['open_time'].tolist() == [ms(2024, 4, 10, h) for h in range(8)]
+
+
+def test_bootstrap_from_parquet_converts_timestamps(store, tmp_path):
+    legacy = pd.DataFrame({
+        'timestamp': pd.date_range('2023-12-31 22:00', periods=4, freq='h'),
+        'price': [2300.0, 2310.5, 2295.25, 2320.0],
+        'volume': [10.0, 11.0, 12.0, 13.0],
+    })
+    path = str(tmp_path / 'eth_historical.parquet')
+    legacy.to_parquet(path, index=False)
+
+    assert store.bootstrap_from_parquet(path) == 4
+    assert store.bootstrap_from_parquet(path) == 0  # Solo inicializa un almacén vacío
+
+    df = store.read_range()
+    assert df['open_time'].tolist() == [ms(2023, 12, 31, 22), ms(2023, 12, 31, 23), ms(2024, 1, 1, 0), ms(2024, 1, 1, 1)]
+    assert df['close'].tolist() == legacy['price'].tolist()
+    assert [os.path.basename(p) for p in store.partitions()] == ['2023-12.parquet', '2024-01.parquet']
@@ -0,0 +1,170 @@
+"""NonceManager contra un `w3.eth` en memoria (sin nodo)."""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('web3')
+from web3.exceptions import TransactionNotFound
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from oracle.nonce_manager import NonceManager, to_hex
+
+ADDRESS = '0x000000000000000000000000000000000000dEaD'
+
+
+class FakeEth:
+    """Cadena mínima: mempool por nonce, minado manual y reemplazos con +10% de gas."""
+
+    def __init__(self, mined_nonce=5, gas_price=10):
+        self.mined_nonce = mined_nonce
+        self.gas_price = gas_price
+        self.mempool = {}
+        self.receipts = {}
+        self.sent = []
+        self.account = SimpleNamespace(sign_transaction=lambda tx, key: SimpleNamespace(rawTransaction=dict(tx)))
+
+    def get_transaction_count(self, address, block_identifier):
+        if block_identifier == 'latest':
+            return self.mined_nonce
+        nonce = self.mined_nonce
+        while nonce in self.mempool:
+            nonce += 1
+        return nonce
+
+    def send_raw_transaction(self, raw):
+        nonce = raw['nonce']
+        if nonce < self.mined_nonce:
+            raise ValueError('nonce too low')
+        if nonce in self.mempool and raw['gasPrice'] < self.mempool[nonce]['gasPrice'] * 1.1:
+            raise ValueError('replacement transaction underpriced')
+        tx_hash = bytes([nonce]) + len(self.sent).to_bytes(31, 'big')
+        self.sent.append(raw)
+        self.mempool[nonce] = dict(raw, hash=to_hex(tx_hash))
+        return tx_hash
+
+    def get_transaction_receipt(self, tx_hash):
+        receipt = self.receipts.get(to_hex(tx_hash))
+        if receipt is None:
+            raise TransactionNotFound(tx_hash)
+        return receipt
+
+    def mine(self):
+        while self.mined_nonce in self.mempool:
+            tx = self.mempool.pop(self.mined_nonce)
+            self.receipts[tx['hash']] = SimpleNamespace(status=1, transactionHash=tx['hash'], gasPrice=tx['gasPrice'])
+            self.mined_nonce += 1
+
+
+@pytest.fixture
+def eth():
+    return FakeEth()
+
+
+def make_manager(eth, **kwargs):
+    return NonceManager(SimpleNamespace(eth=eth), SimpleNamespace(address=ADDRESS, key=b'k'), **kwargs)
+
+
+def transaction(nonce, gas_price=10):
+    return {'nonce': nonce, 'gasPrice': gas_price, 'gas': 200000, 'to': ADDRESS, 'data': '0x', 'chainId': 31337}
+
+
+def test_reserve_and_release(eth):
+    nonces = make_manager(eth)
+    assert [nonces.reserve() for _ in range(3)] == [5, 6, 7]
+
+    nonces.release(6)
+    assert nonces.reserve() == 6
+
+    # El último reservado se devuelve al contador
+    nonces.release(7)
+    assert nonces.stats()['next_nonce'] == 7
+    assert nonces.reserve() == 7
+
+
+def test_send_and_find_receipt(eth):
+    nonces = make_manager(eth)
+    nonce = nonces.reserve()
+    tx_hash = nonces.send(transaction(nonce))
+    assert nonces.find_receipt(nonce) is None
+
+    eth.mine()
+    receipt = nonces.find_receipt(nonce)
+    assert receipt.transactionHash == to_hex(tx_hash)
+    assert nonces.stats()['in_flight'] == 0
+
+
+def test_replace_stuck_bumps_gas(eth):
+    nonces = make_manager(eth, stuck_after=60)
+    nonce = nonces.reserve()
+    nonces.send(transaction(nonce, gas_price=100))
+    sent_at = nonces.pending[nonce].sent_at
+
+    assert nonces.replace_stuck(now=sent_at + 30) == []
+    replaced = nonces.replace_stuck(now=sent_at + 61)
+    assert [n for n, _ in replaced] == [nonce]
+    assert eth.sent[-1]['nonce'] == nonce
+    assert eth.sent[-1]['gasPrice'] == 113
+
+    eth.mine()
+    assert nonces.find_receipt(nonce).gasPrice == 113
+
+
+def test_replace_stuck_respects_max_gas_price(eth):
+    nonces = make_manager(eth, stuck_after=0, max_gas_price=105)
+    nonce = nonces.reserve()
+    nonces.send(transaction(nonce, gas_price=100))
+    assert nonces.replace_stuck() == []
+    assert len(eth.sent) == 1
+
+
+def test_reconcile_fills_gaps(eth):
+    nonces = make_manager(eth)
+    nonces.reserve()
+    nonce = nonces.reserve()
+    nonces.send(transaction(nonce))
+
+    # El 5 se reservó pero nunca se envió: queda como hueco para la próxima reserva
+    assert nonces.reconcile() == [5]
+    assert nonces.reserve() == 5
+    assert nonces.reserve() == 7
+
+
+def test_reconcile_after_restart_uses_journal(eth, tmp_path):
+    journal = str(tmp_path / 'pending.json')
+    before = make_manager(eth, journal_path=journal, stuck_after=60)
+    first = before.reserve()
+    before.send(transaction(first))
+    eth.mine()
+    # El segundo queda en el mempool cuando el proceso se corta
+    second = before.reserve()
+    before.send(transaction(second))
+
+    after = make_manager(eth, journal_path=journal, stuck_after=60)
+    assert after.reconcile() == []
+    assert list(after.pending) == [second]
+    assert after.reserve() == second + 1
+
+    sent_at = after.pending[second].sent_at
+    replaced = after.replace_stuck(now=sent_at + 61)
+    assert [n for n, _ in replaced] == [second]
+    eth.mine()
+    assert after.find_receipt(second) is not None
+
+    # Confirmado: desaparece del journal
+    assert make_manager(eth, journal_path=journal).reconcile() == []
+    assert make_manager(eth, journal_path=journal).pending == {}
+
+
+def test_reconcile_keeps_nonce_of_dropped_transaction(eth, tmp_path):
+    journal = str(tmp_path / 'pending.json')
+    before = make_manager(eth, journal_path=journal)
+    nonce = before.reserve()
+    before.send(transaction(nonce))
+    eth.mempool.clear()  # El nodo reinició y descartó la transacción
+
+    after = make_manager(eth, journal_path=journal, stuck_after=0)
+    after.reconcile()
+    assert after.reserve() == nonce + 1
+    assert [n for n, _ in after.replace_stuck()] == [nonce]